@@ -0,0 +1 @@
+"""Offline reprocessing of a well's history from data exports."""
@@ -0,0 +1,252 @@
+"""Recomputes actual gamma depth of a well from WITS and drillstring exports.
+
+Usage: python -m backfill.run --wits wits.jsonl --drillstrings drillstrings.jsonl \\
+    --output-dir out/ --provider my-provider [--workers 8] [--shard-bytes 67108864]
+
+Both exports are JSONL files with one data API document per line. The WITS export
+is split into shards of about --shard-bytes at line boundaries, and shards are
+processed by a pool of worker processes. A WITS export sorted by timestamp,
+as the data API returns it, makes every shard a contiguous time range.
+Records repeating a timestamp are dropped but the last one, as in the apps,
+unless the repeats fall on both sides of a shard boundary.
+
+Each shard is written to its own JSONL file of actual gamma depth documents,
+ready for bulk upload. manifest.json lists the files with their time ranges
+and record counts.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import sys
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import pydantic
+
+# running from the repository root, where the engine package lives
+import gamma_depth_engine
+from gamma_depth_engine.models import Drillstring
+
+DEFAULT_SHARD_BYTES = 64 * 1024 * 1024
+
+
+class Shard(NamedTuple):
+    index: int
+    start: int  # byte offset of the first line, that starts in the shard
+    end: int  # byte offset, where the next shard starts
+
+
+class ShardResult(NamedTuple):
+    index: int
+    path: str
+    records_in: int
+    records_skipped: int  # no drillstring, bit depth or gamma ray
+    records_duplicate: int  # repeat a timestamp of the shard
+    records_out: int
+    start_time: Optional[int]
+    end_time: Optional[int]
+
+
+class OutputOptions(NamedTuple):
+    output_dir: pathlib.Path
+    provider: str
+    collection: str
+    version: int
+
+
+def load_distances(path: pathlib.Path) -> Dict[str, Optional[float]]:
+    """Returns gamma sensor to bit distances of the exported drillstrings."""
+
+    distances = {}
+    with open(path, 'rb') as file:
+        for line in file:
+            if line.strip():
+                drillstring = pydantic.parse_raw_as(Drillstring, line)
+                distances[drillstring.id] = drillstring.gamma_sensor_to_bit_distance
+
+    return distances
+
+
+def make_shards(path: pathlib.Path, shard_bytes: int) -> List[Shard]:
+    size = os.path.getsize(path)
+
+    return [
+        Shard(index=index, start=start, end=min(start + shard_bytes, size))
+        for index, start in enumerate(range(0, size, shard_bytes))
+    ]
+
+
+def iter_lines(path: pathlib.Path, shard: Shard) -> Iterator[bytes]:
+    """Yields lines, that start within the shard byte range."""
+
+    with open(path, 'rb') as file:
+        if shard.start:
+            # the line crossing the start belongs to the previous shard
+            file.seek(shard.start - 1)
+            file.readline()
+
+        while file.tell() < shard.end and (line := file.readline()):
+            yield line
+
+
+class WorkerState(NamedTuple):
+    wits_path: pathlib.Path
+    distances: Dict[str, Optional[float]]
+    options: OutputOptions
+
+
+# set once per worker process, so drillstrings are not pickled with every shard
+_STATE: Optional[WorkerState] = None
+
+
+def _init_worker(state: WorkerState) -> None:
+    global _STATE
+
+    _STATE = state
+
+
+def process_shard(shard: Shard) -> ShardResult:
+    wits_path, distances, options = _STATE
+
+    # records go into compact arrays as they are read, no parsed record is kept
+    builder = gamma_depth_engine.ColumnsBuilder()
+    records_in = 0
+    asset_id = company_id = None
+    for line in iter_lines(wits_path, shard):
+        if not line.strip():
+            continue
+
+        records_in += 1
+        record = json.loads(line)
+        data = record['data']
+
+        # the apps never post such records either
+        if not (
+            (drillstring_id := (record.get('metadata') or {}).get('drillstring'))
+            and data.get('bit_depth') is not None
+            and data.get('gamma_ray') is not None
+        ):
+            continue
+
+        if asset_id is None:
+            asset_id, company_id = record['asset_id'], record['company_id']
+        elif record['asset_id'] != asset_id:
+            raise ValueError(f'Shard {shard.index} has records of more than one asset.')
+
+        builder.append(
+            timestamp=record['timestamp'],
+            bit_depth=data['bit_depth'],
+            gamma_ray=data['gamma_ray'],
+            drillstring_id=drillstring_id,
+        )
+
+    path = options.output_dir / f'{options.collection}-{shard.index:05d}.jsonl'
+    result = ShardResult(
+        index=shard.index,
+        path=path.name,
+        records_in=records_in,
+        records_skipped=records_in - len(builder),
+        records_duplicate=0,
+        records_out=0,
+        start_time=None,
+        end_time=None,
+    )
+
+    if not len(builder):
+        return result
+
+    # the last record of a timestamp wins, as in the apps
+    columns = gamma_depth_engine.dedupe_timestamps(builder.build())
+    del builder
+
+    records_out = len(columns.timestamp)
+    result = result._replace(
+        records_duplicate=result.records_in - result.records_skipped - records_out,
+        records_out=records_out,
+        start_time=int(columns.timestamp[0]),
+        end_time=int(columns.timestamp[-1]),
+    )
+
+    rows = gamma_depth_engine.run(
+        columns=columns,
+        id_to_distance=distances,
+        asset_id=asset_id,
+        company_id=company_id,
+        provider=options.provider,
+        collection=options.collection,
+        version=options.version,
+    ).rows
+
+    with open(path, 'wb') as file:
+        file.writelines(row + b'\n' for row in rows)
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--wits', type=pathlib.Path, required=True)
+    parser.add_argument('--drillstrings', type=pathlib.Path, required=True)
+    parser.add_argument('--output-dir', type=pathlib.Path, required=True)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--shard-bytes', type=int, default=DEFAULT_SHARD_BYTES)
+    parser.add_argument('--provider', required=True)
+    parser.add_argument('--collection', default='actual-gamma-depth')
+    parser.add_argument('--version', type=int, default=1)
+    args = parser.parse_args()
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    options = OutputOptions(
+        output_dir=args.output_dir,
+        provider=args.provider,
+        collection=args.collection,
+        version=args.version,
+    )
+
+    started = time.perf_counter()
+    distances = load_distances(args.drillstrings)
+    shards = make_shards(args.wits, args.shard_bytes)
+
+    results = []
+    with multiprocessing.Pool(
+        processes=args.workers,
+        initializer=_init_worker,
+        initargs=(
+            WorkerState(wits_path=args.wits, distances=distances, options=options),
+        ),
+    ) as pool:
+        for result in pool.imap_unordered(process_shard, shards):
+            results.append(result)
+            print(
+                f'shard {result.index + 1}/{len(shards)}: '
+                f'{result.records_out} records',
+                file=sys.stderr,
+            )
+
+    results.sort(key=lambda result: result.index)
+    manifest = {
+        'wits': str(args.wits),
+        'drillstrings': len(distances),
+        'records_in': sum(result.records_in for result in results),
+        'records_skipped': sum(result.records_skipped for result in results),
+        'records_duplicate': sum(result.records_duplicate for result in results),
+        'records_out': sum(result.records_out for result in results),
+        'files': [result._asdict() for result in results if result.records_out],
+    }
+    with open(args.output_dir / 'manifest.json', 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+    print(
+        f"{manifest['records_out']} records written to {args.output_dir} "
+        f'in {time.perf_counter() - started:.1f}s',
+        file=sys.stderr,
+    )
+
+
+if __name__ == '__main__':
+    main()
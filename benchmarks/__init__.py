@@ -0,0 +1,28 @@
+import os
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# the same values corva pytest plugin uses, overridable from the environment
+TEST_ENV = {
+    'API_ROOT_URL': 'https://api.localhost.ai',
+    'DATA_API_ROOT_URL': 'https://data.localhost.ai',
+    'CACHE_URL': 'redis://localhost:6379',
+    'APP_KEY': 'test-provider.test-app-name',
+    'PROVIDER': 'test-provider',
+}
+
+
+def use_app(app: str) -> None:
+    """Makes `src` package of the app importable.
+
+    Must be called before importing corva or the app, as both read settings
+    from the environment at import time. Apps share the `src` package name,
+    so a single process can benchmark only one of them.
+    """
+
+    for key, value in TEST_ENV.items():
+        os.environ.setdefault(key, value)
+
+    sys.path.insert(0, str(ROOT / app))
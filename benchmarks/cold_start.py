@@ -0,0 +1,253 @@
+"""Measures cold start of the Lambda entry points: imports plus the first invocation.
+
+Usage: python -m benchmarks.cold_start [--apps stream] [--runs 10] [--importtime 15]
+
+Every run is a fresh interpreter. The app is copied into a temporary directory,
+which is not written to during the runs, like the read only Lambda package:
+  source - no bytecode, so every module of the app is compiled on import;
+  compiled - bytecode made by `make compile` is shipped along with the sources.
+Phases of a run:
+  corva - importing the SDK, the baseline the app can not change;
+  app_import - importing lambda_function after the SDK;
+  first_invoke, second_invoke - the app function on a small event, served
+    by in memory api, cache and HTTP session.
+Dependencies are imported from the environment as is, with their bytecode.
+"""
+
+import argparse
+import compileall
+import json
+import os
+import pathlib
+import py_compile
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import ROOT, TEST_ENV
+
+APPS = ('stream', 'scheduled')
+PHASES = ('corva', 'app_import', 'first_invoke', 'second_invoke')
+RECORDS = 100
+
+
+def copy_app(app: str, target: pathlib.Path, compiled: bool) -> pathlib.Path:
+    app_dir = target / app
+    shutil.copytree(
+        ROOT / app,
+        app_dir,
+        symlinks=False,
+        ignore=shutil.ignore_patterns('__pycache__', 'tests', '.pytest_cache'),
+    )
+
+    if compiled:
+        # the same as `make compile`
+        compileall.compile_dir(
+            app_dir,
+            quiet=1,
+            invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH,
+        )
+
+    return app_dir
+
+
+# runs in a fresh interpreter, imports are timed before anything else is imported
+CHILD_SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+import corva
+corva_seconds = time.perf_counter() - start
+
+start = time.perf_counter()
+import lambda_function
+app_import_seconds = time.perf_counter() - start
+
+from benchmarks.cold_start import time_invocations
+
+timings = {'corva': corva_seconds, 'app_import': app_import_seconds}
+print(json.dumps({**timings, **time_invocations(sys.argv[1])}))
+"""
+
+
+def time_invocations(app: str) -> dict:
+    invoke = make_invoke(app)
+
+    timings = {}
+    for phase in ('first_invoke', 'second_invoke'):
+        start = time.perf_counter()
+        invoke()
+        timings[phase] = time.perf_counter() - start
+
+    return timings
+
+
+class FakeResponse:
+    ok = True
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def post(self, url, data, headers, timeout):
+        return FakeResponse()
+
+
+def make_invoke(app: str):
+    from benchmarks.generator import make_drillstrings, make_wits_records
+    from benchmarks.pipeline import MemoryApi, MemoryCache
+    from gamma_depth_io import writer
+    from src.configuration import SETTINGS
+    from src.gamma_depth import gamma_depth
+
+    drillstrings = make_drillstrings(2)
+    records = make_wits_records(RECORDS, [drillstrings[1]['_id']])
+
+    class Api(MemoryApi):
+        data_api_url = TEST_ENV['DATA_API_ROOT_URL']
+        default_headers = {}
+        timeout = None
+
+        def get_dataset(self, provider, dataset, *, query, sort, limit, **kwargs):
+            if dataset == getattr(SETTINGS, 'wits_collection', None):
+                page = [
+                    record
+                    for record in records
+                    if record['timestamp'] >= query['timestamp'].get('$gte', 0)
+                    and record['timestamp'] > query['timestamp'].get('$gt', -1)
+                ]
+                return page[:limit]
+
+            return super().get_dataset(
+                provider, dataset, query=query, sort=sort, limit=limit, **kwargs
+            )
+
+    writer._SESSION = FakeSession()
+    api = Api(drillstrings)
+
+    if app == 'stream':
+        from corva import StreamTimeEvent
+
+        event = StreamTimeEvent(
+            asset_id=1,
+            company_id=2,
+            records=[
+                {key: record[key] for key in ('timestamp', 'data', 'metadata')}
+                for record in records
+            ],
+        )
+    else:
+        from corva import ScheduledEvent
+
+        event = ScheduledEvent(
+            asset_id=1,
+            company_id=2,
+            start_time=records[0]['timestamp'],
+            end_time=records[-1]['timestamp'],
+        )
+
+    def invoke():
+        # each invocation gets an empty cache, so nothing is skipped as written
+        gamma_depth(event=event, api=api, cache=MemoryCache())
+
+    return invoke
+
+
+def run_child(
+    app_dir: pathlib.Path, app: str, *flags: str
+) -> subprocess.CompletedProcess:
+    env = {**os.environ, **TEST_ENV, 'PYTHONPATH': f'{app_dir}{os.pathsep}{ROOT}'}
+
+    return subprocess.run(
+        [
+            sys.executable,
+            '-B',  # keep the app directory read only
+            *flags,
+            '-c',
+            CHILD_SCRIPT,
+            app,
+        ],
+        cwd=app_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def print_import_graph(app_dir: pathlib.Path, app: str, top: int) -> None:
+    """Prints modules, that take the most time to import after the SDK."""
+
+    stderr = run_child(app_dir, app, '-X', 'importtime').stderr
+
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+
+        if name.strip() == 'corva':
+            # modules are listed once imported, so the SDK ones come before it
+            modules.clear()
+            continue
+
+        modules.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+        if name.strip() == 'lambda_function':
+            break
+
+    print(f'\n{app}: top {top} imports after the SDK, cumulative and self ms')
+    for cumulative_us, self_us, name in sorted(modules, reverse=True)[:top]:
+        print(f'{cumulative_us / 1000:>9.1f} {self_us / 1000:>9.1f} {name}')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--apps', nargs='+', choices=APPS, default=APPS)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--importtime', type=int, metavar='TOP', default=0)
+    parser.add_argument('--output', type=pathlib.Path)
+    args = parser.parse_args()
+
+    results = []
+    print(f'{"app":>9} {"mode":>8} ' + ' '.join(f'{phase:>13}' for phase in PHASES))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for app in args.apps:
+            for mode in ('source', 'compiled'):
+                app_dir = copy_app(
+                    app, pathlib.Path(tmp_dir) / mode, compiled=mode == 'compiled'
+                )
+                runs = [
+                    json.loads(run_child(app_dir, app).stdout)
+                    for _ in range(args.runs)
+                ]
+                medians = {
+                    phase: statistics.median(run[phase] for run in runs)
+                    for phase in PHASES
+                }
+                results.append({'app': app, 'mode': mode, **medians})
+
+                print(
+                    f'{app:>9} {mode:>8} '
+                    + ' '.join(f'{medians[phase] * 1000:>11.1f}ms' for phase in PHASES)
+                )
+
+            if args.importtime:
+                print_import_graph(app_dir, app, top=args.importtime)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Compares two benchmark result files.
+
+Usage: python -m benchmarks.compare <old>.json <new>.json
+
+Prints the time of every phase in both files and the speedup of the new one.
+"""
+
+import argparse
+import json
+import pathlib
+
+
+def load(path: pathlib.Path) -> dict:
+    data = json.loads(path.read_text())
+
+    return {
+        (result['app'], result['phase'], result['size']): result['seconds']
+        for result in data['results']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('old', type=pathlib.Path)
+    parser.add_argument('new', type=pathlib.Path)
+    args = parser.parse_args()
+
+    old, new = load(args.old), load(args.new)
+
+    print(
+        f'{"app":>9} {"phase":>18} {"size":>9} {"old, s":>10} {"new, s":>10} '
+        f'{"speedup":>8}'
+    )
+    for key in sorted(old.keys() & new.keys()):
+        app, phase, size = key
+        print(
+            f'{app:>9} {phase:>18} {size:>9} {old[key]:>10.5f} {new[key]:>10.5f} '
+            f'{old[key] / new[key]:>7.2f}x'
+        )
+
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f'{" ".join(map(str, key))}: only in {"old" if key in old else "new"}')
+
+
+if __name__ == '__main__':
+    main()
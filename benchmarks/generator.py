@@ -0,0 +1,91 @@
+"""Synthetic WITS records and drillstrings, shaped like the Corva data API output."""
+
+import random
+from typing import List, Optional
+
+START_TIMESTAMP = 1600000000
+RECORDS_PER_DRILLSTRING = 3600 * 12  # a BHA run every 12 hours of 1 second data
+
+
+def make_drillstrings(count: int, seed: int = 0) -> List[dict]:
+    """Returns drillstrings, every 4th of them has no MWD gamma sensor."""
+
+    rng = random.Random(seed)
+
+    drillstrings = []
+    for index in range(count):
+        components = [
+            {'family': 'bit', 'gamma_sensor_to_bit_distance': None},
+            {'family': 'dc', 'gamma_sensor_to_bit_distance': None},
+        ]
+
+        if index % 4:
+            components.insert(
+                1,
+                {
+                    'family': 'mwd',
+                    'has_gamma_sensor': True,
+                    'gamma_sensor_to_bit_distance': round(rng.uniform(30, 90), 2),
+                },
+            )
+
+        drillstrings.append(
+            {
+                '_id': f'{index:024x}',
+                'asset_id': 1,
+                'timestamp': START_TIMESTAMP,
+                'data': {'components': components},
+            }
+        )
+
+    return drillstrings
+
+
+def make_wits_records(
+    count: int,
+    drillstring_ids: List[str],
+    asset_id: int = 1,
+    company_id: int = 2,
+    untagged_every: Optional[int] = None,
+    seed: int = 0,
+) -> List[dict]:
+    """Returns 1 second WITS records with slowly increasing bit depth.
+
+    Records switch to the next drillstring every RECORDS_PER_DRILLSTRING records,
+    and every untagged_every-th record has no drillstring in its metadata.
+    """
+
+    rng = random.Random(seed)
+
+    records = []
+    bit_depth = 1000.0
+    for index in range(count):
+        bit_depth += rng.uniform(0, 0.05)
+        drillstring_id = drillstring_ids[
+            index // RECORDS_PER_DRILLSTRING % len(drillstring_ids)
+        ]
+
+        records.append(
+            {
+                'asset_id': asset_id,
+                'company_id': company_id,
+                'timestamp': START_TIMESTAMP + index,
+                'collection': 'wits',
+                'provider': 'corva',
+                'version': 1,
+                'data': {
+                    'bit_depth': round(bit_depth, 2),
+                    'gamma_ray': round(rng.uniform(20, 150), 2),
+                    'hole_depth': round(bit_depth + 5, 2),
+                    'rop': round(rng.uniform(0, 200), 2),
+                    'weight_on_bit': round(rng.uniform(0, 40), 2),
+                },
+                'metadata': (
+                    {}
+                    if untagged_every and index % untagged_every == 0
+                    else {'drillstring': drillstring_id}
+                ),
+            }
+        )
+
+    return records
@@ -0,0 +1,118 @@
+"""Compares stream parse_event_columnar, which keeps the records in arrays,
+with the model parsing it replaced, both with and without deep copies.
+
+Usage: python -m benchmarks.parse_event [--sizes 1000 10000 100000] [--repeat 3]
+"""
+
+import argparse
+import copy
+import time
+import tracemalloc
+
+from benchmarks import use_app
+
+use_app('stream')
+
+import pydantic  # noqa: E402
+from corva import StreamTimeEvent, StreamTimeRecord  # noqa: E402
+
+from src.gamma_depth import parse_event_columnar  # noqa: E402
+from src.models import WitsRecord  # noqa: E402
+
+
+class GammaDepthEvent(StreamTimeEvent):
+    """Event model of the stream app, before records were kept in arrays."""
+
+    records: pydantic.conlist(WitsRecord, min_items=1)
+
+
+def parse_event(event: StreamTimeEvent):
+    """parse_event as it was before records were kept in arrays."""
+
+    event = GammaDepthEvent.parse_obj(event)
+
+    # records are immutable and shared with the original event, no deep copy needed
+    new_records = [
+        record for record in event.records if record.metadata.drillstring_id
+    ]
+
+    if not new_records:
+        return None
+
+    if len(new_records) == len(event.records):
+        return event
+
+    return event.copy(update={'records': new_records})
+
+
+def parse_event_deep_copy(event: StreamTimeEvent):
+    """parse_event as it was before records stopped being copied."""
+
+    event = GammaDepthEvent.parse_obj(event)
+
+    new_records = [
+        copy.deepcopy(record)
+        for record in event.records
+        if record.metadata.drillstring_id
+    ]
+
+    if not new_records:
+        return None
+
+    return event.copy(update={'records': new_records}, deep=True)
+
+
+def make_event(size: int) -> StreamTimeEvent:
+    return StreamTimeEvent(
+        asset_id=1,
+        company_id=2,
+        records=[
+            StreamTimeRecord(
+                timestamp=1600000000 + index,
+                data={'bit_depth': 1000.0 + index * 0.01, 'gamma_ray': 50.0},
+                # every 10th record has no drillstring and gets filtered out
+                metadata={} if index % 10 == 0 else {'drillstring': str(index // 3600)},
+            )
+            for index in range(size)
+        ],
+    )
+
+
+def measure(fn, event: StreamTimeEvent, repeat: int):
+    """Returns the best wall time in seconds and the peak of allocated bytes."""
+
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(event)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(event)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"records":>8} {"impl":>10} {"seconds":>9} {"peak MiB":>9}')
+    for size in args.sizes:
+        event = make_event(size)
+
+        for name, fn in (
+            ('deep copy', parse_event_deep_copy),
+            ('no copy', parse_event),
+            ('columnar', parse_event_columnar),
+        ):
+            seconds, peak = measure(fn, event, repeat=args.repeat)
+            print(f'{size:>8} {name:>10} {seconds:>9.4f} {peak / 2 ** 20:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""Times gamma depth pipeline phases of a single app.
+
+Usage: python -m benchmarks.pipeline --app stream --output stream.json
+
+Each phase is timed separately on the same synthetic input:
+  parse, parse_trusted - raw records into engine columns;
+  drillstrings_cold, drillstrings_cache, drillstrings_warm - drillstring
+    resolution from the api (served from memory), from Corva cache
+    and from the index, kept in process memory of a warm container;
+  compute - offsets, gamma depth and JSON encoded output documents;
+  serialize - encoded documents into POST bodies.
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from typing import Callable, Dict, List
+from unittest import mock
+
+from benchmarks import use_app
+from benchmarks.generator import (
+    RECORDS_PER_DRILLSTRING,
+    make_drillstrings,
+    make_wits_records,
+)
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+
+
+class MemoryApi:
+    """Serves drillstring queries from memory."""
+
+    def __init__(self, drillstrings: List[dict]):
+        self.drillstrings = drillstrings
+
+    def get_dataset(self, provider, dataset, *, query, sort, limit, skip=0, **kwargs):
+        ids = set(query['_id']['$in'])
+        found = [
+            drillstring
+            for drillstring in self.drillstrings
+            if drillstring['_id'] in ids
+        ]
+
+        return found[skip:skip + limit]
+
+
+class MemoryCache:
+    """Implements the subset of corva Cache and its redis client used by the apps.
+
+    Transactions run their function once, nothing else writes in between.
+    """
+
+    default_name = 'memory'
+
+    def __init__(self):
+        self.data = {}
+        self.redis = self  # HMGET and transactions go to the redis client
+
+    def store(self, key=None, value=None, mapping=None, **kwargs):
+        self.data.update(mapping or {key: value})
+
+    def load(self, key, **kwargs):
+        return self.data.get(key)
+
+    def hmget(self, name, keys):
+        return [self.data.get(key) for key in keys]
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        self.store(key=key, value=value, mapping=mapping)
+
+    def transaction(self, func, *watches):
+        func(self)
+
+    def multi(self):
+        pass
+
+    def expire(self, name, time):
+        pass
+
+
+def timeit(fn: Callable[[], object], min_seconds: float = 0.2, max_runs: int = 50):
+    """Returns the best wall time of fn, running it until min_seconds pass."""
+
+    best = math.inf
+    spent = 0.0
+    runs = 0
+    while runs < max_runs and (runs == 0 or spent < min_seconds):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+
+        best = min(best, elapsed)
+        spent += elapsed
+        runs += 1
+
+    return best
+
+
+def make_phases(app: str, size: int) -> Dict[str, Callable[[], object]]:
+    # modules are imported here, as `src` package is resolved by use_app
+    import gamma_depth_engine
+    from gamma_depth_io import drillstring_index, writer
+    from src import gamma_depth
+    from src.configuration import SETTINGS
+
+    drillstrings = make_drillstrings(max(1, math.ceil(size / RECORDS_PER_DRILLSTRING)))
+    drillstring_ids = [drillstring['_id'] for drillstring in drillstrings]
+    api = MemoryApi(drillstrings)
+
+    if app == 'stream':
+        from corva import StreamTimeEvent
+
+        raw_records = make_wits_records(size, drillstring_ids, untagged_every=10)
+        event = StreamTimeEvent(
+            asset_id=1,
+            company_id=2,
+            records=[
+                {key: record[key] for key in ('timestamp', 'data', 'metadata')}
+                for record in raw_records
+            ],
+        )
+
+        def parse():
+            return gamma_depth.parse_event_columnar(event).columns
+
+        def parse_trusted():
+            return gamma_depth.parse_event_trusted(event)
+
+    else:
+        raw_records = make_wits_records(size, drillstring_ids)
+
+        # the setting is restored after each run, not to leak into the other phases
+        def parse():
+            with mock.patch.object(SETTINGS, 'trusted_input', False):
+                return gamma_depth.parse_page(raw_records).columns
+
+        def parse_trusted():
+            with mock.patch.object(SETTINGS, 'trusted_input', True):
+                return gamma_depth.parse_page(raw_records).columns
+
+    columns = parse()
+    filled_cache = MemoryCache()
+
+    def resolve(cache, warm):
+        if not warm:
+            drillstring_index._INDEXES.clear()
+
+        return drillstring_index.resolve(
+            api=api,
+            cache=cache,
+            asset_id=1,
+            drillstring_ids=set(columns.drillstring_ids),
+            fields='_id,data',
+            settings=SETTINGS,
+        )
+
+    id_to_distance = resolve(filled_cache, warm=False)
+
+    def compute():
+        return gamma_depth_engine.run(
+            columns=columns,
+            id_to_distance=id_to_distance,
+            asset_id=1,
+            company_id=2,
+            provider=SETTINGS.provider,
+            collection=SETTINGS.actual_gamma_depth_collection,
+            version=SETTINGS.version,
+            prerendered_envelope=SETTINGS.prerendered_envelope,
+        )
+
+    rows = compute().rows
+
+    def serialize():
+        return list(
+            writer.iter_chunks(
+                rows,
+                max_records=SETTINGS.post_chunk_max_records,
+                max_bytes=SETTINGS.post_chunk_max_bytes,
+            )
+        )
+
+    return {
+        'parse': parse,
+        'parse_trusted': parse_trusted,
+        'drillstrings_cold': lambda: resolve(MemoryCache(), warm=False),
+        'drillstrings_cache': lambda: resolve(filled_cache, warm=False),
+        'drillstrings_warm': lambda: resolve(filled_cache, warm=True),
+        'compute': compute,
+        'serialize': serialize,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--app', choices=('stream', 'scheduled'), required=True)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--output', help='JSON file to write results to')
+    args = parser.parse_args()
+
+    use_app(args.app)
+
+    results = []
+    for size in args.sizes:
+        for phase, fn in make_phases(args.app, size).items():
+            seconds = timeit(fn)
+            results.append(
+                {
+                    'app': args.app,
+                    'phase': phase,
+                    'size': size,
+                    'seconds': seconds,
+                    'records_per_second': size / seconds,
+                }
+            )
+            print(
+                f'{args.app:>9} {phase:>18} {size:>9} {seconds:>10.5f}s',
+                file=sys.stderr,
+            )
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,361 @@
+"""Replays events through lambda_handler of an app against a local fake data API.
+
+Usage: python -m benchmarks.replay --app scheduled [--events 50] [--rate 10]
+    [--records 300] [--assets 2] [--latency-ms 20] [--failure-rate 0.01]
+    [--events-file events.jsonl] [--output replay.json]
+
+A threaded HTTP server on localhost stands in for the Corva data API:
+  GET <drillstring collection> - a drillstring with an MWD gamma sensor
+    for every queried id;
+  GET any other collection - WITS records of the queried time range, one per second,
+    generated on request for any asset;
+  POST - accepted and counted.
+Every request waits --latency-ms, then fails with status 500 with
+--failure-rate probability.
+
+Events are either synthetic or read from --events-file, one JSON event per line.
+Synthetic events of each asset follow each other in time: stream events carry
+--records records, scheduled events cover --records seconds.
+
+Events start --rate per second (0 for back to back) and run one at a time,
+like in a single warm container, with an in memory cache. The app function
+under lambda_handler is called the way the SDK test client calls it.
+A failed invocation is retried up to --retries times, as Lambda retries
+asynchronous events. App settings are read from the environment as in Lambda,
+e.g. STREAMING_WITS=true.
+
+Reported are throughput, p50, p95 and p99 invocation latency, the concurrency
+the event rate needs at that latency, and requests per endpoint.
+"""
+
+import argparse
+import http.server
+import inspect
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+from typing import Dict, Iterator, List
+
+from benchmarks import use_app
+from benchmarks.generator import RECORDS_PER_DRILLSTRING, START_TIMESTAMP
+
+DRILLSTRINGS = 4
+
+
+def drillstring_id(timestamp: int) -> str:
+    # the same ids make_drillstrings generates
+    index = (timestamp - START_TIMESTAMP) // RECORDS_PER_DRILLSTRING % DRILLSTRINGS
+
+    return f'{index:024x}'
+
+
+def make_wits_record(asset_id: int, timestamp: int) -> dict:
+    """Returns the WITS record of the asset at the timestamp, the same every time."""
+
+    offset = timestamp - START_TIMESTAMP
+
+    return {
+        'asset_id': asset_id,
+        'company_id': 2,
+        'timestamp': timestamp,
+        'data': {
+            'bit_depth': round(1000.0 + offset * 0.025, 2),
+            'gamma_ray': round(20.0 + timestamp * 7919 % 13000 / 100, 2),
+        },
+        'metadata': {'drillstring': drillstring_id(timestamp)},
+    }
+
+
+def make_drillstring(drillstring_id: str) -> dict:
+    return {
+        '_id': drillstring_id,
+        'data': {
+            'components': [
+                {
+                    'family': 'mwd',
+                    'has_gamma_sensor': True,
+                    'gamma_sensor_to_bit_distance': 30.0 + int(drillstring_id, 16) % 60,
+                }
+            ]
+        },
+    }
+
+
+class FakeDataApi(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        drillstring_collection: str,
+        latency: float,
+        failure_rate: float,
+        seed: int = 0,
+    ):
+        super().__init__(('127.0.0.1', 0), FakeDataApiHandler)
+        self.drillstring_collection = drillstring_collection
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def should_fail(self, endpoint: str) -> bool:
+        with self.lock:
+            failed = self.random.random() < self.failure_rate
+
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            if failed:
+                self.failures[endpoint] = self.failures.get(endpoint, 0) + 1
+
+        return failed
+
+    def get_dataset(self, dataset: str, params: dict) -> List[dict]:
+        query = json.loads(params['query'][0])
+        limit = int(params['limit'][0])
+
+        if dataset == self.drillstring_collection:
+            return [make_drillstring(id) for id in query['_id']['$in']][:limit]
+
+        timestamp = query['timestamp']
+        first = max(timestamp.get('$gte', 0), timestamp.get('$gt', -1) + 1)
+        last = min(timestamp['$lte'], first + limit - 1)
+
+        return [
+            make_wits_record(query['asset_id'], timestamp)
+            for timestamp in range(first, last + 1)
+        ]
+
+
+class FakeDataApiHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, as the data API
+    server: FakeDataApi
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self, method: str) -> None:
+        url = urllib.parse.urlparse(self.path)
+        # /api/v1/data/<provider>/<dataset>/
+        dataset = url.path.strip('/').split('/')[-1]
+        endpoint = f'{method} {dataset}'
+
+        if method == 'POST':
+            self.rfile.read(int(self.headers['Content-Length']))
+
+        time.sleep(self.server.latency)
+
+        if self.server.should_fail(endpoint):
+            self.respond(500, b'{"message":"injected failure"}')
+        elif method == 'POST':
+            self.respond(200, b'{}')
+        else:
+            records = self.server.get_dataset(
+                dataset, urllib.parse.parse_qs(url.query)
+            )
+            self.respond(200, json.dumps(records).encode())
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+
+def make_events(app: str, count: int, records: int, assets: int) -> Iterator[dict]:
+    for index in range(count):
+        asset_id = index % assets + 1
+        start_time = START_TIMESTAMP + index // assets * records
+
+        if app == 'stream':
+            yield {
+                'asset_id': asset_id,
+                'company_id': 2,
+                'records': [
+                    {
+                        key: record[key]
+                        for key in ('timestamp', 'data', 'metadata')
+                    }
+                    for record in (
+                        make_wits_record(asset_id, timestamp)
+                        for timestamp in range(start_time, start_time + records)
+                    )
+                ],
+            }
+        else:
+            yield {
+                'asset_id': asset_id,
+                'company_id': 2,
+                'start_time': start_time,
+                'end_time': start_time + records - 1,
+            }
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Returns the nearest rank percentile of the sorted values."""
+
+    return values[max(0, round(percent / 100 * len(values)) - 1)]
+
+
+def replay(app: str, events: List[dict], rate: float, retries: int, server) -> dict:
+    # modules are imported here, as `src` package is resolved by use_app
+    from corva import Api, ScheduledEvent, StreamTimeEvent
+
+    from benchmarks.pipeline import MemoryCache
+    from lambda_function import lambda_handler
+
+    event_type = StreamTimeEvent if app == 'stream' else ScheduledEvent
+    app_function = inspect.unwrap(lambda_handler)
+    api = Api(
+        api_url=server.url,
+        data_api_url=server.url,
+        api_key='replay',
+        app_key='replay',
+    )
+    cache = MemoryCache()
+
+    latencies = []
+    failed = 0
+    records = 0
+    started = time.perf_counter()
+
+    for index, raw_event in enumerate(events):
+        if rate > 0:
+            time.sleep(max(0.0, started + index / rate - time.perf_counter()))
+
+        event = event_type.parse_obj(raw_event)
+        records += len(raw_event.get('records', ()))
+
+        for _ in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                app_function(event, api, cache)
+            except Exception:
+                failed += 1
+                continue
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+            break
+
+    seconds = time.perf_counter() - started
+    latencies.sort()
+
+    return {
+        'events': len(events),
+        'invocations': len(latencies),
+        'failed_invocations': failed,
+        'seconds': seconds,
+        'events_per_second': len(events) / seconds,
+        'records_per_second': records / seconds if records else None,
+        'latency_p50': percentile(latencies, 50),
+        'latency_p95': percentile(latencies, 95),
+        'latency_p99': percentile(latencies, 99),
+        # Little's law, invocations in flight at the event rate
+        'concurrency': (rate or len(events) / seconds)
+        * statistics.mean(latencies)
+        * len(latencies)
+        / len(events),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--app', choices=('stream', 'scheduled'), required=True)
+    parser.add_argument('--events', type=int, default=50)
+    parser.add_argument('--events-file', type=argparse.FileType())
+    parser.add_argument('--rate', type=float, default=0.0, help='events per second')
+    parser.add_argument('--records', type=int, default=300)
+    parser.add_argument('--assets', type=int, default=2)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--retries', type=int, default=2)
+    parser.add_argument('--output', help='JSON file to write results to')
+    args = parser.parse_args()
+
+    use_app(args.app)
+
+    from src.configuration import SETTINGS
+
+    if args.events_file:
+        events = [json.loads(line) for line in args.events_file if line.strip()]
+    else:
+        events = list(
+            make_events(args.app, args.events, records=args.records, assets=args.assets)
+        )
+
+    server = FakeDataApi(
+        drillstring_collection=SETTINGS.drillstring_collection,
+        latency=args.latency_ms / 1000,
+        failure_rate=args.failure_rate,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        result = replay(
+            args.app, events, rate=args.rate, retries=args.retries, server=server
+        )
+    finally:
+        server.shutdown()
+
+    result = {
+        'app': args.app,
+        **result,
+        'requests': server.requests,
+        'request_failures': server.failures,
+    }
+
+    print(
+        f"{result['events']} events, {result['invocations']} invocations "
+        f"({result['failed_invocations']} failed) in {result['seconds']:.2f}s",
+        file=sys.stderr,
+    )
+    print(
+        f"throughput {result['events_per_second']:.1f} events/s"
+        + (
+            f", {result['records_per_second']:.0f} records/s"
+            if result['records_per_second']
+            else ''
+        ),
+        file=sys.stderr,
+    )
+    print(
+        'latency '
+        + ' '.join(
+            f'p{percent} {result[f"latency_p{percent}"] * 1000:.1f}ms'
+            for percent in (50, 95, 99)
+        )
+        + f", concurrency {result['concurrency']:.2f}",
+        file=sys.stderr,
+    )
+    for endpoint, count in sorted(server.requests.items()):
+        print(
+            f'{endpoint:>40} {count:>6} requests '
+            f'{server.failures.get(endpoint, 0):>4} failed',
+            file=sys.stderr,
+        )
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
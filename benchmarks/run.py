@@ -0,0 +1,86 @@
+"""Runs the pipeline benchmark for both apps and saves results to a file.
+
+Usage: python -m benchmarks.run [--sizes 100 1000] [--output path.json]
+
+Results go to benchmarks/results/<commit>.json by default,
+compare two of them with `python -m benchmarks.compare`.
+"""
+
+import argparse
+import datetime
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+
+from benchmarks import ROOT
+from benchmarks.pipeline import DEFAULT_SIZES
+
+APPS = ('stream', 'scheduled')
+
+
+def git_commit() -> str:
+    return subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    ).stdout.strip() or 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--apps', nargs='+', choices=APPS, default=APPS)
+    parser.add_argument('--output', type=pathlib.Path)
+    args = parser.parse_args()
+
+    commit = git_commit()
+    output = args.output or ROOT / 'benchmarks' / 'results' / f'{commit}.json'
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for app in args.apps:
+            app_output = pathlib.Path(tmp_dir) / f'{app}.json'
+
+            # apps share `src` package name, so each one runs in its own process
+            subprocess.run(
+                [
+                    sys.executable,
+                    '-m',
+                    'benchmarks.pipeline',
+                    '--app',
+                    app,
+                    '--output',
+                    str(app_output),
+                    '--sizes',
+                    *map(str, args.sizes),
+                ],
+                cwd=ROOT,
+                check=True,
+            )
+
+            results.extend(json.loads(app_output.read_text()))
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                'commit': commit,
+                'created_at': datetime.datetime.utcnow().isoformat(),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            },
+            indent=2,
+        )
+    )
+    print(f'Results saved to {output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
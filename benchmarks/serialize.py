@@ -0,0 +1,134 @@
+"""Compares output serialization paths in bytes and records per second.
+
+Usage: python -m benchmarks.serialize [--sizes 1000 10000 100000] [--repeat 3]
+
+Each path turns computed columns into POST bodies:
+  models - ActualGammaDepth models, .dict() and the requests JSON encoder,
+    the original implementation;
+  dicts_json - dict per row, encoded with json.dumps;
+  dicts_orjson - dict per row, encoded with orjson (prerendered_envelope off);
+  prerendered - columns encoded with orjson into a pre-rendered envelope.
+"""
+
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+import orjson
+
+from gamma_depth_engine import build_columns
+from gamma_depth_engine.kernel import (
+    build_actual_gamma_depths,
+    render_actual_gamma_depths,
+)
+from gamma_depth_engine.models import ActualGammaDepth, ActualGammaDepthData
+
+CHUNK_RECORDS = 1000
+ENVELOPE = {
+    'asset_id': 1,
+    'company_id': 2,
+    'provider': 'provider',
+    'collection': 'actual-gamma-depth',
+    'version': 1,
+}
+
+
+def to_bodies(encoded_rows):
+    return [
+        b'[' + b','.join(encoded_rows[start:start + CHUNK_RECORDS]) + b']'
+        for start in range(0, len(encoded_rows), CHUNK_RECORDS)
+    ]
+
+
+def models(columns, gamma_depth):
+    entries = [
+        ActualGammaDepth(
+            **ENVELOPE,
+            data=ActualGammaDepthData(
+                bit_depth=bit_depth, gamma_depth=gamma_depth_val, gamma_ray=gamma_ray
+            ),
+            timestamp=timestamp,
+        )
+        for timestamp, bit_depth, gamma_depth_val, gamma_ray in zip(
+            columns.timestamp.tolist(),
+            columns.bit_depth.tolist(),
+            gamma_depth.tolist(),
+            columns.gamma_ray.tolist(),
+        )
+    ]
+
+    # requests encodes json= bodies with json.dumps
+    return [
+        json.dumps([entry.dict() for entry in entries[start:start + CHUNK_RECORDS]])
+        .encode()
+        for start in range(0, len(entries), CHUNK_RECORDS)
+    ]
+
+
+def dicts_json(columns, gamma_depth):
+    rows = build_actual_gamma_depths(columns, gamma_depth, **ENVELOPE)
+
+    return to_bodies([json.dumps(row).encode() for row in rows])
+
+
+def dicts_orjson(columns, gamma_depth):
+    rows = build_actual_gamma_depths(columns, gamma_depth, **ENVELOPE)
+
+    return to_bodies([orjson.dumps(row) for row in rows])
+
+
+def prerendered(columns, gamma_depth):
+    return to_bodies(render_actual_gamma_depths(columns, gamma_depth, **ENVELOPE))
+
+
+def make_columns(size: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    bit_depth = np.round(1000 + np.cumsum(rng.uniform(0, 0.05, size)), 2)
+
+    columns = build_columns(
+        count=size,
+        timestamps=range(1600000000, 1600000000 + size),
+        bit_depths=bit_depth,
+        gamma_rays=np.round(rng.uniform(20, 150, size), 2),
+        drillstring_ids=('1' for _ in range(size)),
+    )
+
+    return columns, bit_depth - 55.5
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"records":>8} {"path":>13} {"seconds":>9} {"MB/s":>8} {"records/s":>11}')
+    for size in args.sizes:
+        columns, gamma_depth = make_columns(size)
+        expected = None
+
+        for fn in (models, dicts_json, dicts_orjson, prerendered):
+            seconds = math.inf
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                bodies = fn(columns, gamma_depth)
+                seconds = min(seconds, time.perf_counter() - start)
+
+            # every path must post the same documents
+            documents = [row for body in bodies for row in json.loads(body)]
+            assert expected is None or documents == expected, fn.__name__
+            expected = documents
+
+            size_bytes = sum(len(body) for body in bodies)
+            print(
+                f'{size:>8} {fn.__name__:>13} {seconds:>9.4f} '
+                f'{size_bytes / seconds / 1e6:>8.1f} {size / seconds:>11.0f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
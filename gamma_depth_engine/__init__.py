@@ -0,0 +1,30 @@
+"""I/O free gamma depth computation, shared by the stream and scheduled apps."""
+
+from gamma_depth_engine.engine import DedupeResult, GammaDepthResult, dedupe, run
+from gamma_depth_engine.kernel import (
+    ColumnsBuilder,
+    GammaDepthColumns,
+    GammaDepthGroups,
+    build_columns,
+    dedupe_timestamps,
+    select,
+    to_columns,
+)
+from gamma_depth_engine.ranges import Range, in_ranges, merge_ranges
+
+__all__ = [
+    'ColumnsBuilder',
+    'DedupeResult',
+    'GammaDepthColumns',
+    'GammaDepthGroups',
+    'GammaDepthResult',
+    'Range',
+    'build_columns',
+    'dedupe',
+    'dedupe_timestamps',
+    'in_ranges',
+    'merge_ranges',
+    'run',
+    'select',
+    'to_columns',
+]
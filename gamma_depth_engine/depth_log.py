@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, NamedTuple
+
+# numpy is imported by the functions using it, off the cold start path
+if TYPE_CHECKING:
+    import numpy as np
+
+# gamma ray summary of a depth bin: records, sum, min and max, as stored in JSON
+BinSummary = List[float]
+
+
+class DepthBins(NamedTuple):
+    """Gamma ray summaries of gamma depth bins, one element per bin."""
+
+    index: np.ndarray  # floor of gamma depth / bin size, ascending
+    records: np.ndarray
+    gamma_ray_sum: np.ndarray
+    gamma_ray_min: np.ndarray
+    gamma_ray_max: np.ndarray
+
+
+def bin_by_depth(
+    gamma_depth: np.ndarray, gamma_ray: np.ndarray, bin_size: float
+) -> DepthBins:
+    """Summarizes gamma ray of the records per gamma depth bin.
+
+    Bins are aligned to multiples of bin_size. Records may come in any order,
+    only bins with records are returned.
+    """
+
+    import numpy as np
+
+    index = np.floor_divide(gamma_depth, bin_size).astype(np.int64)
+
+    if not len(index):
+        return DepthBins(
+            index=index,
+            records=np.zeros(0, dtype=np.int64),
+            gamma_ray_sum=gamma_ray[:0],
+            gamma_ray_min=gamma_ray[:0],
+            gamma_ray_max=gamma_ray[:0],
+        )
+
+    order = np.argsort(index, kind='stable')
+    index, gamma_ray = index[order], gamma_ray[order]
+
+    starts = np.flatnonzero(np.concatenate(([True], index[1:] != index[:-1])))
+
+    return DepthBins(
+        index=index[starts],
+        records=np.diff(np.append(starts, len(index))),
+        gamma_ray_sum=np.add.reduceat(gamma_ray, starts),
+        gamma_ray_min=np.minimum.reduceat(gamma_ray, starts),
+        gamma_ray_max=np.maximum.reduceat(gamma_ray, starts),
+    )
+
+
+def select_bins(bins: DepthBins, mask: np.ndarray) -> DepthBins:
+    return DepthBins(*(column[mask] for column in bins))
+
+
+def merge_bins(
+    stored: Dict[int, BinSummary], bins: DepthBins
+) -> Dict[int, BinSummary]:
+    """Returns stored summaries with the bins merged in, stored is left as is."""
+
+    merged = dict(stored)
+
+    for index, records, total, minimum, maximum in zip(
+        bins.index.tolist(),
+        bins.records.tolist(),
+        bins.gamma_ray_sum.tolist(),
+        bins.gamma_ray_min.tolist(),
+        bins.gamma_ray_max.tolist(),
+    ):
+        if (summary := merged.get(index)) is not None:
+            records += summary[0]
+            total += summary[1]
+            minimum = min(minimum, summary[2])
+            maximum = max(maximum, summary[3])
+
+        merged[index] = [records, total, minimum, maximum]
+
+    return merged
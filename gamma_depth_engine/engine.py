@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Mapping, NamedTuple, Optional, Sequence
+
+import orjson
+
+from gamma_depth_engine.kernel import (
+    GammaDepthColumns,
+    aggregate,
+    build_actual_gamma_depths,
+    build_documents,
+    compute_gamma_depth,
+    decimation_starts,
+    dedupe_timestamps,
+    depth_bin_starts,
+    group_data,
+    render_actual_gamma_depths,
+    render_documents,
+    select,
+    to_offsets,
+)
+from gamma_depth_engine.ranges import Range, in_ranges
+
+# numpy is imported by the functions using it, off the cold start path
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class DedupeResult(NamedTuple):
+    columns: GammaDepthColumns  # records left, sorted by timestamp
+    duplicates: int  # records, that repeat a timestamp of the batch
+    already_written: int  # records within the written ranges
+
+
+def dedupe(columns: GammaDepthColumns, written: Sequence[Range]) -> DedupeResult:
+    """Drops duplicate timestamps and records within the written ranges."""
+
+    deduped = dedupe_timestamps(columns)
+    duplicates = len(columns.timestamp) - len(deduped.timestamp)
+
+    mask = in_ranges(deduped.timestamp, written)
+
+    if not mask.any():
+        return DedupeResult(columns=deduped, duplicates=duplicates, already_written=0)
+
+    return DedupeResult(
+        columns=select(deduped, ~mask),
+        duplicates=duplicates,
+        already_written=int(mask.sum()),
+    )
+
+
+class GammaDepthResult(NamedTuple):
+    rows: List[bytes]  # JSON encoded actual gamma depth documents
+    records_without_offset: int  # records, that kept their bit depth
+    # timestamps of the first and the last record of each row
+    first_timestamp: np.ndarray
+    last_timestamp: np.ndarray
+    gamma_depth: np.ndarray  # of each record, in the order of the columns
+
+
+def run(
+    columns: GammaDepthColumns,
+    id_to_distance: Mapping[str, Optional[float]],
+    *,
+    asset_id: int,
+    company_id: int,
+    provider: str,
+    collection: str,
+    version: int,
+    prerendered_envelope: bool = True,
+    decimation: int = 1,
+    depth_bin_size: float = 0.0,
+) -> GammaDepthResult:
+    """Computes actual gamma depth documents of the records.
+
+    Does no I/O: records come in as columns and drillstrings as an index of
+    gamma sensor to bit distances. A record may be tagged with a drillstring,
+    that got deleted or has no MWD gamma sensor. Its distance is None or missing,
+    so the record keeps its bit depth.
+
+    By default each record makes a row. With depth_bin_size, consecutive records
+    within the same gamma depth bin are aggregated into a row, otherwise
+    with decimation, every decimation consecutive records are. Aggregated rows
+    carry means of depths and gamma ray, gamma ray min, max and record count,
+    and the timestamp of the first record. Groups never span calls, so a bin
+    split between two batches makes two rows.
+
+    With prerendered_envelope, rows are rendered into a template of the fields
+    shared by all of them. Otherwise each row is built as a dict and encoded.
+    Columns must be sorted by timestamp, as dedupe returns them.
+    """
+
+    import numpy as np
+
+    offsets = to_offsets(
+        drillstring_ids=columns.drillstring_ids, id_to_distance=id_to_distance
+    )
+
+    gamma_depth = compute_gamma_depth(
+        bit_depth=columns.bit_depth,
+        drillstring_index=columns.drillstring_index,
+        offsets=offsets,
+    )
+
+    records_without_offset = int(np.isnan(offsets)[columns.drillstring_index].sum())
+    envelope = dict(
+        asset_id=asset_id,
+        company_id=company_id,
+        provider=provider,
+        collection=collection,
+        version=version,
+    )
+
+    if len(columns.timestamp) and (depth_bin_size > 0 or decimation > 1):
+        groups = aggregate(
+            columns=columns,
+            gamma_depth=gamma_depth,
+            starts=(
+                depth_bin_starts(gamma_depth, bin_size=depth_bin_size)
+                if depth_bin_size > 0
+                else decimation_starts(len(columns.timestamp), factor=decimation)
+            ),
+        )
+
+        if prerendered_envelope:
+            rows = render_documents(
+                timestamp=groups.first_timestamp, data=group_data(groups), **envelope
+            )
+        else:
+            rows = [
+                orjson.dumps(row)
+                for row in build_documents(
+                    timestamp=groups.first_timestamp,
+                    data=group_data(groups),
+                    **envelope,
+                )
+            ]
+
+        return GammaDepthResult(
+            rows=rows,
+            records_without_offset=records_without_offset,
+            first_timestamp=groups.first_timestamp,
+            last_timestamp=groups.last_timestamp,
+            gamma_depth=gamma_depth,
+        )
+
+    if prerendered_envelope:
+        rows = render_actual_gamma_depths(
+            columns=columns, gamma_depth=gamma_depth, **envelope
+        )
+    else:
+        rows = [
+            orjson.dumps(row)
+            for row in build_actual_gamma_depths(
+                columns=columns, gamma_depth=gamma_depth, **envelope
+            )
+        ]
+
+    return GammaDepthResult(
+        rows=rows,
+        records_without_offset=records_without_offset,
+        first_timestamp=columns.timestamp,
+        last_timestamp=columns.timestamp,
+        gamma_depth=gamma_depth,
+    )
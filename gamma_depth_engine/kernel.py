@@ -0,0 +1,436 @@
+from __future__ import annotations
+
+import array
+import sys
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+import orjson
+
+# numpy is imported by the functions using it, off the cold start path
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class GammaDepthColumns(NamedTuple):
+    """Records converted into arrays, one element per record."""
+
+    timestamp: np.ndarray
+    bit_depth: np.ndarray
+    gamma_ray: np.ndarray
+    drillstring_index: np.ndarray  # positions in drillstring_ids
+    # unique drillstring ids in order of appearance, interned, so warm invocations
+    # share a single string per id, no matter how many records or pages refer to it
+    drillstring_ids: List[str]
+
+
+def build_columns(
+    count: int,
+    timestamps: Iterable[int],
+    bit_depths: Iterable[float],
+    gamma_rays: Iterable[float],
+    drillstring_ids: Iterable[str],
+) -> GammaDepthColumns:
+    """Builds columns from per record values, each iterable yields count items."""
+
+    import numpy as np
+
+    id_to_index: Dict[str, int] = {}
+    drillstring_index = np.fromiter(
+        (
+            id_to_index.setdefault(drillstring_id, len(id_to_index))
+            for drillstring_id in drillstring_ids
+        ),
+        dtype=np.intp,
+        count=count,
+    )
+
+    return GammaDepthColumns(
+        timestamp=np.fromiter(timestamps, dtype=np.int64, count=count),
+        bit_depth=np.fromiter(bit_depths, dtype=np.float64, count=count),
+        gamma_ray=np.fromiter(gamma_rays, dtype=np.float64, count=count),
+        drillstring_index=drillstring_index,
+        drillstring_ids=[sys.intern(id) for id in id_to_index],
+    )
+
+
+class ColumnsBuilder:
+    """Builds columns from records appended one at a time.
+
+    For records, that are not all in memory at once and whose count is unknown.
+    Values are kept in compact arrays, not in Python objects.
+    """
+
+    def __init__(self):
+        self._timestamp = array.array('q')
+        self._bit_depth = array.array('d')
+        self._gamma_ray = array.array('d')
+        self._drillstring_index = array.array('q')
+        self._id_to_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._timestamp)
+
+    def append(
+        self, timestamp: int, bit_depth: float, gamma_ray: float, drillstring_id: str
+    ) -> None:
+        self._timestamp.append(timestamp)
+        self._bit_depth.append(bit_depth)
+        self._gamma_ray.append(gamma_ray)
+        self._drillstring_index.append(
+            self._id_to_index.setdefault(drillstring_id, len(self._id_to_index))
+        )
+
+    def build(self) -> GammaDepthColumns:
+        import numpy as np
+
+        return GammaDepthColumns(
+            timestamp=np.array(self._timestamp, dtype=np.int64),
+            bit_depth=np.array(self._bit_depth, dtype=np.float64),
+            gamma_ray=np.array(self._gamma_ray, dtype=np.float64),
+            drillstring_index=np.array(self._drillstring_index, dtype=np.intp),
+            drillstring_ids=[sys.intern(id) for id in self._id_to_index],
+        )
+
+
+def to_columns(records: Sequence) -> GammaDepthColumns:
+    """Builds columns from parsed WITS records of either app.
+
+    Records must have timestamp, data.bit_depth, data.gamma_ray
+    and metadata.drillstring_id attributes.
+    """
+
+    return build_columns(
+        count=len(records),
+        timestamps=(record.timestamp for record in records),
+        bit_depths=(record.data.bit_depth for record in records),
+        gamma_rays=(record.data.gamma_ray for record in records),
+        drillstring_ids=(record.metadata.drillstring_id for record in records),
+    )
+
+
+def select(columns: GammaDepthColumns, index: np.ndarray) -> GammaDepthColumns:
+    """Returns columns of the records picked by a boolean mask or positions.
+
+    Drillstring ids are kept as is, unused ones do no harm.
+    """
+
+    return columns._replace(
+        timestamp=columns.timestamp[index],
+        bit_depth=columns.bit_depth[index],
+        gamma_ray=columns.gamma_ray[index],
+        drillstring_index=columns.drillstring_index[index],
+    )
+
+
+def dedupe_timestamps(columns: GammaDepthColumns) -> GammaDepthColumns:
+    """Sorts records by timestamp and keeps the last record of each timestamp.
+
+    Records of a batch share the asset, so timestamp alone identifies a record.
+    Batches usually come in time order, then it is a single linear pass
+    and no copy is made if there are no duplicates.
+    """
+
+    import numpy as np
+
+    if (columns.timestamp[1:] < columns.timestamp[:-1]).any():
+        # stable sort keeps duplicates in arrival order, so the last one wins
+        columns = select(columns, np.argsort(columns.timestamp, kind='stable'))
+
+    keep = np.empty(len(columns.timestamp), dtype=bool)
+    np.not_equal(columns.timestamp[1:], columns.timestamp[:-1], out=keep[:-1])
+    keep[-1:] = True
+
+    if keep.all():
+        return columns
+
+    return select(columns, keep)
+
+
+def to_offsets(
+    drillstring_ids: Sequence[str], id_to_distance: Mapping[str, Optional[float]]
+) -> np.ndarray:
+    """Returns gamma sensor to bit distance per drillstring, NaN if there is none."""
+
+    import numpy as np
+
+    return np.array(
+        [
+            np.nan if (distance := id_to_distance.get(drillstring_id)) is None
+            else distance
+            for drillstring_id in drillstring_ids
+        ],
+        dtype=np.float64,
+    )
+
+
+def compute_gamma_depth(
+    bit_depth: np.ndarray, drillstring_index: np.ndarray, offsets: np.ndarray
+) -> np.ndarray:
+    """Computes gamma depth of each record.
+
+    Records of drillstrings with no MWD gamma sensor keep their bit depth.
+    """
+
+    import numpy as np
+
+    return bit_depth - np.nan_to_num(offsets, nan=0.0)[drillstring_index]
+
+
+class GammaDepthGroups(NamedTuple):
+    """Aggregates of consecutive records, one element per group.
+
+    Gamma ray, bit and gamma depths are means of the group records.
+    """
+
+    first_timestamp: np.ndarray
+    last_timestamp: np.ndarray
+    bit_depth: np.ndarray
+    gamma_depth: np.ndarray
+    gamma_ray: np.ndarray
+    gamma_ray_min: np.ndarray
+    gamma_ray_max: np.ndarray
+    records: np.ndarray
+
+
+def decimation_starts(count: int, factor: int) -> np.ndarray:
+    """Returns first positions of groups of factor consecutive records."""
+
+    import numpy as np
+
+    return np.arange(0, count, factor, dtype=np.intp)
+
+
+def depth_bin_starts(gamma_depth: np.ndarray, bin_size: float) -> np.ndarray:
+    """Returns first positions of runs of records within the same gamma depth bin.
+
+    Bins are aligned to multiples of bin_size. Records are taken in time order,
+    so a bin drilled again after a trip makes a group of its own.
+    """
+
+    import numpy as np
+
+    bins = np.floor_divide(gamma_depth, bin_size)
+
+    return np.flatnonzero(
+        np.concatenate(([True], bins[1:] != bins[:-1]))
+    ).astype(np.intp)
+
+
+def aggregate(
+    columns: GammaDepthColumns, gamma_depth: np.ndarray, starts: np.ndarray
+) -> GammaDepthGroups:
+    """Aggregates records from each start up to the next one in a single pass."""
+
+    import numpy as np
+
+    records = np.diff(np.append(starts, len(columns.timestamp)))
+    ends = starts + records - 1
+
+    return GammaDepthGroups(
+        first_timestamp=columns.timestamp[starts],
+        last_timestamp=columns.timestamp[ends],
+        bit_depth=np.add.reduceat(columns.bit_depth, starts) / records,
+        gamma_depth=np.add.reduceat(gamma_depth, starts) / records,
+        gamma_ray=np.add.reduceat(columns.gamma_ray, starts) / records,
+        gamma_ray_min=np.minimum.reduceat(columns.gamma_ray, starts),
+        gamma_ray_max=np.maximum.reduceat(columns.gamma_ray, starts),
+        records=records,
+    )
+
+
+def group_data(groups: GammaDepthGroups) -> Dict[str, np.ndarray]:
+    """Returns data fields of the grouped documents."""
+
+    return {
+        'bit_depth': groups.bit_depth,
+        'gamma_depth': groups.gamma_depth,
+        'gamma_ray': groups.gamma_ray,
+        'gamma_ray_min': groups.gamma_ray_min,
+        'gamma_ray_max': groups.gamma_ray_max,
+        'records': groups.records,
+    }
+
+
+def build_documents(
+    timestamp: np.ndarray,
+    data: Mapping[str, np.ndarray],
+    asset_id: int,
+    company_id: int,
+    provider: str,
+    collection: str,
+    version: int,
+) -> List[dict]:
+    """Returns documents with one data field per column of data."""
+
+    fields = list(data)
+
+    return [
+        {
+            'asset_id': asset_id,
+            'collection': collection,
+            'company_id': company_id,
+            'data': dict(zip(fields, values)),
+            'provider': provider,
+            'timestamp': timestamp_val,
+            'version': version,
+        }
+        for timestamp_val, *values in zip(
+            timestamp.tolist(), *(column.tolist() for column in data.values())
+        )
+    ]
+
+
+def build_actual_gamma_depths(
+    columns: GammaDepthColumns,
+    gamma_depth: np.ndarray,
+    asset_id: int,
+    company_id: int,
+    provider: str,
+    collection: str,
+    version: int,
+) -> List[dict]:
+    """Returns actual gamma depth documents, equal to ActualGammaDepth.dict()."""
+
+    return [
+        {
+            'asset_id': asset_id,
+            'collection': collection,
+            'company_id': company_id,
+            'data': {
+                'bit_depth': bit_depth,
+                'gamma_depth': gamma_depth_val,
+                'gamma_ray': gamma_ray,
+            },
+            'provider': provider,
+            'timestamp': timestamp,
+            'version': version,
+        }
+        for timestamp, bit_depth, gamma_depth_val, gamma_ray in zip(
+            columns.timestamp.tolist(),
+            columns.bit_depth.tolist(),
+            gamma_depth.tolist(),
+            columns.gamma_ray.tolist(),
+        )
+    ]
+
+
+def _encode_column(column: np.ndarray) -> List[bytes]:
+    """Returns JSON encoded values of the column, encoding all of them at once."""
+
+    import numpy as np
+
+    if not len(column):
+        return []
+
+    # numbers never contain commas, so the encoded array splits into values
+    return orjson.dumps(
+        np.ascontiguousarray(column), option=orjson.OPT_SERIALIZE_NUMPY
+    )[1:-1].split(b',')
+
+
+def _render_envelope(
+    data_fields: Sequence[str],
+    asset_id: int,
+    company_id: int,
+    provider: str,
+    collection: str,
+    version: int,
+) -> bytes:
+    """Returns %-template of a document with the fields shared by all rows filled.
+
+    Placeholders are the data fields in the given order, then the timestamp.
+    """
+
+    def encode(value) -> bytes:
+        return orjson.dumps(value).replace(b'%', b'%%')
+
+    return b''.join(
+        (
+            b'{"asset_id":',
+            encode(asset_id),
+            b',"collection":',
+            encode(collection),
+            b',"company_id":',
+            encode(company_id),
+            b',"data":{',
+            b','.join(b'"%s":%%b' % field.encode() for field in data_fields),
+            b'}',
+            b',"provider":',
+            encode(provider),
+            b',"timestamp":%b,"version":',
+            encode(version),
+            b'}',
+        )
+    )
+
+
+def render_documents(
+    timestamp: np.ndarray,
+    data: Mapping[str, np.ndarray],
+    asset_id: int,
+    company_id: int,
+    provider: str,
+    collection: str,
+    version: int,
+) -> List[bytes]:
+    """Returns JSON encoded documents, the same build_documents returns.
+
+    No dict is built: the envelope is rendered once,
+    and each column is encoded in a single call.
+    """
+
+    template = _render_envelope(
+        data_fields=list(data),
+        asset_id=asset_id,
+        company_id=company_id,
+        provider=provider,
+        collection=collection,
+        version=version,
+    )
+
+    return [
+        template % values
+        for values in zip(
+            *(_encode_column(column) for column in data.values()),
+            _encode_column(timestamp),
+        )
+    ]
+
+
+def render_actual_gamma_depths(
+    columns: GammaDepthColumns,
+    gamma_depth: np.ndarray,
+    asset_id: int,
+    company_id: int,
+    provider: str,
+    collection: str,
+    version: int,
+) -> List[bytes]:
+    """Returns JSON encoded actual gamma depth documents.
+
+    Same documents as build_actual_gamma_depths returns, rendered by
+    render_documents.
+    """
+
+    return render_documents(
+        timestamp=columns.timestamp,
+        data={
+            'bit_depth': columns.bit_depth,
+            'gamma_depth': gamma_depth,
+            'gamma_ray': columns.gamma_ray,
+        },
+        asset_id=asset_id,
+        company_id=company_id,
+        provider=provider,
+        collection=collection,
+        version=version,
+    )
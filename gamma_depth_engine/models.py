@@ -0,0 +1,63 @@
+from typing import List, Optional
+
+import pydantic
+
+
+class DrillstringDataComponent(pydantic.BaseModel):
+    family: str
+    gamma_sensor_to_bit_distance: Optional[float]
+    has_gamma_sensor: Optional[bool] = False
+
+    @property
+    def is_mwd_with_gamma_sensor(self):
+        return (
+            self.family == 'mwd'
+            and self.has_gamma_sensor
+            and self.gamma_sensor_to_bit_distance is not None
+        )
+
+
+class DrillstringData(pydantic.BaseModel):
+    components: List[DrillstringDataComponent]
+
+
+class Drillstring(pydantic.BaseModel):
+    """Needed subset of drillstring response fields"""
+
+    id: str = pydantic.Field(..., alias="_id")
+    data: DrillstringData
+
+    @property
+    def mwd_with_gamma_sensor(self) -> Optional[DrillstringDataComponent]:
+        """Returns MWD component with a gamma sensor."""
+
+        for component in self.data.components:
+            if component.is_mwd_with_gamma_sensor:
+                return component
+
+        return None
+
+    @property
+    def gamma_sensor_to_bit_distance(self) -> Optional[float]:
+        """Returns gamma sensor to bit distance of MWD component with a gamma sensor."""
+
+        if mwd_with_gamma_sensor := self.mwd_with_gamma_sensor:
+            return mwd_with_gamma_sensor.gamma_sensor_to_bit_distance
+
+        return None
+
+
+class ActualGammaDepthData(pydantic.BaseModel):
+    bit_depth: float
+    gamma_depth: float
+    gamma_ray: float
+
+
+class ActualGammaDepth(pydantic.BaseModel):
+    asset_id: int
+    collection: str
+    company_id: int
+    data: ActualGammaDepthData
+    provider: str
+    timestamp: int
+    version: int
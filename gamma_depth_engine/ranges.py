@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, List, Sequence, Tuple
+
+# numpy is imported by the functions using it, off the cold start path
+if TYPE_CHECKING:
+    import numpy as np
+
+# inclusive timestamp range
+Range = Tuple[int, int]
+
+
+def merge_ranges(
+    ranges: Iterable[Range], new_ranges: Iterable[Range], max_ranges: int
+) -> List[Range]:
+    """Returns sorted disjoint ranges, covering both arguments.
+
+    Overlapping and adjacent ranges are merged into one. Only max_ranges latest
+    ranges are kept, as forgetting a range costs a repeated write, not a lost one.
+    """
+
+    merged: List[Range] = []
+    for start, end in sorted([*ranges, *new_ranges]):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged[-max_ranges:] if max_ranges > 0 else []
+
+
+def in_ranges(timestamps: np.ndarray, ranges: Sequence[Range]) -> np.ndarray:
+    """Returns a mask of timestamps, that fall into the sorted disjoint ranges."""
+
+    import numpy as np
+
+    if not ranges:
+        return np.zeros(len(timestamps), dtype=bool)
+
+    starts, ends = np.array(ranges, dtype=np.int64).T
+
+    # position of the last range, that starts at or before the timestamp
+    position = np.searchsorted(starts, timestamps, side='right') - 1
+
+    return (position >= 0) & (timestamps <= ends[np.maximum(position, 0)])
@@ -0,0 +1,6 @@
+"""Data api, Corva cache, metrics and profiling helpers of the stream and scheduled
+apps.
+
+Modules are imported one by one, so an app loads only the ones it uses,
+e.g. the profilers only when an asset is profiled.
+"""
@@ -0,0 +1,33 @@
+from typing import Callable, Dict, List, Optional
+
+from corva import Cache
+from corva.state.redis_adapter import RedisAdapter
+
+
+def update_entries(
+    cache: Cache,
+    keys: List[str],
+    update: Callable[[Dict[str, Optional[str]]], Dict[str, str]],
+) -> None:
+    """Stores update(stored values of the keys), atomically across invocations.
+
+    corva Cache has no compare and set, so concurrent invocations of an asset
+    would overwrite each other's load, modify and store. Here the asset hash
+    is watched while the keys are read, and if anything writes it before
+    the new values are stored, the update runs again on the fresh values.
+    update must have no side effects, it may be called more than once.
+    """
+
+    redis = cache.redis
+    name = redis.default_name
+
+    def transaction(pipe) -> None:
+        stored = dict(zip(keys, pipe.hmget(name, keys)))
+        values = update(stored)
+
+        pipe.multi()
+        pipe.hset(name, mapping=values)
+        # as corva Cache.store does, the hash expires after its last write
+        pipe.expire(name, RedisAdapter.DEFAULT_EXPIRY)
+
+    redis.transaction(transaction, name)
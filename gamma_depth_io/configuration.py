@@ -0,0 +1,68 @@
+from typing import Dict, Set
+
+import pydantic
+
+
+class AppSettings(pydantic.BaseSettings):
+    """Settings of both apps, each app adds its own ones."""
+
+    provider: str
+    actual_gamma_depth_collection: str = 'actual-gamma-depth'
+    drillstring_collection: str = 'data.drillstring'
+    drillstring_cache_ttl: int = 3600  # seconds, 0 disables the cache
+    # seconds to remember ids the api did not return, e.g. not yet replicated
+    # drillstrings. their records keep bit depth meanwhile, 0 refetches each time
+    drillstring_not_found_ttl: int = 60
+    drillstring_fetch_workers: int = 4  # concurrent requests of 100 ids each
+    # asset id to the time of its last drillstring correction, epoch seconds,
+    # e.g. DRILLSTRING_INVALIDATED_AT='{"1": 1700000000}'. offsets resolved
+    # before it are dropped from memory and cache and fetched again.
+    drillstring_invalidated_at: Dict[int, float] = {}
+    version: int = 1
+    post_chunk_max_records: int = 1000
+    post_chunk_max_bytes: int = 1_000_000
+    post_workers: int = 4
+    # attempts of each data api request, transient errors are retried with
+    # exponential backoff instead of failing and reinvoking the whole lambda
+    request_attempts: int = 3
+    request_backoff: float = 0.5  # seconds before the second attempt
+    # render output rows into a template of the fields shared by all of them
+    prerendered_envelope: bool = True
+    # aggregate consecutive records into a row of mean, min and max gamma ray:
+    # runs within the same gamma depth bin, if the bin size is set,
+    # otherwise every decimation records. groups do not span invocations.
+    output_depth_bin_size: float = 0.0  # 0 posts a row per record
+    output_decimation: int = 1
+    # gamma depth bin size of the depth indexed gamma log in cache, 0 disables it.
+    # needs written ranges, so that reposted records are not counted again
+    gamma_log_bin_size: float = 0.0
+    # companion dataset, updated log blocks are posted to, '' keeps them in cache
+    gamma_log_collection: str = 'actual-gamma-depth-log'
+    # remember posted timestamp ranges, so retries post only what is missing
+    written_ranges_enabled: bool = True
+    # log per phase timings and counters of each invocation
+    metrics_enabled: bool = False
+    # log cProfile and tracemalloc summaries of invocations of these assets,
+    # e.g. PROFILE_ASSET_IDS='[1, 2]'. other assets are not slowed down.
+    profile_asset_ids: Set[int] = set()
+    profile_top: int = 20  # functions and allocation sites in the summary
+    profile_dir: str = ''  # also dump full cProfile stats here, e.g. /tmp/profiles
+    # validate only the first record of each event or page and skip models
+    # for the rest
+    trusted_input: bool = False
+
+    @pydantic.root_validator(skip_on_failure=True)
+    def _gamma_log_needs_written_ranges(cls, values: dict) -> dict:
+        if values['gamma_log_bin_size'] > 0 and not values['written_ranges_enabled']:
+            raise ValueError(
+                'gamma_log_bin_size needs written_ranges_enabled, '
+                'otherwise reposted records are counted again.'
+            )
+
+        return values
+
+    @property
+    def post_concurrency(self) -> int:
+        """Returns the most chunk posts in flight at once in an invocation."""
+
+        return self.post_workers
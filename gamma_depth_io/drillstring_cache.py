@@ -0,0 +1,99 @@
+import json
+import time
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from corva import Cache
+
+
+class DrillstringEntry(NamedTuple):
+    offset: Optional[float]  # gamma sensor to bit distance
+    resolved_at: float  # when the offset was fetched from the api
+    expires_at: float
+
+
+def resolved_entries(
+    offsets: Dict[str, Optional[float]], ttl: int
+) -> Dict[str, DrillstringEntry]:
+    """Returns entries of the offsets, that were just fetched."""
+
+    now = time.time()
+    entry = DrillstringEntry(offset=None, resolved_at=now, expires_at=now + ttl)
+
+    return {
+        drillstring_id: entry._replace(offset=offset)
+        for drillstring_id, offset in offsets.items()
+    }
+
+
+class DrillstringCache:
+    """Stores resolved gamma sensor to bit distances of drillstrings in Corva cache.
+
+    Entries are keyed by asset and drillstring id. None value means that
+    the drillstring has no MWD component with a gamma sensor. Each entry expires
+    on its own after ttl seconds, as redis expiry applies to the whole cache.
+    Entries resolved before invalidated_at, e.g. before a drillstring correction,
+    are treated as missing.
+    """
+
+    KEY_PREFIX = 'drillstring'
+
+    def __init__(
+        self, cache: Cache, asset_id: int, ttl: int, invalidated_at: float = 0.0
+    ):
+        self.cache = cache
+        self.asset_id = asset_id
+        self.ttl = ttl
+        self.invalidated_at = invalidated_at
+
+    def _key(self, drillstring_id: str) -> str:
+        return f'{self.KEY_PREFIX}/{self.asset_id}/{drillstring_id}'
+
+    def get_many(self, drillstring_ids: Iterable[str]) -> Dict[str, DrillstringEntry]:
+        """Returns cached entries, missing, expired and invalidated are left out."""
+
+        if self.ttl <= 0:
+            return {}
+
+        drillstring_ids = list(drillstring_ids)
+        if not drillstring_ids:
+            return {}
+
+        # a single HMGET of the keys, corva Cache loads one key or the whole hash,
+        # which also holds gamma log blocks and written ranges of the asset
+        redis = self.cache.redis
+        values = redis.hmget(
+            redis.default_name,
+            [self._key(drillstring_id) for drillstring_id in drillstring_ids],
+        )
+        now = time.time()
+
+        entries = {}
+        for drillstring_id, value in zip(drillstring_ids, values):
+            if value is None:
+                continue
+
+            entry = json.loads(value)
+            # entries stored before invalidation was added count as the oldest
+            resolved_at = entry.get('resolved_at', 0.0)
+
+            if entry['expires_at'] <= now or resolved_at < self.invalidated_at:
+                continue
+
+            entries[drillstring_id] = DrillstringEntry(
+                offset=entry['offset'],
+                resolved_at=resolved_at,
+                expires_at=entry['expires_at'],
+            )
+
+        return entries
+
+    def set_many(self, entries: Dict[str, DrillstringEntry]) -> None:
+        if self.ttl <= 0 or not entries:
+            return
+
+        self.cache.store(
+            mapping={
+                self._key(drillstring_id): json.dumps(entry._asdict())
+                for drillstring_id, entry in entries.items()
+            }
+        )
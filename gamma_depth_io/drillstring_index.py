@@ -0,0 +1,240 @@
+import concurrent.futures
+import functools
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+import pydantic
+from corva import Api, Cache
+
+from gamma_depth_io import retry
+from gamma_depth_io.configuration import AppSettings
+from gamma_depth_io.drillstring_cache import (
+    DrillstringCache,
+    DrillstringEntry,
+    resolved_entries,
+)
+
+DRILLSTRINGS_LIMIT = 100  # per request, ids are fetched in chunks of this size
+MAX_WARM_ASSETS = 100
+
+
+class DrillstringIndex:
+    """Drillstring id to gamma sensor to bit distance index of an asset.
+
+    None distance means the drillstring has no MWD gamma sensor or got deleted.
+    Entries expire after ttl seconds since they were fetched from the api,
+    the same time as the ones in DrillstringCache.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.entries: Dict[str, DrillstringEntry] = {}
+        self.invalidated_at = 0.0
+
+    def get_many(self, drillstring_ids: Iterable[str]) -> Dict[str, Optional[float]]:
+        """Returns indexed distances, missing and expired entries are left out."""
+
+        now = time.time()
+
+        return {
+            drillstring_id: entry.offset
+            for drillstring_id in drillstring_ids
+            if (entry := self.entries.get(drillstring_id)) is not None
+            and entry.expires_at > now
+        }
+
+    def update(self, entries: Dict[str, DrillstringEntry]) -> None:
+        self.entries.update(entries)
+
+    def invalidate(self, invalidated_at: float) -> None:
+        """Drops entries resolved before the time, if it is a new one."""
+
+        if invalidated_at <= self.invalidated_at:
+            return
+
+        self.entries = {
+            drillstring_id: entry
+            for drillstring_id, entry in self.entries.items()
+            if entry.resolved_at >= invalidated_at
+        }
+        self.invalidated_at = invalidated_at
+
+
+# indexes live in process memory, so warm containers reuse them between invocations
+_INDEXES: Dict[int, DrillstringIndex] = {}
+
+
+def get_index(asset_id: int, ttl: int) -> DrillstringIndex:
+    index = _INDEXES.get(asset_id)
+
+    if index is None or index.ttl != ttl:
+        if len(_INDEXES) >= MAX_WARM_ASSETS:
+            # forget the asset indexed first
+            del _INDEXES[next(iter(_INDEXES))]
+
+        index = _INDEXES[asset_id] = DrillstringIndex(ttl=ttl)
+
+    return index
+
+
+class FetchedDistances(NamedTuple):
+    distances: Dict[str, Optional[float]]  # of the drillstrings found
+    not_found: Set[str]  # ids of deleted or not yet replicated drillstrings
+
+
+def fetch_chunk(
+    api: Api,
+    asset_id: int,
+    drillstring_ids: List[str],
+    fields: str,
+    settings: AppSettings,
+) -> FetchedDistances:
+    """Fetches drillstrings and returns their gamma sensor to bit distances.
+
+    Drillstrings missing from a complete response are not found.
+    """
+
+    # imported on the first fetch, as drillstrings are mostly resolved from cache
+    from gamma_depth_engine.models import Drillstring
+
+    raw_drillstrings = retry.call(
+        functools.partial(
+            api.get_dataset,
+            provider='corva',
+            dataset=settings.drillstring_collection,
+            query={'asset_id': asset_id, '_id': {'$in': drillstring_ids}},
+            sort={'timestamp': 1},
+            limit=DRILLSTRINGS_LIMIT,
+            fields=fields,
+        ),
+        attempts=settings.request_attempts,
+        backoff=settings.request_backoff,
+    )
+    drillstrings = pydantic.parse_obj_as(List[Drillstring], raw_drillstrings)
+
+    distances = {
+        drillstring.id: drillstring.gamma_sensor_to_bit_distance
+        for drillstring in drillstrings
+    }
+
+    return FetchedDistances(
+        distances=distances,
+        not_found=(
+            set(drillstring_ids) - distances.keys()
+            if len(raw_drillstrings) < DRILLSTRINGS_LIMIT
+            else set()
+        ),
+    )
+
+
+def fetch_distances(
+    api: Api,
+    asset_id: int,
+    drillstring_ids: Set[str],
+    fields: str,
+    settings: AppSettings,
+) -> FetchedDistances:
+    """Fetches gamma sensor to bit distances of any number of drillstrings.
+
+    Ids are split into chunks of DRILLSTRINGS_LIMIT, so no response gets truncated,
+    and the chunks are fetched concurrently.
+    """
+
+    ids = sorted(drillstring_ids)
+    chunks = [
+        ids[start:start + DRILLSTRINGS_LIMIT]
+        for start in range(0, len(ids), DRILLSTRINGS_LIMIT)
+    ]
+
+    if len(chunks) == 1:
+        return fetch_chunk(
+            api=api,
+            asset_id=asset_id,
+            drillstring_ids=chunks[0],
+            fields=fields,
+            settings=settings,
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(settings.drillstring_fetch_workers, len(chunks))
+    ) as executor:
+        futures = [
+            executor.submit(fetch_chunk, api, asset_id, chunk, fields, settings)
+            for chunk in chunks
+        ]
+
+    fetched = FetchedDistances(distances={}, not_found=set())
+    for future in futures:  # re-raises the first error
+        chunk_fetched = future.result()
+        fetched.distances.update(chunk_fetched.distances)
+        fetched.not_found.update(chunk_fetched.not_found)
+
+    return fetched
+
+
+def resolve(
+    api: Api,
+    cache: Cache,
+    asset_id: int,
+    drillstring_ids: Set[str],
+    fields: str,
+    settings: AppSettings,
+) -> Dict[str, Optional[float]]:
+    """Returns gamma sensor to bit distances of the drillstrings.
+
+    Distances are looked up in process memory, then in Corva cache,
+    and only the rest is fetched from the api. Ids, that could not be resolved,
+    are missing from the result. Drillstrings not found get None distance,
+    which is kept only for drillstring_not_found_ttl, as they may be
+    replicated later. Distances resolved before the asset time
+    in drillstring_invalidated_at setting are fetched again.
+    """
+
+    invalidated_at = settings.drillstring_invalidated_at.get(asset_id, 0.0)
+    index = get_index(asset_id, ttl=settings.drillstring_cache_ttl)
+    index.invalidate(invalidated_at)
+    distances = index.get_many(drillstring_ids)
+
+    if not (missing_ids := drillstring_ids - distances.keys()):
+        return distances
+
+    drillstring_cache = DrillstringCache(
+        cache=cache,
+        asset_id=asset_id,
+        ttl=settings.drillstring_cache_ttl,
+        invalidated_at=invalidated_at,
+    )
+
+    # cached entries keep their expiry, so the index does not outlive the cache
+    cached = drillstring_cache.get_many(missing_ids)
+    index.update(cached)
+    distances.update(
+        (drillstring_id, entry.offset) for drillstring_id, entry in cached.items()
+    )
+
+    if missing_ids := missing_ids - cached.keys():
+        fetched = fetch_distances(
+            api=api,
+            asset_id=asset_id,
+            drillstring_ids=missing_ids,
+            fields=fields,
+            settings=settings,
+        )
+        entries = resolved_entries(
+            fetched.distances, ttl=settings.drillstring_cache_ttl
+        )
+        # not found is never remembered longer than found distances
+        if (
+            not_found_ttl := min(
+                settings.drillstring_not_found_ttl, settings.drillstring_cache_ttl
+            )
+        ) > 0:
+            entries.update(
+                resolved_entries(dict.fromkeys(fetched.not_found), ttl=not_found_ttl)
+            )
+        index.update(entries)
+        drillstring_cache.set_many(entries)
+        distances.update(fetched.distances)
+        distances.update(dict.fromkeys(fetched.not_found))
+
+    return distances
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Sequence
+
+import requests
+from corva import Api, Cache, Logger
+
+from gamma_depth_engine import Range, in_ranges
+from gamma_depth_engine.depth_log import (
+    BinSummary,
+    bin_by_depth,
+    merge_bins,
+    select_bins,
+)
+from gamma_depth_io import writer
+from gamma_depth_io.cache_updates import update_entries
+from gamma_depth_io.configuration import AppSettings
+
+# numpy is imported by the functions using it, off the cold start path
+if TYPE_CHECKING:
+    import numpy as np
+
+BINS_PER_BLOCK = 1000
+
+
+class GammaLogBin(NamedTuple):
+    top: float  # gamma depth, where the bin starts
+    records: int
+    gamma_ray: float  # mean of the records
+    gamma_ray_min: float
+    gamma_ray_max: float
+
+
+class GammaLogDataset(NamedTuple):
+    """Companion dataset, updated blocks of the log are posted to."""
+
+    api: Api
+    company_id: int
+    settings: AppSettings
+
+
+class GammaLog:
+    """Depth indexed gamma ray log of the asset, kept in Corva cache.
+
+    Gamma depth is split into bins of bin_size, each keeping record count,
+    sum, min and max of gamma ray. Bins are stored in blocks of BINS_PER_BLOCK,
+    an entry each, so an update or a depth range query reads only the blocks
+    it touches. Bin size is a part of the key, so changing it starts a new log.
+    Blocks are updated atomically, so concurrent pages and invocations
+    of the asset do not lose each other's records.
+
+    Records are counted once, as long as each of them is posted once,
+    which written ranges take care of.
+
+    With a dataset, each updated block is also posted as a document of all
+    its bins, for consumers outside of the app. Documents are never updated,
+    the latest one of a block is the current one.
+    """
+
+    KEY_PREFIX = 'gamma_log'
+
+    def __init__(
+        self,
+        cache: Cache,
+        asset_id: int,
+        bin_size: float,
+        dataset: Optional[GammaLogDataset] = None,
+    ):
+        self.cache = cache
+        self.asset_id = asset_id
+        self.bin_size = bin_size
+        self.dataset = dataset
+
+    def _key(self, block: int) -> str:
+        return f'{self.KEY_PREFIX}/{self.asset_id}/{self.bin_size}/{block}'
+
+    @staticmethod
+    def _decode(value: Optional[str]) -> Dict[int, BinSummary]:
+        if value is None:
+            return {}
+
+        return {int(index): summary for index, summary in json.loads(value).items()}
+
+    def _load_block(self, block: int) -> Dict[int, BinSummary]:
+        return self._decode(self.cache.load(key=self._key(block)))
+
+    def _to_bins(self, stored: Dict[int, BinSummary]) -> List[GammaLogBin]:
+        """Returns bins of the summaries, ordered by depth."""
+
+        bins = []
+        for index in sorted(stored):
+            records, total, minimum, maximum = stored[index]
+            bins.append(
+                GammaLogBin(
+                    top=index * self.bin_size,
+                    records=records,
+                    gamma_ray=total / records,
+                    gamma_ray_min=minimum,
+                    gamma_ray_max=maximum,
+                )
+            )
+
+        return bins
+
+    def add(self, gamma_depth: np.ndarray, gamma_ray: np.ndarray) -> None:
+        import numpy as np
+
+        if not len(gamma_depth):
+            return
+
+        bins = bin_by_depth(gamma_depth, gamma_ray, bin_size=self.bin_size)
+        blocks = bins.index // BINS_PER_BLOCK
+        keys = {self._key(block): block for block in np.unique(blocks).tolist()}
+        merged: Dict[int, Dict[int, BinSummary]] = {}
+
+        def merge(stored: Dict[str, Optional[str]]) -> Dict[str, str]:
+            merged.clear()  # of an attempt, that lost to a concurrent update
+            for key, block in keys.items():
+                merged[block] = merge_bins(
+                    self._decode(stored[key]), select_bins(bins, blocks == block)
+                )
+
+            return {
+                key: json.dumps(merged[block]) for key, block in keys.items()
+            }
+
+        update_entries(self.cache, list(keys), merge)
+
+        if self.dataset is not None:
+            self._post_blocks(merged)
+
+    def _post_blocks(self, blocks: Dict[int, Dict[int, BinSummary]]) -> None:
+        api, company_id, settings = self.dataset
+        now = int(time.time())
+        block_depth = BINS_PER_BLOCK * self.bin_size
+
+        documents = [
+            json.dumps(
+                {
+                    'asset_id': self.asset_id,
+                    'collection': settings.gamma_log_collection,
+                    'company_id': company_id,
+                    'data': {
+                        'bin_size': self.bin_size,
+                        'block': block,
+                        'top': block * block_depth,
+                        'bottom': (block + 1) * block_depth,
+                        'bins': [
+                            gamma_log_bin._asdict()
+                            for gamma_log_bin in self._to_bins(stored)
+                        ],
+                    },
+                    'provider': settings.provider,
+                    'timestamp': now,
+                    'version': settings.version,
+                }
+            ).encode()
+            for block, stored in sorted(blocks.items())
+        ]
+
+        try:
+            writer.post_chunks(
+                api=api,
+                provider=settings.provider,
+                collection=settings.gamma_log_collection,
+                records=documents,
+                max_records=settings.post_chunk_max_records,
+                max_bytes=settings.post_chunk_max_bytes,
+                workers=1,
+                attempts=settings.request_attempts,
+                backoff=settings.request_backoff,
+            )
+        except requests.HTTPError:
+            # the cache is updated, a reinvocation would not post the blocks again.
+            # the next update of a block posts all of its bins, catching up.
+            Logger.error(f'Could not post gamma log blocks: {sorted(blocks)}.')
+
+    def add_posted(
+        self,
+        timestamps: np.ndarray,
+        gamma_depth: np.ndarray,
+        gamma_ray: np.ndarray,
+        ranges: Sequence[Range],
+    ) -> None:
+        """Adds the records, that fall into the posted timestamp ranges."""
+
+        posted = in_ranges(timestamps, ranges)
+
+        self.add(gamma_depth[posted], gamma_ray[posted])
+
+    def query(self, top: float, bottom: float) -> List[GammaLogBin]:
+        """Returns bins, that overlap the gamma depth range, ordered by depth."""
+
+        first, last = int(top // self.bin_size), int(bottom // self.bin_size)
+
+        bins = []
+        for block in range(first // BINS_PER_BLOCK, last // BINS_PER_BLOCK + 1):
+            stored = self._load_block(block)
+
+            bins.extend(
+                self._to_bins(
+                    {
+                        index: summary
+                        for index, summary in stored.items()
+                        if first <= index <= last
+                    }
+                )
+            )
+
+        return bins
+
+
+def get_gamma_log(
+    api: Api, cache: Cache, asset_id: int, company_id: int, settings: AppSettings
+) -> Optional[GammaLog]:
+    """Returns the gamma log of the asset, None if the settings disable it."""
+
+    if settings.gamma_log_bin_size <= 0:
+        return None
+
+    return GammaLog(
+        cache=cache,
+        asset_id=asset_id,
+        bin_size=settings.gamma_log_bin_size,
+        dataset=(
+            GammaLogDataset(api=api, company_id=company_id, settings=settings)
+            if settings.gamma_log_collection
+            else None
+        ),
+    )
@@ -0,0 +1,62 @@
+import contextlib
+import json
+import time
+from typing import ContextManager, Dict, Iterator
+
+from corva import Logger
+
+
+class InvocationMetrics:
+    """Collects per phase wall time and counters of a single invocation.
+
+    When disabled, every method is a no-op, so the metrics may be left in place.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    def phase(self, name: str) -> ContextManager[None]:
+        """Adds wall time of the block to the phase, which may be entered many times."""
+
+        if not self.enabled:
+            return contextlib.nullcontext()
+
+        return self._timed(name)
+
+    @contextlib.contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (
+                self.phases.get(name, 0.0) + time.perf_counter() - start
+            )
+
+    def count(self, name: str, value: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def emit(self, **context) -> None:
+        """Logs all collected values as a single JSON line."""
+
+        if not self.enabled:
+            return
+
+        Logger.info(
+            json.dumps(
+                {
+                    'gamma_depth_metrics': {
+                        **context,
+                        'phases': {
+                            name: round(seconds, 6)
+                            for name, seconds in self.phases.items()
+                        },
+                        'counters': self.counters,
+                    }
+                },
+                separators=(',', ':'),
+            )
+        )
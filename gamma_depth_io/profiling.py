@@ -0,0 +1,164 @@
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Iterator, List, Optional
+
+
+def _location(filename: str, lineno: int) -> str:
+    # the last two path parts tell packages apart and keep the lines short
+    return f'{os.path.join(*filename.split(os.sep)[-2:])}:{lineno}'
+
+
+def top_functions(stats: pstats.Stats, top: int) -> List[list]:
+    """Returns location, calls, own and cumulative seconds of the slowest functions."""
+
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+
+    return [
+        [
+            f'{_location(filename, lineno)}({function})',
+            calls,
+            round(own, 6),
+            round(cumulative, 6),
+        ]
+        for (filename, lineno, function), (_, calls, own, cumulative, _) in rows
+    ]
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, top: int) -> List[list]:
+    """Returns location, bytes and blocks of the lines, that hold the most memory."""
+
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        )
+    )
+
+    return [
+        [_location(frame.filename, frame.lineno), stat.size, stat.count]
+        for stat in snapshot.statistics('lineno')[:top]
+        for frame in (stat.traceback[0],)
+    ]
+
+
+def _start_thread_profiler(
+    profilers: List[cProfile.Profile], frame, event, arg
+) -> None:
+    # runs once, as a thread starts, then the profiler replaces it
+    profiler = cProfile.Profile()
+
+    try:
+        profiler.enable()
+    except ValueError:
+        # since Python 3.12 a single profiler sees all threads
+        sys.setprofile(None)
+    else:
+        profilers.append(profiler)
+
+
+def merge_stats(profilers: List[cProfile.Profile]) -> pstats.Stats:
+    stats = pstats.Stats(profilers[0])
+
+    for profiler in profilers[1:]:
+        if profiler.getstats():  # empty profiles can not be loaded
+            stats.add(profiler)
+
+    return stats
+
+
+@contextlib.contextmanager
+def profiled(asset_id: int, top: int, directory: str = '') -> Iterator[None]:
+    """Profiles CPU and memory of the block and logs the summary once it is done.
+
+    cProfile sees only the thread, that enables it, so threads started
+    within the block, e.g. the ones posting chunks or fetching drillstrings,
+    get profilers of their own. Their stats are summed up with the ones
+    of the calling thread, so cumulative seconds may exceed the wall time.
+    """
+
+    # memory may be traced already, e.g. by a benchmark
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    profiler = cProfile.Profile()
+    thread_profilers: List[cProfile.Profile] = []
+    threading.setprofile(functools.partial(_start_thread_profiler, thread_profilers))
+    start = time.perf_counter()
+    profiler.enable()
+
+    try:
+        yield
+    finally:
+        profiler.disable()
+        threading.setprofile(None)
+        seconds = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        # the peak of someone else's tracing is not the one of the block
+        peak_bytes = tracemalloc.get_traced_memory()[1] if started_tracing else None
+
+        if started_tracing:
+            tracemalloc.stop()
+
+        emit(
+            asset_id=asset_id,
+            seconds=seconds,
+            peak_bytes=peak_bytes,
+            stats=merge_stats([profiler, *thread_profilers]),
+            threads=1 + len(thread_profilers),
+            snapshot=snapshot,
+            top=top,
+            directory=directory,
+        )
+
+
+def emit(
+    asset_id: int,
+    seconds: float,
+    peak_bytes: Optional[int],
+    stats: pstats.Stats,
+    threads: int,
+    snapshot: tracemalloc.Snapshot,
+    top: int,
+    directory: str = '',
+) -> None:
+    """Writes the profile summary to stdout as a single JSON line.
+
+    The line bypasses corva Logger, which truncates messages longer than
+    LOG_THRESHOLD_MESSAGE_SIZE and drops the ones past LOG_THRESHOLD_MESSAGE_COUNT
+    of an invocation. Lambda sends stdout to CloudWatch all the same.
+
+    Summary lists the top functions and allocation sites. Full cProfile stats
+    are also dumped into the directory, if it is set, to be loaded with pstats.
+    """
+
+    stats_file = None
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        stats_file = os.path.join(directory, f'{asset_id}-{time.time_ns()}.prof')
+        stats.dump_stats(stats_file)
+
+    line = json.dumps(
+        {
+            'gamma_depth_profile': {
+                'asset_id': asset_id,
+                'seconds': round(seconds, 6),
+                'peak_bytes': peak_bytes,
+                'threads': threads,
+                'stats_file': stats_file,
+                'functions': top_functions(stats, top=top),
+                'allocations': top_allocations(snapshot, top=top),
+            }
+        },
+        separators=(',', ':'),
+    )
+    sys.stdout.write(f'{line}\n')
+    sys.stdout.flush()
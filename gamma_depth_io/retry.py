@@ -0,0 +1,56 @@
+import random
+import time
+from typing import Callable, TypeVar
+
+import requests
+from corva import Logger
+
+# responses worth another attempt, the rest fail the same way again
+RETRIED_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+T = TypeVar('T')
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, requests.HTTPError):
+        return (
+            error.response is not None
+            and error.response.status_code in RETRIED_STATUS_CODES
+        )
+
+    return isinstance(
+        error,
+        (
+            requests.ConnectionError,
+            requests.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+        ),
+    )
+
+
+def call(func: Callable[[], T], attempts: int, backoff: float) -> T:
+    """Calls func, retrying transient request errors up to attempts times in total.
+
+    Attempt n waits backoff * 2 ** (n - 1) seconds before it starts,
+    scaled by a random factor between 0.5 and 1, so concurrent callers
+    do not retry in lockstep.
+
+    Raises:
+      Exception: the error of the last attempt, or any not transient error at once.
+    """
+
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except Exception as error:
+            if attempt >= attempts or not is_transient(error):
+                raise
+
+            delay = backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1)
+            Logger.warning(
+                f'Attempt {attempt} of {attempts} failed: {error!r}. '
+                f'Retrying in {delay:.2f}s.'
+            )
+            time.sleep(delay)
+
+    raise ValueError('attempts must be positive.')
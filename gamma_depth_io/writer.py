@@ -0,0 +1,163 @@
+import concurrent.futures
+import contextlib
+import functools
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
+from corva import Api, Logger
+
+from gamma_depth_io import retry
+
+_SESSION_LOCK = threading.Lock()
+_SESSION: Optional[requests.Session] = None
+_SESSION_POOL_SIZE = 0
+
+
+class ChunkStatus(NamedTuple):
+    index: int
+    offset: int  # position of the first chunk record in the posted records
+    records: int
+    bytes: int
+    status_code: int
+    seconds: float
+
+
+def get_session(pool_size: int) -> requests.Session:
+    """Returns keep-alive session, shared between chunks and warm invocations.
+
+    The pool keeps pool_size connections, the most posts in flight at once.
+    Connections beyond it would be closed after each post, so a caller
+    with more concurrency than the pool so far gets a bigger one.
+    """
+
+    global _SESSION, _SESSION_POOL_SIZE
+
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = requests.Session()
+
+        if pool_size > _SESSION_POOL_SIZE:
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=1, pool_maxsize=pool_size
+            )
+            _SESSION.mount('https://', adapter)
+            _SESSION.mount('http://', adapter)
+            _SESSION_POOL_SIZE = pool_size
+
+        return _SESSION
+
+
+def iter_chunks(
+    records: Iterable[bytes], max_records: int, max_bytes: int
+) -> Iterator[Tuple[bytes, int]]:
+    """Yields JSON array bodies of the encoded records, bounded by count and size.
+
+    Each body is yielded along with the number of records in it.
+    A record bigger than max_bytes gets a chunk of its own.
+    """
+
+    chunk: List[bytes] = []
+    chunk_bytes = 2  # square brackets
+
+    for encoded in records:
+        if chunk and (
+            len(chunk) == max_records or chunk_bytes + len(encoded) + 1 > max_bytes
+        ):
+            yield b'[' + b','.join(chunk) + b']', len(chunk)
+            chunk, chunk_bytes = [], 2
+
+        chunk.append(encoded)
+        chunk_bytes += len(encoded) + 1  # comma
+
+    if chunk:
+        yield b'[' + b','.join(chunk) + b']', len(chunk)
+
+
+def post_chunks(
+    api: Api,
+    provider: str,
+    collection: str,
+    records: List[bytes],
+    max_records: int,
+    max_bytes: int,
+    workers: int,
+    on_posted: Optional[Callable[[List[ChunkStatus]], None]] = None,
+    attempts: int = 1,
+    backoff: float = 0.0,
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> List[ChunkStatus]:
+    """Posts JSON encoded records to the dataset in concurrent chunks.
+
+    Bodies are sent as is, so records are not encoded again by the HTTP layer.
+    Each chunk is attempted up to attempts times, see retry.call.
+
+    Chunks are posted by workers threads of their own, or by the executor
+    shared by concurrent calls, then workers is the number of its threads.
+
+    Once all chunks are attempted, on_posted gets statuses of the posted ones,
+    even if some other chunk failed.
+
+    Raises:
+      requests.HTTPError: if any chunk was not posted. All chunks are attempted first.
+    """
+
+    url = f"{api.data_api_url.rstrip('/')}/api/v1/data/{provider}/{collection}/"
+    headers = {**api.default_headers, 'Content-Type': 'application/json'}
+    session = get_session(pool_size=workers)
+
+    def post(index: int, offset: int, body: bytes, count: int) -> ChunkStatus:
+        start = time.perf_counter()
+        response = session.post(url, data=body, headers=headers, timeout=api.timeout)
+        status = ChunkStatus(
+            index=index,
+            offset=offset,
+            records=count,
+            bytes=len(body),
+            status_code=response.status_code,
+            seconds=time.perf_counter() - start,
+        )
+
+        if not response.ok:
+            Logger.error(f'Could not post chunk: {status}.')
+        else:
+            Logger.debug(f'Posted chunk: {status}.')
+
+        response.raise_for_status()
+
+        return status
+
+    chunks = iter_chunks(records, max_records=max_records, max_bytes=max_bytes)
+
+    with (
+        contextlib.nullcontext(executor)
+        if executor is not None
+        else concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    ) as chunk_executor:
+        futures = []
+        offset = 0
+        for index, (body, count) in enumerate(chunks):
+            futures.append(
+                chunk_executor.submit(
+                    retry.call,
+                    functools.partial(post, index, offset, body, count),
+                    attempts,
+                    backoff,
+                )
+            )
+            offset += count
+
+        concurrent.futures.wait(futures)
+
+    statuses = [
+        future.result() for future in futures if future.exception() is None
+    ]
+
+    if on_posted is not None:
+        on_posted(statuses)
+
+    for future in futures:  # re-raises the first error, once all chunks are done
+        future.result()
+
+    return statuses
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+from corva import Cache
+
+from gamma_depth_engine import (
+    GammaDepthColumns,
+    GammaDepthResult,
+    Range,
+    merge_ranges,
+)
+from gamma_depth_io.cache_updates import update_entries
+from gamma_depth_io.gamma_log import GammaLog
+from gamma_depth_io.writer import ChunkStatus
+
+# annotations only, numpy stays off the cold start path
+if TYPE_CHECKING:
+    import numpy as np
+
+MAX_RANGES = 1000
+
+
+def posted_ranges(
+    first_timestamps: np.ndarray,
+    last_timestamps: np.ndarray,
+    statuses: Sequence[ChunkStatus],
+) -> List[Range]:
+    """Returns timestamp ranges of the posted chunks.
+
+    Timestamps are the ones of the first and the last record of each posted row,
+    the same for rows of a single record. Rows must be sorted by timestamp,
+    so each chunk covers a range. Neighbour chunks, that were both posted,
+    make a single range.
+    """
+
+    ranges: List[Range] = []
+    previous_index = None
+
+    for status in sorted(statuses):
+        start = int(first_timestamps[status.offset])
+        end = int(last_timestamps[status.offset + status.records - 1])
+
+        if ranges and status.index == previous_index + 1:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+
+        previous_index = status.index
+
+    return ranges
+
+
+class WrittenRanges:
+    """Timestamp ranges of the asset, that are already posted, kept in Corva cache.
+
+    A range covers all records of the batch, that were posted within it,
+    so retried invocations post only what is missing. A record arriving later
+    with a timestamp inside a range is skipped, like the ones behind the watermark.
+
+    Ranges are added atomically, so neither concurrent pages of an invocation
+    nor concurrent invocations of the asset lose each other's ranges.
+    """
+
+    KEY_PREFIX = 'written_ranges'
+
+    def __init__(self, cache: Cache, asset_id: int):
+        self.cache = cache
+        self.key = f'{self.KEY_PREFIX}/{asset_id}'
+
+    @staticmethod
+    def _decode(value: Optional[str]) -> List[Range]:
+        if value is None:
+            return []
+
+        return [(start, end) for start, end in json.loads(value)]
+
+    def load(self) -> List[Range]:
+        return self._decode(self.cache.load(key=self.key))
+
+    def add(self, ranges: Sequence[Range]) -> None:
+        if not ranges:
+            return
+
+        update_entries(
+            self.cache,
+            [self.key],
+            lambda stored: {
+                self.key: json.dumps(
+                    merge_ranges(
+                        self._decode(stored[self.key]), ranges, max_ranges=MAX_RANGES
+                    )
+                )
+            },
+        )
+
+
+def record_posted(
+    columns: GammaDepthColumns,
+    result: GammaDepthResult,
+    written_ranges: Optional[WrittenRanges],
+    gamma_log: Optional[GammaLog],
+    statuses: List[ChunkStatus],
+) -> None:
+    """Adds records of the posted chunks to written ranges and the gamma log."""
+
+    ranges = posted_ranges(
+        first_timestamps=result.first_timestamp,
+        last_timestamps=result.last_timestamp,
+        statuses=statuses,
+    )
+
+    if written_ranges is not None:
+        written_ranges.add(ranges)
+
+    if gamma_log is not None:
+        gamma_log.add_posted(
+            columns.timestamp,
+            gamma_depth=result.gamma_depth,
+            gamma_ray=columns.gamma_ray,
+            ranges=ranges,
+        )
@@ -0,0 +1,179 @@
+"""Async mode of the scheduled app, that overlaps network calls of the pages.
+
+WITS pages are still fetched one after another, as each page query starts after
+the last timestamp of the previous one. While the next page is loading, earlier
+pages resolve their drillstrings and post their output chunks.
+
+Blocking SDK and HTTP calls run in a thread pool. Everything else, parsing,
+computation, metrics and the watermark, stays on the event loop thread.
+Phases of concurrent pages overlap, so their timings may add up to more
+than the invocation took.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+from typing import Awaitable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from corva import Api, Cache
+
+from gamma_depth_io.metrics import InvocationMetrics
+from src.configuration import SETTINGS
+from src.gamma_depth import (
+    Page,
+    WitsPage,
+    compute_page,
+    count_posted,
+    post_rows,
+    prepare_page,
+    read_page,
+    resolve_drillstrings,
+)
+from src.watermark import Watermark
+
+DistancesFuture = Awaitable[Dict[str, Optional[float]]]
+
+
+class AsyncPipeline:
+    def __init__(
+        self,
+        api: Api,
+        cache: Cache,
+        metrics: InvocationMetrics,
+        executor: concurrent.futures.Executor,
+        post_executor: concurrent.futures.Executor,
+    ):
+        self.api = api
+        self.cache = cache
+        self.metrics = metrics
+        self.executor = executor
+        self.post_executor = post_executor
+        # drillstring id -> lookup, that resolves it. shared by all pages,
+        # so an id is looked up once, by the first page it appears on.
+        self.lookups: Dict[str, DistancesFuture] = {}
+
+    def call(self, fn, *args, **kwargs) -> Awaitable:
+        return asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    def start_lookups(self, page: Page) -> None:
+        new_ids = set(page.columns.drillstring_ids).difference(self.lookups)
+
+        if not new_ids:
+            return
+
+        lookup = asyncio.ensure_future(
+            self.call(
+                resolve_drillstrings,
+                page,
+                api=self.api,
+                cache=self.cache,
+                drillstring_ids=new_ids,
+            )
+        )
+        self.lookups.update(dict.fromkeys(new_ids, lookup))
+
+    async def process(self, page: Page) -> None:
+        with self.metrics.phase('drillstrings'):
+            lookups = {self.lookups[id] for id in set(page.columns.drillstring_ids)}
+            id_to_distance: Dict[str, Optional[float]] = {}
+            for distances in await asyncio.gather(*lookups):
+                id_to_distance.update(distances)
+
+        result = compute_page(
+            page, id_to_distance=id_to_distance, metrics=self.metrics
+        )
+
+        with self.metrics.phase('post'):
+            statuses = await self.call(
+                post_rows,
+                page,
+                result=result,
+                api=self.api,
+                executor=self.post_executor,
+            )
+
+        count_posted(result.rows, statuses=statuses, metrics=self.metrics)
+
+    async def run(
+        self,
+        pages: Iterator[Union[List[dict], WitsPage]],
+        watermark: Optional[Watermark],
+    ) -> None:
+        # pages in fetch order with the last timestamp, the watermark advances to
+        in_flight: Deque[Tuple[int, Optional[asyncio.Future]]] = collections.deque()
+
+        async def finish_oldest() -> None:
+            last_timestamp, task = in_flight.popleft()
+
+            if task is not None:
+                await task
+
+            if watermark is not None:
+                # the page and all pages before it are posted
+                watermark.advance(last_timestamp)
+
+        try:
+            while True:
+                with self.metrics.phase('wits_fetch'):
+                    fetched = await self.call(next, pages, None)
+
+                if fetched is None:
+                    break
+
+                self.metrics.count('pages')
+                wits_page = read_page(fetched, metrics=self.metrics)
+
+                task = None
+                page = prepare_page(
+                    wits_page, api=self.api, cache=self.cache, metrics=self.metrics
+                )
+                if page is not None:
+                    self.start_lookups(page)
+                    task = asyncio.ensure_future(self.process(page))
+
+                in_flight.append((wits_page.last_timestamp, task))
+
+                # bounds memory, like the page size does in the sequential mode
+                while len(in_flight) > SETTINGS.async_pages_in_flight:
+                    await finish_oldest()
+
+            while in_flight:
+                await finish_oldest()
+        finally:
+            # on failure pages in flight still finish, so nothing runs
+            # after the invocation. their posted chunks are kept in written ranges.
+            await asyncio.gather(
+                *(task for _, task in in_flight if task is not None),
+                *self.lookups.values(),
+                return_exceptions=True,
+            )
+
+
+def process_pages_async(
+    pages: Iterator[Union[List[dict], WitsPage]],
+    api: Api,
+    cache: Cache,
+    watermark: Optional[Watermark],
+    metrics: InvocationMetrics,
+    post_executor: concurrent.futures.Executor,
+) -> None:
+    """Processes the pages concurrently, advancing the watermark in page order.
+
+    The first failure stops fetching and is raised, once pages in flight finish.
+    """
+
+    # a lookup and a post for each page in flight, plus the next page fetch
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=2 * SETTINGS.async_pages_in_flight + 1
+    ) as executor:
+        pipeline = AsyncPipeline(
+            api=api,
+            cache=cache,
+            metrics=metrics,
+            executor=executor,
+            post_executor=post_executor,
+        )
+        asyncio.run(pipeline.run(pages, watermark=watermark))
@@ -1,12 +1,28 @@
-import pydantic
+from gamma_depth_io.configuration import AppSettings
 
 
-class Settings(pydantic.BaseSettings):
-    provider: str
-    actual_gamma_depth_collection: str = 'actual-gamma-depth'
-    drillstring_collection: str = 'data.drillstring'
+class Settings(AppSettings):
     wits_collection = 'wits'
-    version: int = 1
+    wits_page_size: int = 1000
+    # parse WITS records while the page downloads, keeping only their values
+    streaming_wits: bool = False
+    # skip records, that were posted by previous runs
+    watermark_enabled: bool = True
+    # overlap WITS paging, drillstring lookups and output posts of the pages
+    async_pipeline: bool = False
+    async_pages_in_flight: int = 4  # pages computed or posted, while the next loads
+
+    @property
+    def post_concurrency(self) -> int:
+        """Returns the most chunk posts in flight at once in an invocation.
+
+        In the async mode each page in flight posts its chunks concurrently.
+        """
+
+        if self.async_pipeline:
+            return self.post_workers * self.async_pages_in_flight
+
+        return self.post_workers
 
 
 SETTINGS = Settings()
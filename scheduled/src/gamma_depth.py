@@ -1,93 +1,447 @@
-from typing import Dict, List
+import concurrent.futures
+import functools
+import json
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Union
 
-import pydantic
-from corva import Api, ScheduledEvent
+from corva import Api, Cache, ScheduledEvent
 
+import gamma_depth_engine
+from gamma_depth_io import drillstring_index, retry, writer
+from gamma_depth_io.gamma_log import GammaLog, get_gamma_log
+from gamma_depth_io.metrics import InvocationMetrics
+from gamma_depth_io.written_ranges import WrittenRanges, record_posted
+from src import json_stream
 from src.configuration import SETTINGS
-from src.models import (
-    ActualGammaDepth,
-    ActualGammaDepthData,
-    Drillstring,
-    GammaDepthEvent,
-    WitsRecord,
+from src.models import ColumnarGammaDepthEvent, WitsRecord, fields_projection
+from src.watermark import Watermark
+
+# fetch only the fields the models need
+WITS_FIELDS = fields_projection(WitsRecord)
+# fields_projection(Drillstring), kept as a constant, as the drillstring model
+# is imported only when drillstrings are fetched
+DRILLSTRING_FIELDS = (
+    '_id,data.components.family,data.components.gamma_sensor_to_bit_distance,'
+    'data.components.has_gamma_sensor'
 )
 
 
-def gamma_depth(event: ScheduledEvent, api: Api) -> None:
-    # no exception handling. if request fails, lambda will be reinvoked.
-    raw_records = api.get_dataset(
-        provider='corva',
-        dataset=SETTINGS.wits_collection,
-        query={
-            'asset_id': event.asset_id,
-            'timestamp': {
-                '$gte': event.start_time,
-                '$lte': event.end_time,
-            },
-            'metadata.drillstring': {'$exists': True, '$ne': None},
-        },
-        sort={'timestamp': 1},
-        limit=1000,
-    )
-    records = pydantic.parse_obj_as(List[WitsRecord], raw_records)
+def wits_query(asset_id: int, timestamp_from: dict, end_time: int) -> dict:
+    return {
+        'asset_id': asset_id,
+        'timestamp': {**timestamp_from, '$lte': end_time},
+        'metadata.drillstring': {'$exists': True, '$ne': None},
+    }
+
+
+def iter_wits_pages(
+    api: Api, asset_id: int, start_time: int, end_time: int, page_size: int
+) -> Iterator[List[dict]]:
+    """Yields WITS records for the time range page by page.
 
-    if not records:
-        # return early if no records received
+    Pages are fetched lazily in ascending timestamp order. The next page starts
+    right after the last timestamp of the previous one, so WITS records are expected
+    to have unique timestamps within an asset.
+    """
+
+    if start_time > end_time:
         return
 
-    event = GammaDepthEvent(records=records)
-
-    # no exception handling. if request fails, lambda will be reinvoked.
-    raw_drillstrings = api.get_dataset(
-        provider='corva',
-        dataset=SETTINGS.drillstring_collection,
-        query={
-            'asset_id': event.asset_id,
-            '_id': {'$in': list(event.drillstring_ids)},
-        },
-        sort={'timestamp': 1},
-        limit=100,
+    timestamp_from = {'$gte': start_time}
+
+    while True:
+        # transient errors are retried. if the request still fails, lambda will be
+        # reinvoked and resume after the watermark.
+        page = retry.call(
+            functools.partial(
+                api.get_dataset,
+                provider='corva',
+                dataset=SETTINGS.wits_collection,
+                query=wits_query(asset_id, timestamp_from, end_time),
+                sort={'timestamp': 1},
+                limit=page_size,
+                fields=WITS_FIELDS,
+            ),
+            attempts=SETTINGS.request_attempts,
+            backoff=SETTINGS.request_backoff,
+        )
+
+        if page:
+            yield page
+
+        if len(page) < page_size:
+            # the last page is not full, nothing left to fetch
+            return
+
+        timestamp_from = {'$gt': page[-1]['timestamp']}
+
+
+class WitsPage(NamedTuple):
+    """WITS page parsed into columns, records are in the response order."""
+
+    asset_id: int
+    company_id: int
+    columns: gamma_depth_engine.GammaDepthColumns
+
+    @property
+    def last_timestamp(self) -> int:
+        """Timestamp of the last fetched record, the next page starts after it."""
+
+        return int(self.columns.timestamp[-1])
+
+
+def iter_streamed_wits_pages(
+    api: Api, asset_id: int, start_time: int, end_time: int, page_size: int
+) -> Iterator[WitsPage]:
+    """Yields parsed WITS pages for the time range, like iter_wits_pages does.
+
+    Each record is parsed right as it downloads and only its values are kept,
+    so neither the response list nor the models of the page are ever built.
+    """
+
+    if start_time > end_time:
+        return
+
+    timestamp_from = {'$gte': start_time}
+
+    while True:
+        params = {
+            'query': json.dumps(wits_query(asset_id, timestamp_from, end_time)),
+            'sort': json.dumps({'timestamp': 1}),
+            'fields': WITS_FIELDS,
+            'limit': page_size,
+            'skip': 0,
+        }
+        # a page, that fails halfway through the download, is fetched again whole
+        page = retry.call(
+            lambda: parse_streamed_page(
+                json_stream.get_array(
+                    api,
+                    path=f'/api/v1/data/corva/{SETTINGS.wits_collection}/',
+                    params=params,
+                )
+            ),
+            attempts=SETTINGS.request_attempts,
+            backoff=SETTINGS.request_backoff,
+        )
+
+        if page is None:
+            return
+
+        yield page
+
+        if len(page.columns.timestamp) < page_size:
+            # the last page is not full, nothing left to fetch
+            return
+
+        timestamp_from = {'$gt': page.last_timestamp}
+
+
+def parse_streamed_page(raw_records: Iterable[dict]) -> Optional[WitsPage]:
+    """Returns the WITS page of the records, None if there are none."""
+
+    event = ColumnarGammaDepthEvent.parse_records(
+        raw_records, trusted=SETTINGS.trusted_input
     )
-    drillstrings = pydantic.parse_obj_as(List[Drillstring], raw_drillstrings)
-
-    id_to_drillstring = {
-        drillstring.id: drillstring for drillstring in drillstrings
-    }  # type: Dict[str, Drillstring]
-
-    actual_gamma_depths = []
-    for record in event.records:  # build actual gamma depth for each record
-        gamma_depth_val = record.data.bit_depth
-
-        # the record may be tagged with a drillstring,
-        # that gets deleted before the Lambda run.
-        # data about this drillstring won't be received from the api,
-        # thus missing from the dict
-        drillstring = id_to_drillstring.get(record.metadata.drillstring_id)
-
-        if drillstring and (mwd_with_gamma_sensor := drillstring.mwd_with_gamma_sensor):
-            gamma_depth_val = (
-                record.data.bit_depth
-                - mwd_with_gamma_sensor.gamma_sensor_to_bit_distance
-            )
 
-        actual_gamma_depths.append(
-            ActualGammaDepth(
-                asset_id=record.asset_id,
-                collection=SETTINGS.actual_gamma_depth_collection,
-                company_id=record.company_id,
-                data=ActualGammaDepthData(
-                    gamma_depth=gamma_depth_val,
-                    bit_depth=record.data.bit_depth,
-                    gamma_ray=record.data.gamma_ray,
-                ),
-                provider=SETTINGS.provider,
-                timestamp=record.timestamp,
-                version=SETTINGS.version,
+    if event is None:
+        return None
+
+    return WitsPage(
+        asset_id=event.asset_id, company_id=event.company_id, columns=event.columns
+    )
+
+
+def parse_page(raw_records: List[dict]) -> WitsPage:
+    if SETTINGS.trusted_input:
+        # only the first record is validated, to fail fast if the schema changes
+        first_record = WitsRecord.parse_obj(raw_records[0])
+
+        columns = gamma_depth_engine.build_columns(
+            count=len(raw_records),
+            timestamps=(record['timestamp'] for record in raw_records),
+            bit_depths=(record['data']['bit_depth'] for record in raw_records),
+            gamma_rays=(record['data']['gamma_ray'] for record in raw_records),
+            drillstring_ids=(
+                record['metadata']['drillstring'] for record in raw_records
+            ),
+        )
+
+        return WitsPage(
+            asset_id=first_record.asset_id,
+            company_id=first_record.company_id,
+            columns=columns,
+        )
+
+    # records are validated one at a time, no list of models is built
+    event = ColumnarGammaDepthEvent.parse_records(raw_records)
+
+    return WitsPage(
+        asset_id=event.asset_id, company_id=event.company_id, columns=event.columns
+    )
+
+
+def read_page(
+    fetched: Union[List[dict], WitsPage], metrics: InvocationMetrics
+) -> WitsPage:
+    if isinstance(fetched, WitsPage):
+        # streamed pages are parsed, while they download
+        return fetched
+
+    with metrics.phase('parse'):
+        return parse_page(fetched)
+
+
+class Page(NamedTuple):
+    """WITS page, parsed and deduplicated."""
+
+    asset_id: int
+    company_id: int
+    columns: gamma_depth_engine.GammaDepthColumns
+    written_ranges: Optional[WrittenRanges]
+    gamma_log: Optional[GammaLog]
+
+
+def prepare_page(
+    wits_page: WitsPage, api: Api, cache: Cache, metrics: InvocationMetrics
+) -> Optional[Page]:
+    """Drops records of the WITS page, that must not be posted.
+
+    Returns None if no records are left.
+    """
+
+    asset_id, company_id, columns = wits_page
+
+    metrics.count('records_in', len(columns.timestamp))
+
+    written_ranges = (
+        WrittenRanges(cache=cache, asset_id=asset_id)
+        if SETTINGS.written_ranges_enabled
+        else None
+    )
+
+    with metrics.phase('dedupe'):
+        deduped = gamma_depth_engine.dedupe(
+            columns=columns,
+            written=[] if written_ranges is None else written_ranges.load(),
+        )
+
+    metrics.count('records_duplicate', deduped.duplicates)
+    metrics.count('records_already_written', deduped.already_written)
+
+    if not len(deduped.columns.timestamp):
+        return None
+
+    return Page(
+        asset_id=asset_id,
+        company_id=company_id,
+        columns=deduped.columns,
+        written_ranges=written_ranges,
+        gamma_log=get_gamma_log(
+            api=api,
+            cache=cache,
+            asset_id=asset_id,
+            company_id=company_id,
+            settings=SETTINGS,
+        ),
+    )
+
+
+def resolve_drillstrings(
+    page: Page, api: Api, cache: Cache, drillstring_ids: Set[str]
+) -> Dict[str, Optional[float]]:
+    return drillstring_index.resolve(
+        api=api,
+        cache=cache,
+        asset_id=page.asset_id,
+        drillstring_ids=drillstring_ids,
+        fields=DRILLSTRING_FIELDS,
+        settings=SETTINGS,
+    )
+
+
+def compute_page(
+    page: Page,
+    id_to_distance: Dict[str, Optional[float]],
+    metrics: InvocationMetrics,
+) -> gamma_depth_engine.GammaDepthResult:
+    """Computes JSON encoded actual gamma depth documents of the page."""
+
+    with metrics.phase('compute'):
+        result = gamma_depth_engine.run(
+            columns=page.columns,
+            id_to_distance=id_to_distance,
+            asset_id=page.asset_id,
+            company_id=page.company_id,
+            provider=SETTINGS.provider,
+            collection=SETTINGS.actual_gamma_depth_collection,
+            version=SETTINGS.version,
+            prerendered_envelope=SETTINGS.prerendered_envelope,
+            decimation=SETTINGS.output_decimation,
+            depth_bin_size=SETTINGS.output_depth_bin_size,
+        )
+
+    metrics.count('records_without_offset', result.records_without_offset)
+
+    return result
+
+
+def post_rows(
+    page: Page,
+    result: gamma_depth_engine.GammaDepthResult,
+    api: Api,
+    executor: concurrent.futures.Executor,
+) -> List[writer.ChunkStatus]:
+    # chunks are retried on transient errors. if one still fails, lambda will be
+    # reinvoked and written ranges let it post only the rest.
+    return writer.post_chunks(
+        api=api,
+        provider=SETTINGS.provider,
+        collection=SETTINGS.actual_gamma_depth_collection,
+        records=result.rows,
+        max_records=SETTINGS.post_chunk_max_records,
+        max_bytes=SETTINGS.post_chunk_max_bytes,
+        workers=SETTINGS.post_concurrency,
+        on_posted=(
+            None
+            if page.written_ranges is None and page.gamma_log is None
+            else functools.partial(
+                record_posted,
+                page.columns,
+                result,
+                page.written_ranges,
+                page.gamma_log,
             )
+        ),
+        attempts=SETTINGS.request_attempts,
+        backoff=SETTINGS.request_backoff,
+        executor=executor,
+    )
+
+
+def count_posted(
+    rows: List[bytes], statuses: List[writer.ChunkStatus], metrics: InvocationMetrics
+) -> None:
+    metrics.count('records_out', len(rows))
+    metrics.count('chunks', len(statuses))
+    metrics.count('payload_bytes', sum(status.bytes for status in statuses))
+
+
+def process_page(
+    wits_page: WitsPage,
+    api: Api,
+    cache: Cache,
+    metrics: InvocationMetrics,
+    post_executor: concurrent.futures.Executor,
+) -> None:
+    """Computes and posts actual gamma depth of the WITS page."""
+
+    if (page := prepare_page(wits_page, api=api, cache=cache, metrics=metrics)) is None:
+        return
+
+    with metrics.phase('drillstrings'):
+        id_to_distance = resolve_drillstrings(
+            page,
+            api=api,
+            cache=cache,
+            drillstring_ids=set(page.columns.drillstring_ids),
         )
 
-    # no exception handling. if request fails, lambda will be reinvoked.
-    api.post(
-        f"api/v1/data/{SETTINGS.provider}/{SETTINGS.actual_gamma_depth_collection}/",
-        data=[entry.dict() for entry in actual_gamma_depths],
-    ).raise_for_status()
+    result = compute_page(page, id_to_distance=id_to_distance, metrics=metrics)
+
+    with metrics.phase('post'):
+        statuses = post_rows(page, result=result, api=api, executor=post_executor)
+
+    count_posted(result.rows, statuses=statuses, metrics=metrics)
+
+
+def process_pages(
+    pages: Iterator[Union[List[dict], WitsPage]],
+    api: Api,
+    cache: Cache,
+    watermark: Optional[Watermark],
+    metrics: InvocationMetrics,
+    post_executor: concurrent.futures.Executor,
+) -> None:
+    """Processes the pages one by one, advancing the watermark after each of them."""
+
+    while True:
+        with metrics.phase('wits_fetch'):
+            fetched = next(pages, None)
+
+        if fetched is None:
+            break
+
+        metrics.count('pages')
+        wits_page = read_page(fetched, metrics=metrics)
+        process_page(
+            wits_page=wits_page,
+            api=api,
+            cache=cache,
+            metrics=metrics,
+            post_executor=post_executor,
+        )
+
+        if watermark is not None:
+            # the page is posted, so it doesn't have to be processed again
+            watermark.advance(wits_page.last_timestamp)
+
+
+def gamma_depth(event: ScheduledEvent, api: Api, cache: Cache) -> None:
+    metrics = InvocationMetrics(enabled=SETTINGS.metrics_enabled)
+
+    start_time = event.start_time
+    watermark = (
+        Watermark(cache=cache, asset_id=event.asset_id)
+        if SETTINGS.watermark_enabled
+        else None
+    )
+
+    if watermark is not None and (last_posted := watermark.load()) is not None:
+        # records up to the watermark were posted by previous runs
+        start_time = max(start_time, last_posted + 1)
+
+    # pages are fetched lazily, so memory usage is bounded by the page size
+    # (times pages in flight in the async mode), not by the time range.
+    iter_pages = (
+        iter_streamed_wits_pages if SETTINGS.streaming_wits else iter_wits_pages
+    )
+    pages = iter_pages(
+        api=api,
+        asset_id=event.asset_id,
+        start_time=start_time,
+        end_time=event.end_time,
+        page_size=SETTINGS.wits_page_size,
+    )
+
+    # chunks of all pages are posted by one executor, sized with the session pool
+    try:
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=SETTINGS.post_concurrency
+        ) as post_executor:
+            if SETTINGS.async_pipeline:
+                # asyncio is imported only, when the mode is enabled
+                from src.async_pipeline import process_pages_async
+
+                process_pages_async(
+                    pages,
+                    api=api,
+                    cache=cache,
+                    watermark=watermark,
+                    metrics=metrics,
+                    post_executor=post_executor,
+                )
+            else:
+                process_pages(
+                    pages,
+                    api=api,
+                    cache=cache,
+                    watermark=watermark,
+                    metrics=metrics,
+                    post_executor=post_executor,
+                )
+    finally:
+        metrics.emit(
+            asset_id=event.asset_id,
+            start_time=event.start_time,
+            end_time=event.end_time,
+        )
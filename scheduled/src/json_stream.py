@@ -0,0 +1,81 @@
+import codecs
+import json
+import re
+from typing import Iterable, Iterator
+
+import requests
+from corva import Api
+
+CHUNK_BYTES = 64 * 1024
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_SEPARATORS = re.compile(r'[ \t\n\r,]*')
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """Yields objects of a JSON array body, each as soon as it is received.
+
+    Only the part of the body, that is not decoded yet, is kept in memory.
+
+    Raises:
+      ValueError: if the body is not a complete JSON array of objects.
+    """
+
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+
+    for text in codecs.iterdecode(chunks, 'utf-8'):
+        buffer = buffer[position:] + text
+        position = 0
+
+        if not started:
+            position = _WHITESPACE.match(buffer).end()
+
+            if position == len(buffer):
+                continue
+
+            if buffer[position] != '[':
+                raise ValueError('Response body is not a JSON array.')
+
+            started = True
+            position += 1
+
+        while (position := _SEPARATORS.match(buffer, position).end()) < len(buffer):
+            if buffer[position] == ']':
+                return
+
+            if buffer[position] != '{':
+                raise ValueError('Response body is not a JSON array of objects.')
+
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # objects end with a brace, so this one continues in the next chunk
+                break
+
+            yield item
+
+    raise ValueError('Response body ended before the JSON array did.')
+
+
+def get_array(api: Api, path: str, params: dict) -> Iterator[dict]:
+    """Streams objects of the JSON array, that the data api responds with.
+
+    Same request as Api.get_dataset makes, but the body is decoded
+    while it downloads, and no list of the objects is built.
+
+    Raises:
+      requests.HTTPError: if request was unsuccessful.
+    """
+
+    with requests.get(
+        f"{api.data_api_url.rstrip('/')}/{path.lstrip('/')}",
+        params=params,
+        headers=api.default_headers,
+        timeout=api.timeout,
+        stream=True,
+    ) as response:
+        response.raise_for_status()
+
+        yield from iter_json_array(response.iter_content(chunk_size=CHUNK_BYTES))
@@ -1,7 +1,9 @@
-from typing import List, Optional, Set
+from typing import Iterable, Iterator, NamedTuple, Optional, Set, Type
 
 import pydantic
 
+import gamma_depth_engine
+
 
 class WitsRecordMetadata(pydantic.BaseModel):
     drillstring_id: str = pydantic.Field(..., alias="drillstring")
@@ -20,69 +22,85 @@ class WitsRecord(pydantic.BaseModel):
     metadata: WitsRecordMetadata
 
 
-class GammaDepthEvent(pydantic.BaseModel):
-    records: pydantic.conlist(WitsRecord, min_items=1)
+class ColumnarGammaDepthEvent(NamedTuple):
+    """Gamma depth event of a WITS page, that keeps values of records in typed arrays.
 
-    @property
-    def asset_id(self) -> int:
-        # asset id is the same among all records, that's why we fetch from the first one
-        return self.records[0].asset_id
+    A record takes four array elements instead of three models and their
+    values. Drillstring ids are kept once per event, interned, and each record
+    refers to its id by position.
+    """
+
+    asset_id: int
+    company_id: int
+    columns: gamma_depth_engine.GammaDepthColumns
+
+    @classmethod
+    def parse_records(
+        cls, raw_records: Iterable[dict], trusted: bool = False
+    ) -> Optional['ColumnarGammaDepthEvent']:
+        """Validates records one at a time, returns None if there are none.
+
+        No model outlives its record, so the records may be streamed. Trusted
+        records are read as is, only the first one is validated to fail fast
+        if the schema changes.
+        """
+
+        builder = gamma_depth_engine.ColumnsBuilder()
+        first_record = None
+
+        for raw_record in raw_records:
+            if first_record is None or not trusted:
+                record = WitsRecord.parse_obj(raw_record)
+                first_record = first_record or record
+
+                builder.append(
+                    timestamp=record.timestamp,
+                    bit_depth=record.data.bit_depth,
+                    gamma_ray=record.data.gamma_ray,
+                    drillstring_id=record.metadata.drillstring_id,
+                )
+            else:
+                builder.append(
+                    timestamp=raw_record['timestamp'],
+                    bit_depth=raw_record['data']['bit_depth'],
+                    gamma_ray=raw_record['data']['gamma_ray'],
+                    drillstring_id=raw_record['metadata']['drillstring'],
+                )
+
+        if first_record is None:
+            return None
+
+        # asset and company are the same among all records of the event
+        return cls(
+            asset_id=first_record.asset_id,
+            company_id=first_record.company_id,
+            columns=builder.build(),
+        )
 
     @property
     def drillstring_ids(self) -> Set[str]:
         """Returns unique drillstring ids."""
 
-        ids = set(record.metadata.drillstring_id for record in self.records)
-
-        return ids
-
-
-class DrillstringDataComponent(pydantic.BaseModel):
-    family: str
-    gamma_sensor_to_bit_distance: Optional[float]
-    has_gamma_sensor: Optional[bool] = False
-
-    @property
-    def is_mwd_with_gamma_sensor(self):
-        return (
-            self.family == 'mwd'
-            and self.has_gamma_sensor
-            and self.gamma_sensor_to_bit_distance is not None
-        )
-
-
-class DrillstringData(pydantic.BaseModel):
-    components: List[DrillstringDataComponent]
+        return set(self.columns.drillstring_ids)
 
 
-class Drillstring(pydantic.BaseModel):
-    """Needed subset of drillstring response fields"""
+def _field_paths(model: Type[pydantic.BaseModel], prefix: str = '') -> Iterator[str]:
+    for field in model.__fields__.values():
+        path = f'{prefix}{field.alias}'
 
-    id: str = pydantic.Field(..., alias="_id")
-    data: DrillstringData
+        # field.type_ is the item type for lists, e.g. List[DrillstringDataComponent]
+        type_ = field.type_
 
-    @property
-    def mwd_with_gamma_sensor(self) -> Optional[DrillstringDataComponent]:
-        """Returns MWD component with a gamma sensor."""
+        if isinstance(type_, type) and issubclass(type_, pydantic.BaseModel):
+            yield from _field_paths(type_, prefix=f'{path}.')
+        else:
+            yield path
 
-        for component in self.data.components:
-            if component.is_mwd_with_gamma_sensor:
-                return component
 
-        return None
+def fields_projection(model: Type[pydantic.BaseModel]) -> str:
+    """Returns the model fields in the format of get_dataset fields parameter.
 
+    Nested fields are separated with dots, e.g. "data.bit_depth".
+    """
 
-class ActualGammaDepthData(pydantic.BaseModel):
-    bit_depth: float
-    gamma_depth: float
-    gamma_ray: float
-
-
-class ActualGammaDepth(pydantic.BaseModel):
-    asset_id: int
-    collection: str
-    company_id: int
-    data: ActualGammaDepthData
-    provider: str
-    timestamp: int
-    version: int
+    return ','.join(_field_paths(model))
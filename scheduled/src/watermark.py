@@ -0,0 +1,30 @@
+from typing import Optional
+
+from corva import Cache
+
+
+class Watermark:
+    """Timestamp of the last posted WITS record of the asset, kept in Corva cache.
+
+    Lets the app skip records already processed by previous runs,
+    e.g. on scheduler retries or overlapping time ranges.
+    """
+
+    KEY_PREFIX = 'watermark'
+
+    def __init__(self, cache: Cache, asset_id: int):
+        self.cache = cache
+        self.key = f'{self.KEY_PREFIX}/{asset_id}'
+
+    def load(self) -> Optional[int]:
+        value = self.cache.load(key=self.key)
+
+        return None if value is None else int(value)
+
+    def advance(self, timestamp: int) -> None:
+        """Moves the watermark to the timestamp, never backwards."""
+
+        if (current := self.load()) is not None and current >= timestamp:
+            return
+
+        self.cache.store(key=self.key, value=timestamp)
@@ -0,0 +1,22 @@
+import pytest
+
+from pytest_mock import MockerFixture
+
+from gamma_depth_io import drillstring_index
+from src.configuration import SETTINGS
+
+
+@pytest.fixture(autouse=True)
+def _clear_warm_drillstring_indexes():
+    """Tests must not share drillstrings, indexed in process memory."""
+
+    drillstring_index._INDEXES.clear()
+    yield
+    drillstring_index._INDEXES.clear()
+
+
+@pytest.fixture(autouse=True)
+def _single_request_attempt(mocker: MockerFixture):
+    """Failed requests fail the invocation, unless a test enables retries."""
+
+    mocker.patch.object(SETTINGS, 'request_attempts', 1)
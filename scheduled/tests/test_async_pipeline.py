@@ -0,0 +1,164 @@
+import pytest
+from corva import Api, ScheduledEvent
+from pytest_mock import MockerFixture
+from requests import HTTPError
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from gamma_depth_io import writer
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+
+
+def make_wits_record(timestamp: int, drillstring: str) -> dict:
+    return {
+        'asset_id': 0,
+        'company_id': 1,
+        'timestamp': timestamp,
+        'data': {'bit_depth': 3.0 + timestamp, 'gamma_ray': 4.0},
+        'metadata': {'drillstring': drillstring},
+    }
+
+
+def make_drillstring(drillstring_id: str, distance: float) -> dict:
+    return {
+        '_id': drillstring_id,
+        'data': {
+            'components': [
+                {
+                    'family': 'mwd',
+                    'has_gamma_sensor': True,
+                    'gamma_sensor_to_bit_distance': distance,
+                }
+            ]
+        },
+    }
+
+
+WITS_RECORDS = [
+    make_wits_record(timestamp, drillstring)
+    for timestamp, drillstring in ((2, '5'), (3, '5'), (4, '6'), (5, '6'), (6, '5'))
+]
+DRILLSTRINGS = [make_drillstring('5', 1.0), make_drillstring('6', 2.0)]
+
+
+def serve(query: dict, dataset: str, limit: int, **kwargs) -> list:
+    if dataset == SETTINGS.wits_collection:
+        timestamp = query['timestamp']
+        return [
+            record
+            for record in WITS_RECORDS
+            if timestamp.get('$gte', 0) <= record['timestamp'] <= timestamp['$lte']
+            and record['timestamp'] > timestamp.get('$gt', -1)
+        ][:limit]
+
+    return [
+        drillstring
+        for drillstring in DRILLSTRINGS
+        if drillstring['_id'] in query['_id']['$in']
+    ]
+
+
+def posted_entries(post_mock) -> list:
+    # pages are posted concurrently, so in no particular order
+    return sorted(
+        (entry for request in post_mock.request_history for entry in request.json()),
+        key=lambda entry: entry['timestamp'],
+    )
+
+
+@pytest.fixture
+def event(mocker: MockerFixture) -> ScheduledEvent:
+    mocker.patch.object(SETTINGS, 'wits_page_size', 2)
+    mocker.patch.object(SETTINGS, 'drillstring_cache_ttl', 0)
+
+    return ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=10)
+
+
+def test_async_output_equals_sequential_output(
+    event, mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    mocker.patch.object(Api, 'get_dataset', side_effect=serve)
+    post_mock = requests_mock.post(ANY)
+
+    # the same records get posted twice
+    mocker.patch.object(SETTINGS, 'watermark_enabled', False)
+    mocker.patch.object(SETTINGS, 'written_ranges_enabled', False)
+
+    app_runner(lambda_handler, event)
+    sequential = posted_entries(post_mock)
+    post_mock.reset()
+
+    mocker.patch.object(SETTINGS, 'async_pipeline', True)
+    app_runner(lambda_handler, event)
+
+    assert [entry['timestamp'] for entry in sequential] == [2, 3, 4, 5, 6]
+    assert posted_entries(post_mock) == sequential
+
+
+def test_pages_post_with_one_executor_sized_for_all_pages(
+    event, mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    mocker.patch.object(Api, 'get_dataset', side_effect=serve)
+    requests_mock.post(ANY)
+    mocker.patch.object(SETTINGS, 'async_pipeline', True)
+    mocker.patch.object(SETTINGS, 'async_pages_in_flight', 2)
+    mocker.patch.object(SETTINGS, 'post_workers', 3)
+    post_chunks_spy = mocker.spy(writer, 'post_chunks')
+    get_session_spy = mocker.spy(writer, 'get_session')
+
+    app_runner(lambda_handler, event)
+
+    assert post_chunks_spy.call_count == 3
+    executors = {id(call.kwargs['executor']) for call in post_chunks_spy.call_args_list}
+    assert len(executors) == 1
+    assert {call.kwargs['pool_size'] for call in get_session_spy.call_args_list} == {6}
+
+
+def test_drillstring_is_looked_up_once_for_all_pages(
+    event, mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    get_dataset_mock = mocker.patch.object(Api, 'get_dataset', side_effect=serve)
+    requests_mock.post(ANY)
+    mocker.patch.object(SETTINGS, 'async_pipeline', True)
+
+    app_runner(lambda_handler, event)
+
+    drillstring_queries = [
+        set(call.kwargs['query']['_id']['$in'])
+        for call in get_dataset_mock.call_args_list
+        if call.kwargs['dataset'] == SETTINGS.drillstring_collection
+    ]
+    assert sorted(drillstring_queries, key=sorted) == [{'5'}, {'6'}]
+
+
+def test_watermark_stops_before_failed_page(
+    event, mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    get_dataset_mock = mocker.patch.object(Api, 'get_dataset', side_effect=serve)
+    mocker.patch.object(SETTINGS, 'async_pipeline', True)
+
+    def fail_second_page(request, context):
+        if request.json()[0]['timestamp'] == 4:
+            context.status_code = 500
+
+        return ''
+
+    post_mock = requests_mock.post(ANY, text=fail_second_page)
+
+    with pytest.raises(HTTPError):
+        app_runner(lambda_handler, event)
+
+    # the page after the failed one is posted too, but the watermark stays behind
+    assert len(post_mock.request_history) == 3
+    get_dataset_mock.reset_mock()
+    post_mock = requests_mock.post(ANY)
+
+    app_runner(lambda_handler, event)
+
+    assert [
+        call.kwargs['query']['timestamp']
+        for call in get_dataset_mock.call_args_list
+        if call.kwargs['dataset'] == SETTINGS.wits_collection
+    ][0] == {'$gte': 4, '$lte': 10}
+    # written ranges skip the page, that was posted after the failed one
+    assert [entry['timestamp'] for entry in posted_entries(post_mock)] == [4, 5]
@@ -0,0 +1,90 @@
+import tracemalloc
+from typing import List
+
+import pydantic
+import pytest
+
+import gamma_depth_engine
+from src.models import ColumnarGammaDepthEvent, WitsRecord
+
+
+def make_wits_records(count: int, drillstring_prefix: str = '') -> List[dict]:
+    return [
+        {
+            'asset_id': 1,
+            'company_id': 2,
+            'timestamp': index,
+            'data': {'bit_depth': 1000.0 + index / 100, 'gamma_ray': index % 150},
+            'metadata': {'drillstring': f'{drillstring_prefix}{index // 7}'},
+        }
+        for index in range(count)
+    ]
+
+
+def parse_wits_records(raw_records: List[dict]) -> List[WitsRecord]:
+    return pydantic.parse_obj_as(List[WitsRecord], raw_records)
+
+
+def retained_bytes(parse, raw_records: List[dict]) -> int:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        parsed = parse(raw_records)  # noqa: F841, kept alive until measured
+
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('trusted', (False, True))
+def test_columnar_event_equals_records(trusted):
+    raw_records = make_wits_records(30)
+    records = parse_wits_records(raw_records)
+
+    columnar_event = ColumnarGammaDepthEvent.parse_records(raw_records, trusted=trusted)
+
+    expected = gamma_depth_engine.to_columns(records)
+    assert columnar_event.asset_id == 1
+    assert columnar_event.company_id == 2
+    assert columnar_event.drillstring_ids == {
+        record.metadata.drillstring_id for record in records
+    }
+    assert columnar_event.columns.drillstring_ids == expected.drillstring_ids
+    for actual, wanted in zip(columnar_event.columns[:4], expected[:4]):
+        assert actual.tolist() == wanted.tolist()
+
+
+def test_no_records():
+    assert ColumnarGammaDepthEvent.parse_records([]) is None
+
+
+def test_every_record_is_validated():
+    raw_records = make_wits_records(3)
+    del raw_records[2]['data']['gamma_ray']
+
+    with pytest.raises(pydantic.ValidationError):
+        ColumnarGammaDepthEvent.parse_records(raw_records)
+
+
+def test_drillstring_ids_are_interned():
+    # ids are built at runtime, so each page gets strings of its own
+    first, second = (
+        ColumnarGammaDepthEvent.parse_records(
+            make_wits_records(20, drillstring_prefix='id-')
+        )
+        for _ in range(2)
+    )
+
+    assert all(
+        a is b
+        for a, b in zip(first.columns.drillstring_ids, second.columns.drillstring_ids)
+    )
+
+
+def test_records_take_an_order_of_magnitude_less_memory():
+    raw_records = make_wits_records(5000)
+
+    model_bytes = retained_bytes(parse_wits_records, raw_records)
+    columnar_bytes = retained_bytes(ColumnarGammaDepthEvent.parse_records, raw_records)
+
+    assert columnar_bytes * 10 < model_bytes
@@ -0,0 +1,75 @@
+import pytest
+from corva import Api, ScheduledEvent
+from pytest_mock import MockerFixture
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from gamma_depth_io import drillstring_index
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+
+
+@pytest.mark.parametrize(
+    'drillstrings',
+    (
+        [],
+        [{"_id": '', "data": {"components": []}}],
+        [
+            {
+                "_id": '',
+                "data": {
+                    "components": [
+                        {
+                            "family": "mwd",
+                            "has_gamma_sensor": True,
+                            "gamma_sensor_to_bit_distance": 1.0,
+                        }
+                    ]
+                },
+            }
+        ],
+    ),
+    ids=(
+        "drillstring data was not received from api",
+        "drillstring has no mwd with gamma sensor",
+        "drillstring has mwd with gamma sensor",
+    ),
+)
+def test_drillstring_is_fetched_once_between_invokes(
+    drillstrings,
+    mocker: MockerFixture,
+    requests_mock: RequestsMocker,
+    app_runner,
+):
+    event = ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=3)
+    wits_record = {
+        'asset_id': 0,
+        'company_id': 1,
+        'timestamp': 2,
+        'data': {'bit_depth': 3.0, 'gamma_ray': 4.0},
+        'metadata': {'drillstring': ''},
+    }
+
+    get_dataset_mock = mocker.patch.object(
+        Api, 'get_dataset', side_effect=[[wits_record], drillstrings, [wits_record]]
+    )
+    post_mock = requests_mock.post(ANY)
+    # the same records get posted twice
+    mocker.patch.object(SETTINGS, 'written_ranges_enabled', False)
+    mocker.patch.object(SETTINGS, 'watermark_enabled', False)
+
+    app_runner(lambda_handler, event)
+    # a new container, that has only the Corva cache
+    drillstring_index._INDEXES.clear()
+    app_runner(lambda_handler, event)
+
+    assert [
+        call.kwargs['dataset'] for call in get_dataset_mock.call_args_list
+    ] == ['wits', 'data.drillstring', 'wits']
+    assert (
+        get_dataset_mock.call_args_list[0].kwargs['query']
+        == get_dataset_mock.call_args_list[2].kwargs['query']
+    )
+    assert (
+        post_mock.request_history[0].json()
+        == post_mock.request_history[1].json()
+    )
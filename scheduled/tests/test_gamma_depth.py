@@ -1,19 +1,22 @@
 import contextlib
 
+import pydantic
 import pytest
 from corva import Api, ScheduledEvent
 from pytest_mock import MockerFixture
-from requests_mock import Mocker as RequestsMocker
+from requests_mock import ANY, Mocker as RequestsMocker
 
-from lambda_function import lambda_handler
-from src.configuration import SETTINGS
-from src.models import (
+from gamma_depth_engine.models import (
     ActualGammaDepth,
     ActualGammaDepthData,
     Drillstring,
     DrillstringData,
     DrillstringDataComponent,
-    GammaDepthEvent,
+)
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+from src.models import (
+    ColumnarGammaDepthEvent,
     WitsRecord,
     WitsRecordData,
     WitsRecordMetadata,
@@ -46,8 +49,8 @@ def test_early_return_if_no_records_fetched(
     event = ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=3)
 
     mocker.patch.object(
-        GammaDepthEvent,
-        '__init__',
+        ColumnarGammaDepthEvent,
+        'parse_records',
         side_effect=Exception('test_early_return_if_no_records_fetched'),
     )  # raise to return early
     mocker.patch.object(Api, 'get_dataset', return_value=records)
@@ -64,6 +67,7 @@ def test_gamma_depth_1(
     has_gamma_sensor,
     gamma_sensor_to_bit_distance,
     mocker: MockerFixture,
+    requests_mock: RequestsMocker,
     app_runner,
 ):
     wits_record = WitsRecord(
@@ -95,6 +99,7 @@ def test_gamma_depth_1(
         mocker=mocker,
         app_runner=app_runner,
         wits_record=wits_record.dict(by_alias=True),
+        requests_mock=requests_mock,
     )
 
 
@@ -128,7 +133,11 @@ def test_gamma_depth_1(
     ),
 )
 def test_gamma_depth_2(
-    drillstrings, mwd_with_gamma_sensor, mocker: MockerFixture, app_runner
+    drillstrings,
+    mwd_with_gamma_sensor,
+    mocker: MockerFixture,
+    requests_mock: RequestsMocker,
+    app_runner,
 ):
     wits_record = WitsRecord(
         asset_id=0,
@@ -146,6 +155,7 @@ def test_gamma_depth_2(
         mocker=mocker,
         app_runner=app_runner,
         wits_record=wits_record.dict(by_alias=True),
+        requests_mock=requests_mock,
     )
 
 
@@ -155,6 +165,7 @@ def _test_gamma_depth(
     mocker: MockerFixture,
     app_runner,
     wits_record,
+    requests_mock: RequestsMocker,
 ):
     event = ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=3)
 
@@ -163,11 +174,11 @@ def _test_gamma_depth(
         'get_dataset',
         side_effect=[[wits_record], drillstrings],
     )
-    post_mock = mocker.patch.object(Api, 'post')
+    post_mock = requests_mock.post(ANY)
 
     app_runner(lambda_handler, event)
 
-    assert post_mock.call_args.kwargs['data'] == [
+    assert post_mock.last_request.json() == [
         ActualGammaDepth(
             asset_id=wits_record['asset_id'],
             collection=SETTINGS.actual_gamma_depth_collection,
@@ -218,3 +229,108 @@ def test_fail_if_post_unsuccessful(
         app_runner(lambda_handler, event)
 
     assert post_mock.called_once
+
+
+def test_fetches_and_posts_wits_page_by_page(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    event = ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=10)
+    wits_records = [
+        WitsRecord(
+            asset_id=0,
+            company_id=1,
+            timestamp=timestamp,
+            data=WitsRecordData(bit_depth=3.0, gamma_ray=4.0),
+            metadata=WitsRecordMetadata(drillstring=''),
+        ).dict(by_alias=True)
+        for timestamp in (2, 3, 4)
+    ]
+
+    mocker.patch.object(SETTINGS, 'wits_page_size', 2)
+    get_dataset_mock = mocker.patch.object(
+        Api,
+        'get_dataset',
+        side_effect=[wits_records[:2], [], wits_records[2:]],
+    )
+    post_mock = requests_mock.post(ANY)
+
+    app_runner(lambda_handler, event)
+
+    wits_queries = [
+        call.kwargs['query']
+        for call in get_dataset_mock.call_args_list
+        if call.kwargs['dataset'] == SETTINGS.wits_collection
+    ]
+    assert [query['timestamp'] for query in wits_queries] == [
+        {'$gte': 2, '$lte': 10},
+        {'$gt': 3, '$lte': 10},
+    ]
+    # drillstring is fetched only once for all pages
+    assert get_dataset_mock.call_count == 3
+    assert [
+        [entry['timestamp'] for entry in request.json()]
+        for request in post_mock.request_history
+    ] == [[2, 3], [4]]
+
+
+def test_trusted_input_output_equals_validated_output(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    event = ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=10)
+    wits_records = [
+        WitsRecord(
+            asset_id=0,
+            company_id=1,
+            timestamp=timestamp,
+            data=WitsRecordData(bit_depth=3.0 + timestamp, gamma_ray=4.0),
+            metadata=WitsRecordMetadata(drillstring=drillstring),
+        ).dict(by_alias=True)
+        for timestamp, drillstring in ((2, '5'), (3, '6'))
+    ]
+    drillstrings = [
+        {
+            "_id": '5',
+            "data": {
+                "components": [
+                    {
+                        "family": "mwd",
+                        "has_gamma_sensor": True,
+                        "gamma_sensor_to_bit_distance": 1.0,
+                    }
+                ]
+            },
+        }
+    ]
+
+    mocker.patch.object(SETTINGS, 'drillstring_cache_ttl', 0)
+    mocker.patch.object(
+        Api,
+        'get_dataset',
+        side_effect=[wits_records, drillstrings, wits_records, drillstrings],
+    )
+    post_mock = requests_mock.post(ANY)
+
+    # the same records get posted twice
+    mocker.patch.object(SETTINGS, 'written_ranges_enabled', False)
+    mocker.patch.object(SETTINGS, 'watermark_enabled', False)
+
+    app_runner(lambda_handler, event)
+    mocker.patch.object(SETTINGS, 'trusted_input', True)
+    app_runner(lambda_handler, event)
+
+    validated, trusted = (request.json() for request in post_mock.request_history)
+    assert trusted == validated
+
+
+def test_trusted_input_validates_first_record(mocker: MockerFixture, app_runner):
+    event = ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=3)
+
+    mocker.patch.object(SETTINGS, 'trusted_input', True)
+    mocker.patch.object(
+        Api,
+        'get_dataset',
+        return_value=[{'asset_id': 0, 'company_id': 1, 'timestamp': 2}],
+    )
+
+    with pytest.raises(pydantic.ValidationError):
+        app_runner(lambda_handler, event)
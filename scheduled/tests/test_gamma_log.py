@@ -0,0 +1,45 @@
+import pytest
+from corva import Api, ScheduledEvent
+from pytest_mock import MockerFixture
+from requests import HTTPError
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from gamma_depth_io.gamma_log import GammaLog
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+
+
+def test_retry_counts_each_record_once(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    event = ScheduledEvent(asset_id=0, company_id=1, start_time=1, end_time=10)
+    wits_records = [
+        {
+            'asset_id': 0,
+            'company_id': 1,
+            'timestamp': timestamp,
+            'data': {'bit_depth': 100.0 + timestamp, 'gamma_ray': 4.0},
+            'metadata': {'drillstring': '5'},
+        }
+        for timestamp in (1, 2, 3)
+    ]
+
+    def get_dataset(provider, dataset, **kwargs):
+        return wits_records if dataset == SETTINGS.wits_collection else []
+
+    mocker.patch.object(Api, 'get_dataset', side_effect=get_dataset)
+    mocker.patch.object(SETTINGS, 'watermark_enabled', False)
+    mocker.patch.object(SETTINGS, 'gamma_log_bin_size', 10.0)
+    mocker.patch.object(SETTINGS, 'post_chunk_max_records', 1)
+    mocker.patch.object(SETTINGS, 'post_workers', 1)
+    add_spy = mocker.spy(GammaLog, 'add')
+    requests_mock.post(
+        ANY, [{'status_code': 200}, {'status_code': 500}, {'status_code': 200}]
+    )
+
+    with pytest.raises(HTTPError):
+        app_runner(lambda_handler, event)
+    app_runner(lambda_handler, event)
+
+    gamma_log = add_spy.call_args.args[0]
+    assert [entry.records for entry in gamma_log.query(100.0, 110.0)] == [3]
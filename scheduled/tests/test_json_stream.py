@@ -0,0 +1,167 @@
+import json
+import tracemalloc
+import urllib.parse
+
+import pytest
+from corva import Api, ScheduledEvent
+from corva.configuration import SETTINGS as CORVA_SETTINGS
+from pytest_mock import MockerFixture
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from gamma_depth_io import writer
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+from src.json_stream import iter_json_array
+
+BODY = json.dumps(
+    [
+        {'a': 1, 'b': {'c': [1.5, None, True]}},
+        {'text': 'comma, brace } and bracket ]'},
+        {'unicode': 'Gamma Γ'},
+    ],
+    ensure_ascii=False,
+    indent=1,
+).encode()
+
+
+@pytest.mark.parametrize('chunk_bytes', (1, 7, len(BODY)))
+def test_objects_are_decoded_across_chunks(chunk_bytes):
+    chunks = [
+        BODY[start:start + chunk_bytes] for start in range(0, len(BODY), chunk_bytes)
+    ]
+
+    assert list(iter_json_array(chunks)) == json.loads(BODY)
+
+
+@pytest.mark.parametrize(
+    'body,items',
+    [(b'[]', []), (b' \n[ ]', []), (b'[{}]', [{}])],
+)
+def test_empty_objects_and_arrays(body, items):
+    assert list(iter_json_array([body])) == items
+
+
+@pytest.mark.parametrize('body', (b'[{"a": 1}', b'{"a": 1}', b'[1, 2]', b''))
+def test_invalid_body(body):
+    with pytest.raises(ValueError):
+        list(iter_json_array([body]))
+
+
+def make_wits_record(asset_id: int, timestamp: int) -> dict:
+    return {
+        'asset_id': asset_id,
+        'company_id': 1,
+        'timestamp': timestamp,
+        'data': {'bit_depth': 1000.0 + timestamp / 10, 'gamma_ray': timestamp % 150},
+        'metadata': {'drillstring': '5'},
+    }
+
+
+def mock_wits(mocker: MockerFixture, requests_mock: RequestsMocker, count: int):
+    """Serves count WITS records of the asset, each page rendered on request."""
+
+    def get_dataset(provider, dataset, query, limit, **kwargs):
+        if dataset != SETTINGS.wits_collection:
+            return []
+
+        return [json.loads(record) for record in page(query, limit)]
+
+    def page(query: dict, limit: int) -> list:
+        timestamp = query['timestamp']
+        first = max(timestamp.get('$gte', 1), timestamp.get('$gt', 0) + 1)
+        last = min(timestamp['$lte'], count, first + limit - 1)
+
+        return [
+            json.dumps(make_wits_record(query['asset_id'], timestamp))
+            for timestamp in range(first, last + 1)
+        ]
+
+    def wits_body(request, context) -> bytes:
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(request.url).query)
+        records = page(json.loads(params['query'][0]), int(params['limit'][0]))
+
+        return f"[{','.join(records)}]".encode()
+
+    mocker.patch.object(Api, 'get_dataset', side_effect=get_dataset)
+    requests_mock.get(
+        f'{CORVA_SETTINGS.DATA_API_ROOT_URL}/api/v1/data/corva/'
+        f'{SETTINGS.wits_collection}/',
+        content=wits_body,
+    )
+
+
+class FakeResponse:
+    ok = True
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Keeps no history of posted bodies, unlike requests_mock."""
+
+    def __init__(self):
+        self.records = 0
+
+    def post(self, url, data, headers, timeout):
+        self.records += len(json.loads(data))
+
+        return FakeResponse()
+
+
+def test_streamed_output_equals_list_output(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    event = ScheduledEvent(asset_id=0, company_id=1, start_time=1, end_time=100)
+
+    mock_wits(mocker, requests_mock, count=25)
+    mocker.patch.object(SETTINGS, 'wits_page_size', 10)
+    mocker.patch.object(SETTINGS, 'watermark_enabled', False)
+    # the same records get posted twice
+    mocker.patch.object(SETTINGS, 'written_ranges_enabled', False)
+    post_mock = requests_mock.post(ANY)
+
+    app_runner(lambda_handler, event)
+    mocker.patch.object(SETTINGS, 'streaming_wits', True)
+    app_runner(lambda_handler, event)
+
+    bodies = [request.json() for request in post_mock.request_history]
+    assert len(bodies) == 6
+    assert bodies[:3] == bodies[3:]
+    assert [len(body) for body in bodies[:3]] == [10, 10, 5]
+
+
+def test_peak_memory_does_not_grow_with_records(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    session = FakeSession()
+    mocker.patch.object(writer, '_SESSION', session)
+    mocker.patch.object(SETTINGS, 'wits_page_size', 250)
+
+    def peak_bytes(asset_id: int, count: int, streaming: bool) -> int:
+        mock_wits(mocker, requests_mock, count=count)
+        mocker.patch.object(SETTINGS, 'streaming_wits', streaming)
+        event = ScheduledEvent(
+            asset_id=asset_id, company_id=1, start_time=1, end_time=count
+        )
+
+        tracemalloc.start()
+        try:
+            app_runner(lambda_handler, event)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    # warm up lazy imports and caches
+    peak_bytes(asset_id=1, count=500, streaming=True)
+    peak_bytes(asset_id=2, count=500, streaming=False)
+
+    small = peak_bytes(asset_id=3, count=1000, streaming=True)
+    large = peak_bytes(asset_id=4, count=5000, streaming=True)
+    listed = peak_bytes(asset_id=5, count=1000, streaming=False)
+
+    assert session.records == 8000
+    assert large < small * 1.5
+    # neither the response list nor the models of a page are built
+    assert small < listed
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from corva import Api, ScheduledEvent
+from pytest_mock import MockerFixture
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from gamma_depth_io import metrics
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+
+
+@pytest.mark.parametrize('enabled', (True, False))
+def test_emits_one_metrics_line_per_invocation(
+    enabled, mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    event = ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=10)
+    wits_records = [
+        {
+            'asset_id': 0,
+            'company_id': 1,
+            'timestamp': timestamp,
+            'data': {'bit_depth': 3.0, 'gamma_ray': 4.0},
+            'metadata': {'drillstring': drillstring},
+        }
+        for timestamp, drillstring in ((2, '5'), (3, '6'), (4, '5'))
+    ]
+
+    mocker.patch.object(SETTINGS, 'metrics_enabled', enabled)
+    mocker.patch.object(SETTINGS, 'wits_page_size', 2)
+    mocker.patch.object(
+        Api,
+        'get_dataset',
+        side_effect=[
+            wits_records[:2],
+            [
+                {
+                    '_id': '5',
+                    'data': {
+                        'components': [
+                            {
+                                'family': 'mwd',
+                                'has_gamma_sensor': True,
+                                'gamma_sensor_to_bit_distance': 1.0,
+                            }
+                        ]
+                    },
+                }
+            ],
+            wits_records[2:],
+        ],
+    )
+    post_mock = requests_mock.post(ANY)
+    info_mock = mocker.patch.object(metrics.Logger, 'info')
+
+    app_runner(lambda_handler, event)
+
+    if not enabled:
+        info_mock.assert_not_called()
+        return
+
+    info_mock.assert_called_once()
+    line = json.loads(info_mock.call_args.args[0])['gamma_depth_metrics']
+
+    assert (line['asset_id'], line['start_time'], line['end_time']) == (0, 2, 10)
+    assert set(line['phases']) == {
+        'wits_fetch',
+        'parse',
+        'dedupe',
+        'drillstrings',
+        'compute',
+        'post',
+    }
+    assert line['counters'] == {
+        'pages': 2,
+        'records_in': 3,
+        'records_duplicate': 0,
+        'records_already_written': 0,
+        'records_without_offset': 1,
+        'records_out': 3,
+        'chunks': 2,
+        'payload_bytes': sum(
+            len(request.body) for request in post_mock.request_history
+        ),
+    }
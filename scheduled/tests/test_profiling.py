@@ -0,0 +1,86 @@
+import cProfile
+import json
+import pstats
+import tracemalloc
+
+import pytest
+from corva import Api, ScheduledEvent
+from corva.configuration import SETTINGS as CORVA_SETTINGS
+from corva.logger import setup_logging
+from pytest_mock import MockerFixture
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+
+EVENT = ScheduledEvent(asset_id=7, company_id=1, start_time=0, end_time=99)
+
+
+@pytest.fixture
+def mocked_api(mocker: MockerFixture, requests_mock: RequestsMocker):
+    def get_dataset(provider, dataset, query, **kwargs):
+        if dataset != SETTINGS.wits_collection:
+            return []
+
+        return [
+            {
+                'asset_id': 7,
+                'company_id': 1,
+                'timestamp': timestamp,
+                'data': {'bit_depth': 3.0 + timestamp, 'gamma_ray': 4.0},
+                'metadata': {'drillstring': '5'},
+            }
+            for timestamp in range(100)
+        ]
+
+    mocker.patch.object(Api, 'get_dataset', side_effect=get_dataset)
+    requests_mock.post(ANY)
+
+
+def run_logged(app_runner) -> None:
+    """Runs the app with the log handler, that corva handlers set up."""
+
+    with setup_logging(
+        aws_request_id='', asset_id=EVENT.asset_id, app_connection_id=None
+    ):
+        app_runner(lambda_handler, EVENT)
+
+
+def profile_lines(output: str) -> list:
+    return [line for line in output.splitlines() if 'gamma_depth_profile' in line]
+
+
+@pytest.mark.usefixtures('mocked_api')
+def test_profiled_asset_logs_a_profile(
+    tmp_path, mocker: MockerFixture, app_runner, capsys
+):
+    mocker.patch.object(SETTINGS, 'profile_asset_ids', {7})
+    mocker.patch.object(SETTINGS, 'profile_dir', str(tmp_path))
+
+    run_logged(app_runner)
+
+    (line,) = profile_lines(capsys.readouterr().out)
+    # corva Logger would have truncated the line
+    assert len(line) > CORVA_SETTINGS.LOG_THRESHOLD_MESSAGE_SIZE
+    profile = json.loads(line)['gamma_depth_profile']
+
+    assert profile['asset_id'] == 7
+    assert profile['peak_bytes'] > 0
+    assert profile['threads'] > 1  # chunks are posted from pool threads
+    assert len(profile['functions']) == SETTINGS.profile_top
+    assert any('gamma_depth' in function for function, *_ in profile['functions'])
+    assert 0 < len(profile['allocations']) <= SETTINGS.profile_top
+    assert not tracemalloc.is_tracing()
+    # full stats are dumped for offline analysis
+    assert pstats.Stats(profile['stats_file']).total_calls > 0
+
+
+@pytest.mark.usefixtures('mocked_api')
+def test_other_assets_are_not_profiled(mocker: MockerFixture, app_runner, capsys):
+    mocker.patch.object(SETTINGS, 'profile_asset_ids', {8})
+    profile_mock = mocker.patch.object(cProfile, 'Profile')
+
+    run_logged(app_runner)
+
+    profile_mock.assert_not_called()
+    assert profile_lines(capsys.readouterr().out) == []
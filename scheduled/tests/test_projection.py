@@ -0,0 +1,96 @@
+from typing import List
+
+import pytest
+from corva import Api, ScheduledEvent
+from pytest_mock import MockerFixture
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from gamma_depth_engine.models import Drillstring
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+from src.gamma_depth import DRILLSTRING_FIELDS, WITS_FIELDS
+from src.models import WitsRecord, fields_projection
+
+WITS_RECORD = {
+    '_id': '1',
+    'asset_id': 0,
+    'company_id': 1,
+    'timestamp': 2,
+    'collection': 'wits',
+    'data': {'bit_depth': 3.0, 'gamma_ray': 4.0, 'hole_depth': 5.0, 'rop': 6.0},
+    'metadata': {'drillstring': '7', 'source': 'rig'},
+}
+DRILLSTRING = {
+    '_id': '7',
+    'asset_id': 0,
+    'data': {
+        'id': 8,
+        'components': [
+            {
+                'family': 'mwd',
+                'has_gamma_sensor': True,
+                'gamma_sensor_to_bit_distance': 1.0,
+                'length': 30.0,
+            },
+            {'family': 'bit', 'size': 8.5},
+        ],
+    },
+}
+
+
+def project(document, paths: List[List[str]]):
+    """Keeps only given paths of the document, like the data api does."""
+
+    if isinstance(document, list):
+        return [project(item, paths) for item in document]
+
+    projected = {}
+    for key in {path[0] for path in paths}:
+        if key not in document:
+            continue
+
+        nested_paths = [path[1:] for path in paths if path[0] == key and path[1:]]
+        projected[key] = (
+            project(document[key], nested_paths) if nested_paths else document[key]
+        )
+
+    return projected
+
+
+@pytest.mark.parametrize(
+    'model,fields,document',
+    (
+        (WitsRecord, WITS_FIELDS, WITS_RECORD),
+        (Drillstring, DRILLSTRING_FIELDS, DRILLSTRING),
+    ),
+)
+def test_projection_covers_all_model_fields(model, fields, document):
+    paths = [field.split('.') for field in fields.split(',')]
+
+    assert model.parse_obj(project(document, paths)) == model.parse_obj(document)
+
+
+def test_drillstring_fields_constant_is_the_model_projection():
+    assert DRILLSTRING_FIELDS == fields_projection(Drillstring)
+
+
+def test_queries_use_projection(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    get_dataset_mock = mocker.patch.object(
+        Api, 'get_dataset', side_effect=[[WITS_RECORD], [DRILLSTRING]]
+    )
+    requests_mock.post(ANY)
+
+    app_runner(
+        lambda_handler,
+        ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=3),
+    )
+
+    assert {
+        call.kwargs['dataset']: call.kwargs['fields']
+        for call in get_dataset_mock.call_args_list
+    } == {
+        SETTINGS.wits_collection: WITS_FIELDS,
+        SETTINGS.drillstring_collection: DRILLSTRING_FIELDS,
+    }
@@ -0,0 +1,69 @@
+import requests
+from corva import Api, ScheduledEvent
+from pytest_mock import MockerFixture
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from gamma_depth_io import retry
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+
+
+def make_wits_record(timestamp: int) -> dict:
+    return {
+        'asset_id': 0,
+        'company_id': 1,
+        'timestamp': timestamp,
+        'data': {'bit_depth': 3.0, 'gamma_ray': 4.0},
+        'metadata': {'drillstring': ''},
+    }
+
+
+def test_late_failures_are_retried_within_the_invocation(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    mocker.patch.object(retry.time, 'sleep')
+    mocker.patch.object(SETTINGS, 'request_attempts', 3)
+    mocker.patch.object(SETTINGS, 'wits_page_size', 1)
+    wits_pages = iter(
+        [
+            [make_wits_record(2)],
+            requests.ConnectionError(),
+            [make_wits_record(3)],
+            [],
+        ]
+    )
+    wits_queries = []
+
+    def get_dataset(provider, dataset, query, **kwargs):
+        if dataset != SETTINGS.wits_collection:
+            return []
+
+        wits_queries.append(query['timestamp'])
+
+        if isinstance(page := next(wits_pages), Exception):
+            raise page
+
+        return page
+
+    mocker.patch.object(Api, 'get_dataset', side_effect=get_dataset)
+    post_mock = requests_mock.post(
+        ANY, [{'status_code': 200}, {'status_code': 504}, {'status_code': 200}]
+    )
+
+    app_runner(
+        lambda_handler,
+        ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=5),
+    )
+
+    # only the failed requests are made again, not the whole invocation
+    assert wits_queries == [
+        {'$gte': 2, '$lte': 5},
+        {'$gt': 2, '$lte': 5},
+        {'$gt': 2, '$lte': 5},
+        {'$gt': 3, '$lte': 5},
+    ]
+    assert [
+        record['timestamp']
+        for request in post_mock.request_history
+        for record in request.json()
+    ] == [2, 3, 3]
@@ -0,0 +1,93 @@
+import pytest
+from corva import Api, ScheduledEvent
+from pytest_mock import MockerFixture
+from requests import HTTPError
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+
+
+def make_wits_record(timestamp: int) -> dict:
+    return {
+        'asset_id': 0,
+        'company_id': 1,
+        'timestamp': timestamp,
+        'data': {'bit_depth': 3.0, 'gamma_ray': 4.0},
+        'metadata': {'drillstring': ''},
+    }
+
+
+def wits_timestamp_queries(get_dataset_mock) -> list:
+    return [
+        call.kwargs['query']['timestamp']
+        for call in get_dataset_mock.call_args_list
+        if call.kwargs['dataset'] == SETTINGS.wits_collection
+    ]
+
+
+def test_next_run_starts_after_the_watermark(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    get_dataset_mock = mocker.patch.object(
+        Api,
+        'get_dataset',
+        side_effect=[[make_wits_record(2), make_wits_record(4)], [], []],
+    )
+    requests_mock.post(ANY)
+
+    # the last time range is behind the watermark, so nothing gets fetched
+    for start_time, end_time in ((2, 5), (3, 8), (1, 4)):
+        app_runner(
+            lambda_handler,
+            ScheduledEvent(
+                asset_id=0, company_id=1, start_time=start_time, end_time=end_time
+            ),
+        )
+
+    assert wits_timestamp_queries(get_dataset_mock) == [
+        {'$gte': 2, '$lte': 5},
+        {'$gte': 5, '$lte': 8},
+    ]
+
+
+def test_watermark_does_not_move_if_post_fails(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    event = ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=5)
+    get_dataset_mock = mocker.patch.object(
+        Api,
+        'get_dataset',
+        side_effect=[[make_wits_record(2)], [], [make_wits_record(2)]],
+    )
+    requests_mock.post(ANY, [{'status_code': 500}, {'status_code': 200}])
+
+    with pytest.raises(HTTPError):
+        app_runner(lambda_handler, event)
+    app_runner(lambda_handler, event)
+
+    assert wits_timestamp_queries(get_dataset_mock) == [
+        {'$gte': 2, '$lte': 5},
+        {'$gte': 2, '$lte': 5},
+    ]
+
+
+def test_watermark_disabled(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    event = ScheduledEvent(asset_id=0, company_id=1, start_time=2, end_time=5)
+    get_dataset_mock = mocker.patch.object(
+        Api,
+        'get_dataset',
+        side_effect=[[make_wits_record(2)], [], [make_wits_record(2)]],
+    )
+    requests_mock.post(ANY)
+    mocker.patch.object(SETTINGS, 'watermark_enabled', False)
+
+    app_runner(lambda_handler, event)
+    app_runner(lambda_handler, event)
+
+    assert wits_timestamp_queries(get_dataset_mock) == [
+        {'$gte': 2, '$lte': 5},
+        {'$gte': 2, '$lte': 5},
+    ]
@@ -0,0 +1,86 @@
+import pytest
+from corva import Api, ScheduledEvent
+from pytest_mock import MockerFixture
+from requests import HTTPError
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+
+EVENT = ScheduledEvent(asset_id=0, company_id=1, start_time=1, end_time=10)
+
+
+def mock_wits(mocker: MockerFixture, timestamps) -> None:
+    wits_records = [
+        {
+            'asset_id': 0,
+            'company_id': 1,
+            'timestamp': timestamp,
+            'data': {'bit_depth': 3.0 + index, 'gamma_ray': 4.0},
+            'metadata': {'drillstring': '5'},
+        }
+        for index, timestamp in enumerate(timestamps)
+    ]
+
+    def get_dataset(provider, dataset, **kwargs):
+        return wits_records if dataset == SETTINGS.wits_collection else []
+
+    mocker.patch.object(Api, 'get_dataset', side_effect=get_dataset)
+
+
+def posted_timestamps(post_mock) -> list:
+    return [
+        [record['timestamp'] for record in request.json()]
+        for request in post_mock.request_history
+    ]
+
+
+def test_duplicate_timestamps_are_posted_once(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    mock_wits(mocker, [1, 2, 2, 3])
+    post_mock = requests_mock.post(ANY)
+
+    app_runner(lambda_handler, EVENT)
+
+    # the last record of a timestamp wins
+    assert [
+        (record['timestamp'], record['data']['bit_depth'])
+        for record in post_mock.last_request.json()
+    ] == [(1, 3.0), (2, 5.0), (3, 6.0)]
+
+
+def test_retry_posts_only_missing_chunks(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    mock_wits(mocker, [1, 2, 3])
+    mocker.patch.object(SETTINGS, 'watermark_enabled', False)
+    mocker.patch.object(SETTINGS, 'post_chunk_max_records', 1)
+    mocker.patch.object(SETTINGS, 'post_workers', 1)
+    post_mock = requests_mock.post(
+        ANY, [{'status_code': 200}, {'status_code': 500}, {'status_code': 200}]
+    )
+
+    with pytest.raises(HTTPError):
+        app_runner(lambda_handler, EVENT)
+
+    assert posted_timestamps(post_mock) == [[1], [2], [3]]
+
+    app_runner(lambda_handler, EVENT)
+    app_runner(lambda_handler, EVENT)
+
+    assert posted_timestamps(post_mock) == [[1], [2], [3], [2]]
+
+
+def test_written_ranges_disabled(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    mock_wits(mocker, [1, 2])
+    mocker.patch.object(SETTINGS, 'watermark_enabled', False)
+    mocker.patch.object(SETTINGS, 'written_ranges_enabled', False)
+    post_mock = requests_mock.post(ANY)
+
+    app_runner(lambda_handler, EVENT)
+    app_runner(lambda_handler, EVENT)
+
+    assert posted_timestamps(post_mock) == [[1, 2], [1, 2]]
@@ -1,8 +1,21 @@
 from corva import Api, Cache, StreamTimeEvent, stream
 
+from src.configuration import SETTINGS
 from src.gamma_depth import gamma_depth
 
 
 @stream
 def lambda_handler(event: StreamTimeEvent, api: Api, cache: Cache) -> None:
-    gamma_depth(event=event, api=api)
+    if event.asset_id not in SETTINGS.profile_asset_ids:
+        gamma_depth(event=event, api=api, cache=cache)
+        return
+
+    # profilers are imported only, when the asset is profiled
+    from gamma_depth_io.profiling import profiled
+
+    with profiled(
+        asset_id=event.asset_id,
+        top=SETTINGS.profile_top,
+        directory=SETTINGS.profile_dir,
+    ):
+        gamma_depth(event=event, api=api, cache=cache)
@@ -1,11 +1,8 @@
-import pydantic
+from gamma_depth_io.configuration import AppSettings
 
 
-class Settings(pydantic.BaseSettings):
-    provider: str
-    actual_gamma_depth_collection: str = 'actual-gamma-depth'
-    drillstring_collection: str = 'data.drillstring'
-    version: int = 1
+class Settings(AppSettings):
+    pass
 
 
 SETTINGS = Settings()
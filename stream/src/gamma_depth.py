@@ -1,86 +1,160 @@
-from typing import Dict, List, Optional
+import functools
+from typing import Optional
 
-import pydantic
-from corva import Api, StreamTimeEvent
+from corva import Api, Cache, StreamTimeEvent
 
+import gamma_depth_engine
+from gamma_depth_io import drillstring_index, writer
+from gamma_depth_io.gamma_log import get_gamma_log
+from gamma_depth_io.metrics import InvocationMetrics
+from gamma_depth_io.written_ranges import WrittenRanges, record_posted
 from src.configuration import SETTINGS
-from src.models import (
-    ActualGammaDepth,
-    ActualGammaDepthData,
-    Drillstring,
-    GammaDepthEvent,
-)
+from src.models import ColumnarGammaDepthEvent, WitsRecord
 
 
-def parse_event(event: StreamTimeEvent) -> Optional[GammaDepthEvent]:
-    event = GammaDepthEvent.parse_obj(event)
+def parse_event_columnar(event: StreamTimeEvent) -> Optional[ColumnarGammaDepthEvent]:
+    """Validates the event into arrays, None if no record has drillstring id."""
 
-    new_records = GammaDepthEvent.filter_records(event=event)
+    columnar_event = ColumnarGammaDepthEvent.parse_obj(event)
 
     # return early if there are no records left after filtering
-    if not new_records:
+    if not len(columnar_event.columns.timestamp):
         return None
 
-    new_event = event.copy(update={'records': new_records}, deep=True)
+    return columnar_event
 
-    return new_event
 
+def parse_event_trusted(
+    event: StreamTimeEvent,
+) -> Optional[gamma_depth_engine.GammaDepthColumns]:
+    """Converts the event into columns without validating each record.
 
-def gamma_depth(event: StreamTimeEvent, api: Api) -> None:
-    event = parse_event(event=event)
+    Only the first record is validated, to fail fast if the payload schema changes.
+    """
 
-    if not event:
+    WitsRecord.parse_obj(event.records[0])
+
+    records = [record for record in event.records if record.metadata.get('drillstring')]
+
+    # return early if there are no records left after filtering
+    if not records:
+        return None
+
+    # reads raw record data and metadata, skipping the models
+    return gamma_depth_engine.build_columns(
+        count=len(records),
+        timestamps=(record.timestamp for record in records),
+        bit_depths=(record.data['bit_depth'] for record in records),
+        gamma_rays=(record.data['gamma_ray'] for record in records),
+        drillstring_ids=(record.metadata['drillstring'] for record in records),
+    )
+
+
+def gamma_depth(event: StreamTimeEvent, api: Api, cache: Cache) -> None:
+    metrics = InvocationMetrics(enabled=SETTINGS.metrics_enabled)
+
+    try:
+        _gamma_depth(event=event, api=api, cache=cache, metrics=metrics)
+    finally:
+        metrics.emit(asset_id=event.asset_id)
+
+
+def _gamma_depth(
+    event: StreamTimeEvent, api: Api, cache: Cache, metrics: InvocationMetrics
+) -> None:
+    metrics.count('records_in', len(event.records))
+
+    with metrics.phase('parse'):
+        if SETTINGS.trusted_input:
+            columns = parse_event_trusted(event=event)
+        elif parsed_event := parse_event_columnar(event=event):
+            columns = parsed_event.columns
+        else:
+            columns = None
+
+    if columns is None:
+        metrics.count('records_without_drillstring', len(event.records))
+        return
+
+    metrics.count(
+        'records_without_drillstring', len(event.records) - len(columns.timestamp)
+    )
+
+    written_ranges = (
+        WrittenRanges(cache=cache, asset_id=event.asset_id)
+        if SETTINGS.written_ranges_enabled
+        else None
+    )
+
+    with metrics.phase('dedupe'):
+        deduped = gamma_depth_engine.dedupe(
+            columns=columns,
+            written=[] if written_ranges is None else written_ranges.load(),
+        )
+        columns = deduped.columns
+
+    metrics.count('records_duplicate', deduped.duplicates)
+    metrics.count('records_already_written', deduped.already_written)
+
+    if not len(columns.timestamp):
         return
 
-    # no exception handling. if request fails, lambda will be reinvoked.
-    raw_drillstrings = api.get_dataset(
-        provider='corva',
-        dataset=SETTINGS.drillstring_collection,
-        query={"asset_id": event.asset_id, "_id": {"$in": list(event.drillstring_ids)}},
-        sort={"timestamp": 1},
-        limit=100,
-        fields="_id,data",
+    with metrics.phase('drillstrings'):
+        id_to_distance = drillstring_index.resolve(
+            api=api,
+            cache=cache,
+            asset_id=event.asset_id,
+            drillstring_ids=set(columns.drillstring_ids),
+            fields="_id,data",
+            settings=SETTINGS,
+        )
+
+    with metrics.phase('compute'):
+        result = gamma_depth_engine.run(
+            columns=columns,
+            id_to_distance=id_to_distance,
+            asset_id=event.asset_id,
+            company_id=event.company_id,
+            provider=SETTINGS.provider,
+            collection=SETTINGS.actual_gamma_depth_collection,
+            version=SETTINGS.version,
+            prerendered_envelope=SETTINGS.prerendered_envelope,
+            decimation=SETTINGS.output_decimation,
+            depth_bin_size=SETTINGS.output_depth_bin_size,
+        )
+
+    metrics.count('records_without_offset', result.records_without_offset)
+
+    gamma_log = get_gamma_log(
+        api=api,
+        cache=cache,
+        asset_id=event.asset_id,
+        company_id=event.company_id,
+        settings=SETTINGS,
     )
-    drillstrings = pydantic.parse_obj_as(List[Drillstring], raw_drillstrings)
-
-    id_to_drillstring = {
-        drillstring.id: drillstring for drillstring in drillstrings
-    }  # type: Dict[str, Drillstring]
-
-    actual_gamma_depths = []
-    for record in event.records:  # build actual gamma depth for each record
-        gamma_depth_val = record.data.bit_depth
-
-        # The record may be tagged with a drillstring,
-        # that gets deleted before the Lambda run.
-        # Data about this drillstring won't be received from the api,
-        # thus missing from the dict.
-        drillstring = id_to_drillstring.get(record.metadata.drillstring_id)
-
-        if drillstring and (mwd_with_gamma_sensor := drillstring.mwd_with_gamma_sensor):
-            gamma_depth_val = (
-                record.data.bit_depth
-                - mwd_with_gamma_sensor.gamma_sensor_to_bit_distance
-            )
-
-        actual_gamma_depths.append(
-            ActualGammaDepth(
-                asset_id=event.asset_id,
-                collection=SETTINGS.actual_gamma_depth_collection,
-                company_id=event.company_id,
-                data=ActualGammaDepthData(
-                    gamma_depth=gamma_depth_val,
-                    bit_depth=record.data.bit_depth,
-                    gamma_ray=record.data.gamma_ray,
-                ),
-                provider=SETTINGS.provider,
-                timestamp=record.timestamp,
-                version=SETTINGS.version,
-            )
+
+    with metrics.phase('post'):
+        # chunks are retried on transient errors. if one still fails, lambda will be
+        # reinvoked and written ranges let it post only the rest.
+        statuses = writer.post_chunks(
+            api=api,
+            provider=SETTINGS.provider,
+            collection=SETTINGS.actual_gamma_depth_collection,
+            records=result.rows,
+            max_records=SETTINGS.post_chunk_max_records,
+            max_bytes=SETTINGS.post_chunk_max_bytes,
+            workers=SETTINGS.post_concurrency,
+            on_posted=(
+                None
+                if written_ranges is None and gamma_log is None
+                else functools.partial(
+                    record_posted, columns, result, written_ranges, gamma_log
+                )
+            ),
+            attempts=SETTINGS.request_attempts,
+            backoff=SETTINGS.request_backoff,
         )
 
-    # if request fails, lambda will be reinvoked. so no exception handling
-    api.post(
-        f"api/v1/data/{SETTINGS.provider}/{SETTINGS.actual_gamma_depth_collection}/",
-        data=[entry.dict() for entry in actual_gamma_depths],
-    ).raise_for_status()
+    metrics.count('records_out', len(result.rows))
+    metrics.count('chunks', len(statuses))
+    metrics.count('payload_bytes', sum(status.bytes for status in statuses))
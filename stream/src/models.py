@@ -1,100 +1,73 @@
 from __future__ import annotations
 
-import copy
-from typing import List, Optional, Set
+from typing import NamedTuple, Optional, Set
 
 import pydantic
 from corva import StreamTimeEvent, StreamTimeRecord
 
+import gamma_depth_engine
+
 
 class WitsRecordMetadata(pydantic.BaseModel):
     drillstring_id: Optional[str] = pydantic.Field(None, alias="drillstring")
 
+    class Config:
+        allow_mutation = False
+
 
 class WitsRecordData(pydantic.BaseModel):
     bit_depth: float
     gamma_ray: float
 
+    class Config:
+        allow_mutation = False
+
 
 class WitsRecord(StreamTimeRecord):
     data: WitsRecordData
     metadata: WitsRecordMetadata
 
 
-class GammaDepthEvent(StreamTimeEvent):
-    records: pydantic.conlist(WitsRecord, min_items=1)
-
-    @staticmethod
-    def filter_records(event: GammaDepthEvent) -> List[WitsRecord]:
-        """filters records with no drillstring_id"""
+class ColumnarGammaDepthEvent(NamedTuple):
+    """Gamma depth event, that keeps values of records in typed arrays.
 
-        new_records = [
-            copy.deepcopy(record)
-            for record in event.records
-            if record.metadata.drillstring_id
-        ]
+    A record takes four array elements instead of three models and their
+    values. Drillstring ids are kept once per event, interned, and each record
+    refers to its id by position.
+    """
 
-        return new_records
+    asset_id: int
+    company_id: int
+    columns: gamma_depth_engine.GammaDepthColumns
 
-    @property
-    def drillstring_ids(self) -> Set[str]:
-        """returns unique drillstring ids"""
+    @classmethod
+    def parse_obj(cls, event: StreamTimeEvent) -> ColumnarGammaDepthEvent:
+        """Validates records one at a time and keeps the ones with drillstring id.
 
-        ids = set(
-            record.metadata.drillstring_id
-            for record in self.records
-            if record.metadata and record.metadata.drillstring_id
-        )
+        Records are validated as WitsRecord, but no model outlives its record.
+        """
 
-        return ids
+        builder = gamma_depth_engine.ColumnsBuilder()
 
+        for raw_record in event.records:
+            record = WitsRecord.validate(raw_record)
 
-class DrillstringDataComponent(pydantic.BaseModel):
-    family: str
-    gamma_sensor_to_bit_distance: Optional[float]
-    has_gamma_sensor: Optional[bool] = False
+            if record.metadata.drillstring_id:
+                builder.append(
+                    timestamp=record.timestamp,
+                    bit_depth=record.data.bit_depth,
+                    gamma_ray=record.data.gamma_ray,
+                    drillstring_id=record.metadata.drillstring_id,
+                )
 
-    @property
-    def is_mwd_with_gamma_sensor(self):
-        return (
-            self.family == 'mwd'
-            and self.has_gamma_sensor
-            and self.gamma_sensor_to_bit_distance is not None
+        return cls(
+            asset_id=event.asset_id,
+            company_id=event.company_id,
+            columns=builder.build(),
         )
 
-
-class DrillstringData(pydantic.BaseModel):
-    components: List[DrillstringDataComponent]
-
-
-class Drillstring(pydantic.BaseModel):
-    """Needed subset of drillstring response fields"""
-
-    id: str = pydantic.Field(..., alias="_id")
-    data: DrillstringData
-
     @property
-    def mwd_with_gamma_sensor(self) -> Optional[DrillstringDataComponent]:
-        """returns MWD component with a gamma sensor"""
-
-        for component in self.data.components:
-            if component.is_mwd_with_gamma_sensor:
-                return component
-
-        return None
-
-
-class ActualGammaDepthData(pydantic.BaseModel):
-    bit_depth: float
-    gamma_depth: float
-    gamma_ray: float
-
+    def drillstring_ids(self) -> Set[str]:
+        """returns unique drillstring ids"""
 
-class ActualGammaDepth(pydantic.BaseModel):
-    asset_id: int
-    collection: str
-    company_id: int
-    data: ActualGammaDepthData
-    provider: str
-    timestamp: int
-    version: int
+        return set(self.columns.drillstring_ids)
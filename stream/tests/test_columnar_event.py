@@ -0,0 +1,86 @@
+import tracemalloc
+from typing import List
+
+import pydantic
+from corva import StreamTimeEvent, StreamTimeRecord
+
+import gamma_depth_engine
+from src.models import ColumnarGammaDepthEvent, WitsRecord
+
+
+def make_event(count: int, drillstring_prefix: str = '') -> StreamTimeEvent:
+    return StreamTimeEvent(
+        asset_id=1,
+        company_id=2,
+        records=[
+            StreamTimeRecord(
+                timestamp=index,
+                data={'bit_depth': 1000.0 + index / 100, 'gamma_ray': index % 150},
+                # every 10th record has no drillstring and gets filtered out
+                metadata=(
+                    {}
+                    if index % 10 == 0
+                    else {'drillstring': f'{drillstring_prefix}{index // 7}'}
+                ),
+            )
+            for index in range(count)
+        ],
+    )
+
+
+def parse_wits_records(event: StreamTimeEvent) -> List[WitsRecord]:
+    return pydantic.parse_obj_as(List[WitsRecord], event.records)
+
+
+def retained_bytes(parse, event: StreamTimeEvent) -> int:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        parsed = parse(event)  # noqa: F841, kept alive until measured
+
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def test_columnar_event_equals_records_with_drillstring():
+    event = make_event(30)
+    records = [
+        record
+        for record in parse_wits_records(event)
+        if record.metadata.drillstring_id
+    ]
+
+    columnar_event = ColumnarGammaDepthEvent.parse_obj(event)
+
+    expected = gamma_depth_engine.to_columns(records)
+    assert columnar_event.asset_id == 1
+    assert columnar_event.company_id == 2
+    assert columnar_event.drillstring_ids == {
+        record.metadata.drillstring_id for record in records
+    }
+    assert columnar_event.columns.drillstring_ids == expected.drillstring_ids
+    for actual, wanted in zip(columnar_event.columns[:4], expected[:4]):
+        assert actual.tolist() == wanted.tolist()
+
+
+def test_drillstring_ids_are_interned():
+    # ids are built at runtime, so each event gets strings of its own
+    first, second = (
+        ColumnarGammaDepthEvent.parse_obj(make_event(20, drillstring_prefix='id-'))
+        for _ in range(2)
+    )
+
+    assert all(
+        a is b
+        for a, b in zip(first.columns.drillstring_ids, second.columns.drillstring_ids)
+    )
+
+
+def test_records_take_an_order_of_magnitude_less_memory():
+    event = make_event(5000)
+
+    model_bytes = retained_bytes(parse_wits_records, event)
+    columnar_bytes = retained_bytes(ColumnarGammaDepthEvent.parse_obj, event)
+
+    assert columnar_bytes * 10 < model_bytes
@@ -0,0 +1,68 @@
+import pytest
+from corva import Api, StreamTimeEvent, StreamTimeRecord
+from pytest_mock import MockerFixture
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+
+
+@pytest.mark.parametrize(
+    'drillstrings',
+    (
+        [],
+        [{"_id": '5', "data": {"components": []}}],
+        [
+            {
+                "_id": '5',
+                "data": {
+                    "components": [
+                        {
+                            "family": "mwd",
+                            "has_gamma_sensor": True,
+                            "gamma_sensor_to_bit_distance": 1.0,
+                        }
+                    ]
+                },
+            }
+        ],
+    ),
+    ids=(
+        "drillstring data was not received from api",
+        "drillstring has no mwd with gamma sensor",
+        "drillstring has mwd with gamma sensor",
+    ),
+)
+def test_drillstring_is_fetched_once_between_invokes(
+    drillstrings,
+    mocker: MockerFixture,
+    requests_mock: RequestsMocker,
+    app_runner,
+):
+    event = StreamTimeEvent(
+        asset_id=0,
+        company_id=1,
+        records=[
+            StreamTimeRecord(
+                timestamp=2,
+                data={'bit_depth': 3, 'gamma_ray': 4},
+                metadata={'drillstring': '5'},
+            )
+        ],
+    )
+
+    get_dataset_mock = mocker.patch.object(
+        Api, 'get_dataset', return_value=drillstrings
+    )
+    post_mock = requests_mock.post(ANY)
+    # the same records get posted twice
+    mocker.patch.object(SETTINGS, 'written_ranges_enabled', False)
+
+    app_runner(lambda_handler, event)
+    app_runner(lambda_handler, event)
+
+    get_dataset_mock.assert_called_once()
+    assert (
+        post_mock.request_history[0].json()
+        == post_mock.request_history[1].json()
+    )
@@ -1,23 +1,23 @@
 import contextlib
 from typing import List
 
+import pydantic
 import pytest
 import requests_mock as requests_mock_lib
 from corva import Api, StreamTimeEvent, StreamTimeRecord
 from pytest_mock import MockerFixture
 from requests import HTTPError
 
-from lambda_function import lambda_handler
-from src.configuration import SETTINGS
-from src.models import (
+from gamma_depth_engine.models import (
     ActualGammaDepth,
     ActualGammaDepthData,
     Drillstring,
     DrillstringData,
     DrillstringDataComponent,
-    WitsRecordData,
-    WitsRecordMetadata,
 )
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+from src.models import WitsRecordData, WitsRecordMetadata
 
 
 @pytest.mark.parametrize(
@@ -73,6 +73,7 @@ def test_gamma_depth_1(
     has_gamma_sensor,
     gamma_sensor_to_bit_distance,
     mocker: MockerFixture,
+    requests_mock: requests_mock_lib.Mocker,
     app_runner,
 ):
     event = StreamTimeEvent(
@@ -107,6 +108,7 @@ def test_gamma_depth_1(
         drillstrings=[drillstring.dict(by_alias=True)],
         expected_gamma_depth=expected_gamma_depth,
         mocker=mocker,
+        requests_mock=requests_mock,
         app_runner=app_runner,
     )
 
@@ -141,7 +143,11 @@ def test_gamma_depth_1(
     ),
 )
 def test_gamma_depth_2(
-    drillstrings, mwd_with_gamma_sensor, mocker: MockerFixture, app_runner
+    drillstrings,
+    mwd_with_gamma_sensor,
+    mocker: MockerFixture,
+    requests_mock: requests_mock_lib.Mocker,
+    app_runner,
 ):
     event = StreamTimeEvent(
         asset_id=0,
@@ -162,6 +168,7 @@ def test_gamma_depth_2(
         drillstrings=drillstrings,
         expected_gamma_depth=expected_gamma_depth,
         mocker=mocker,
+        requests_mock=requests_mock,
         app_runner=app_runner,
     )
 
@@ -171,6 +178,7 @@ def _test_gamma_depth(
     drillstrings: List[dict],
     expected_gamma_depth: float,
     mocker: MockerFixture,
+    requests_mock: requests_mock_lib.Mocker,
     app_runner,
 ):
     mocker.patch.object(
@@ -178,11 +186,11 @@ def _test_gamma_depth(
         'get_dataset',
         return_value=drillstrings,
     )
-    post_mock = mocker.patch.object(Api, 'post')
+    post_mock = requests_mock.post(requests_mock_lib.ANY)
 
     app_runner(lambda_handler, event)
 
-    assert post_mock.call_args.kwargs['data'] == [
+    assert post_mock.last_request.json() == [
         ActualGammaDepth(
             asset_id=event.asset_id,
             collection=SETTINGS.actual_gamma_depth_collection,
@@ -234,3 +242,66 @@ def test_fail_if_couldnt_post(
         app_runner(lambda_handler, event)
 
     assert post_mock.called_once
+
+
+def test_trusted_input_output_equals_validated_output(
+    mocker: MockerFixture, requests_mock: requests_mock_lib.Mocker, app_runner
+):
+    event = StreamTimeEvent(
+        asset_id=0,
+        company_id=1,
+        records=[
+            StreamTimeRecord(
+                timestamp=timestamp,
+                data=WitsRecordData(bit_depth=3 + timestamp, gamma_ray=4).dict(),
+                metadata=metadata,
+            )
+            for timestamp, metadata in enumerate(
+                ({"drillstring": "5"}, {}, {"drillstring": "6"})
+            )
+        ],
+    )
+
+    mocker.patch.object(
+        Api,
+        'get_dataset',
+        return_value=[
+            {
+                "_id": '5',
+                "data": {
+                    "components": [
+                        {
+                            "family": "mwd",
+                            "has_gamma_sensor": True,
+                            "gamma_sensor_to_bit_distance": 1.0,
+                        }
+                    ]
+                },
+            }
+        ],
+    )
+    post_mock = requests_mock.post(requests_mock_lib.ANY)
+
+    # the same records get posted twice
+    mocker.patch.object(SETTINGS, 'written_ranges_enabled', False)
+
+    app_runner(lambda_handler, event)
+    mocker.patch.object(SETTINGS, 'trusted_input', True)
+    app_runner(lambda_handler, event)
+
+    validated, trusted = (request.json() for request in post_mock.request_history)
+    assert len(trusted) == 2
+    assert trusted == validated
+
+
+def test_trusted_input_validates_first_record(mocker: MockerFixture, app_runner):
+    event = StreamTimeEvent(
+        asset_id=0,
+        company_id=1,
+        records=[StreamTimeRecord(timestamp=2, data={"bit_depth": 3}, metadata={})],
+    )
+
+    mocker.patch.object(SETTINGS, 'trusted_input', True)
+
+    with pytest.raises(pydantic.ValidationError):
+        app_runner(lambda_handler, event)
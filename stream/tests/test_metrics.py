@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from corva import Api, StreamTimeEvent, StreamTimeRecord
+from pytest_mock import MockerFixture
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from gamma_depth_io import metrics
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+
+
+@pytest.mark.parametrize('enabled', (True, False))
+def test_emits_one_metrics_line_per_invocation(
+    enabled, mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    event = StreamTimeEvent(
+        asset_id=0,
+        company_id=1,
+        records=[
+            StreamTimeRecord(
+                timestamp=timestamp,
+                data={'bit_depth': 3, 'gamma_ray': 4},
+                metadata=metadata,
+            )
+            for timestamp, metadata in enumerate(
+                ({'drillstring': '5'}, {}, {'drillstring': '6'})
+            )
+        ],
+    )
+
+    mocker.patch.object(SETTINGS, 'metrics_enabled', enabled)
+    mocker.patch.object(
+        Api,
+        'get_dataset',
+        return_value=[
+            {
+                '_id': '5',
+                'data': {
+                    'components': [
+                        {
+                            'family': 'mwd',
+                            'has_gamma_sensor': True,
+                            'gamma_sensor_to_bit_distance': 1.0,
+                        }
+                    ]
+                },
+            }
+        ],
+    )
+    post_mock = requests_mock.post(ANY)
+    info_mock = mocker.patch.object(metrics.Logger, 'info')
+
+    app_runner(lambda_handler, event)
+
+    if not enabled:
+        info_mock.assert_not_called()
+        return
+
+    info_mock.assert_called_once()
+    line = json.loads(info_mock.call_args.args[0])['gamma_depth_metrics']
+
+    assert line['asset_id'] == 0
+    assert set(line['phases']) == {
+        'parse',
+        'dedupe',
+        'drillstrings',
+        'compute',
+        'post',
+    }
+    assert line['counters'] == {
+        'records_in': 3,
+        'records_without_drillstring': 1,
+        'records_duplicate': 0,
+        'records_already_written': 0,
+        'records_without_offset': 1,
+        'records_out': 2,
+        'chunks': 1,
+        'payload_bytes': len(post_mock.last_request.body),
+    }
@@ -0,0 +1,95 @@
+import pytest
+from corva import Api, StreamTimeEvent, StreamTimeRecord
+from pytest_mock import MockerFixture
+from requests import HTTPError
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from lambda_function import lambda_handler
+from src.configuration import SETTINGS
+
+
+def make_event(timestamps) -> StreamTimeEvent:
+    return StreamTimeEvent(
+        asset_id=0,
+        company_id=1,
+        records=[
+            StreamTimeRecord(
+                timestamp=timestamp,
+                data={'bit_depth': 3 + index, 'gamma_ray': 4},
+                metadata={'drillstring': '5'},
+            )
+            for index, timestamp in enumerate(timestamps)
+        ],
+    )
+
+
+def posted_timestamps(post_mock) -> list:
+    return [
+        [record['timestamp'] for record in request.json()]
+        for request in post_mock.request_history
+    ]
+
+
+def test_duplicate_timestamps_are_posted_once(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    mocker.patch.object(Api, 'get_dataset', return_value=[])
+    post_mock = requests_mock.post(ANY)
+
+    app_runner(lambda_handler, make_event([3, 1, 3, 2]))
+
+    # sorted by timestamp, the last record of a timestamp wins
+    assert [
+        (record['timestamp'], record['data']['bit_depth'])
+        for record in post_mock.last_request.json()
+    ] == [(1, 4), (2, 6), (3, 5)]
+
+
+def test_retry_posts_only_missing_chunks(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    event = make_event([1, 2, 3])
+
+    mocker.patch.object(Api, 'get_dataset', return_value=[])
+    mocker.patch.object(SETTINGS, 'post_chunk_max_records', 1)
+    mocker.patch.object(SETTINGS, 'post_workers', 1)
+    post_mock = requests_mock.post(
+        ANY, [{'status_code': 200}, {'status_code': 500}, {'status_code': 200}]
+    )
+
+    with pytest.raises(HTTPError):
+        app_runner(lambda_handler, event)
+
+    assert posted_timestamps(post_mock) == [[1], [2], [3]]
+
+    app_runner(lambda_handler, event)
+    app_runner(lambda_handler, event)
+
+    assert posted_timestamps(post_mock) == [[1], [2], [3], [2]]
+
+
+def test_grouped_rows_cover_all_their_records(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    mocker.patch.object(Api, 'get_dataset', return_value=[])
+    mocker.patch.object(SETTINGS, 'output_decimation', 2)
+    post_mock = requests_mock.post(ANY)
+
+    app_runner(lambda_handler, make_event([1, 2, 3, 4]))
+    app_runner(lambda_handler, make_event([2, 4, 5]))
+
+    # rows are stamped with their first record, records 2 and 4 are written
+    assert posted_timestamps(post_mock) == [[1, 3], [5]]
+
+
+def test_written_ranges_disabled(
+    mocker: MockerFixture, requests_mock: RequestsMocker, app_runner
+):
+    mocker.patch.object(Api, 'get_dataset', return_value=[])
+    mocker.patch.object(SETTINGS, 'written_ranges_enabled', False)
+    post_mock = requests_mock.post(ANY)
+
+    app_runner(lambda_handler, make_event([1, 2]))
+    app_runner(lambda_handler, make_event([1, 2]))
+
+    assert posted_timestamps(post_mock) == [[1, 2], [1, 2]]
@@ -0,0 +1,27 @@
+import pytest
+from corva import Cache
+from corva.configuration import SETTINGS as CORVA_SETTINGS
+from corva.state.redis_state import get_cache
+
+from gamma_depth_io import drillstring_index
+
+
+@pytest.fixture(autouse=True)
+def _clear_warm_drillstring_indexes():
+    """Tests must not share drillstrings, indexed in process memory."""
+
+    drillstring_index._INDEXES.clear()
+    yield
+    drillstring_index._INDEXES.clear()
+
+
+@pytest.fixture
+def cache() -> Cache:
+    return get_cache(
+        asset_id=0,
+        app_stream_id=int(),
+        app_connection_id=int(),
+        provider=CORVA_SETTINGS.PROVIDER,
+        app_key=CORVA_SETTINGS.APP_KEY,
+        cache_url=CORVA_SETTINGS.CACHE_URL,
+    )
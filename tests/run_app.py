@@ -0,0 +1,91 @@
+"""Runs lambda_handler of an app once and prints the documents it posted.
+
+Usage: python -m tests.run_app stream < input.json
+
+Input is a JSON object with WITS records of a single asset under 'wits'
+and their drillstrings under 'drillstrings'. The stream app gets the records
+in its event, the scheduled app fetches them for the event time range.
+Data API requests are served from the input, posted documents are printed
+as a JSON list ordered by timestamp.
+
+Apps share the `src` package name, so each of them runs in a process of its own.
+"""
+
+import inspect
+import json
+import re
+import sys
+
+from benchmarks import TEST_ENV, use_app
+
+
+def run(app: str, wits: list, drillstrings: list) -> list:
+    # modules are imported here, as `src` package is resolved by use_app
+    import requests_mock
+    from corva import Api, ScheduledEvent, StreamTimeEvent
+
+    from benchmarks.pipeline import MemoryCache
+    from lambda_function import lambda_handler
+    from src.configuration import SETTINGS
+
+    asset_id, company_id = wits[0]['asset_id'], wits[0]['company_id']
+
+    if app == 'stream':
+        event = StreamTimeEvent(
+            asset_id=asset_id,
+            company_id=company_id,
+            records=[
+                {key: record[key] for key in ('timestamp', 'data', 'metadata')}
+                for record in wits
+            ],
+        )
+    else:
+        event = ScheduledEvent(
+            asset_id=asset_id,
+            company_id=company_id,
+            start_time=min(record['timestamp'] for record in wits),
+            end_time=max(record['timestamp'] for record in wits),
+        )
+
+    api = Api(
+        api_url=TEST_ENV['API_ROOT_URL'],
+        data_api_url=TEST_ENV['DATA_API_ROOT_URL'],
+        api_key='',
+        app_key='',
+    )
+
+    def dataset_url(dataset: str):
+        return re.compile(re.escape(f'/api/v1/data/corva/{dataset}/'))
+
+    with requests_mock.Mocker() as mocker:
+        mocker.get(dataset_url(SETTINGS.drillstring_collection), json=drillstrings)
+        mocker.get(
+            dataset_url(getattr(SETTINGS, 'wits_collection', 'wits')),
+            json=[
+                record
+                for record in wits
+                if record['metadata'].get('drillstring') is not None
+            ],
+        )
+        post_mock = mocker.post(re.compile('.*'))
+
+        inspect.unwrap(lambda_handler)(event, api, MemoryCache())
+
+    documents = [
+        document
+        for request in post_mock.request_history
+        for document in request.json()
+    ]
+
+    return sorted(documents, key=lambda document: document['timestamp'])
+
+
+def main():
+    app = sys.argv[1]
+    use_app(app)
+
+    print(json.dumps(run(app, **json.load(sys.stdin))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import json
+import pathlib
+import sys
+
+import pytest
+from pytest_mock import MockerFixture
+
+from backfill import run
+from benchmarks import TEST_ENV
+from benchmarks.generator import START_TIMESTAMP
+from tests.test_parity import make_input, run_app
+
+
+def write_jsonl(path: pathlib.Path, documents: list) -> pathlib.Path:
+    path.write_text(''.join(json.dumps(document) + '\n' for document in documents))
+
+    return path
+
+
+def read_jsonl(path: pathlib.Path) -> list:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def make_record(timestamp: int, drillstring='1', **data) -> dict:
+    return {
+        'asset_id': 1,
+        'company_id': 2,
+        'timestamp': timestamp,
+        'data': {'bit_depth': 1000.0, 'gamma_ray': 50.0, **data},
+        'metadata': {'drillstring': drillstring},
+    }
+
+
+def use_wits(mocker: MockerFixture, wits_path: pathlib.Path, output_dir) -> None:
+    mocker.patch.object(
+        run,
+        '_STATE',
+        run.WorkerState(
+            wits_path=wits_path,
+            distances={'1': 30.0},
+            options=run.OutputOptions(
+                output_dir=output_dir,
+                provider='provider',
+                collection='actual-gamma-depth',
+                version=1,
+            ),
+        ),
+    )
+
+
+def test_lines_straddling_shard_boundaries_are_read_once(tmp_path: pathlib.Path):
+    lines = [b'{"a": %d}\n' % (10 ** index) for index in range(8)]
+    path = tmp_path / 'wits.jsonl'
+    path.write_bytes(b''.join(lines))
+
+    shards = run.make_shards(path, shard_bytes=16)
+
+    # the second line starts in the first shard and ends in the second one
+    assert len(lines[0]) < shards[0].end < len(lines[0]) + len(lines[1])
+    assert [list(run.iter_lines(path, shard)) for shard in shards][:2] == [
+        lines[:2],
+        lines[2:4],
+    ]
+    assert [line for shard in shards for line in run.iter_lines(path, shard)] == lines
+
+
+def test_records_without_values_and_duplicates_are_dropped(
+    tmp_path: pathlib.Path, mocker: MockerFixture
+):
+    wits_path = write_jsonl(
+        tmp_path / 'wits.jsonl',
+        [
+            make_record(1),
+            make_record(2, drillstring=None),
+            {**make_record(3), 'metadata': None},
+            make_record(4, bit_depth=None),
+            make_record(5, gamma_ray=None),
+            make_record(6, gamma_ray=60.0),
+            make_record(6, gamma_ray=70.0),  # resent, wins
+        ],
+    )
+    use_wits(mocker, wits_path, output_dir=tmp_path)
+
+    result = run.process_shard(run.make_shards(wits_path, shard_bytes=1 << 20)[0])
+
+    assert result == run.ShardResult(
+        index=0,
+        path='actual-gamma-depth-00000.jsonl',
+        records_in=7,
+        records_skipped=4,
+        records_duplicate=1,
+        records_out=2,
+        start_time=1,
+        end_time=6,
+    )
+    assert [
+        (document['timestamp'], document['data']['gamma_ray'])
+        for document in read_jsonl(tmp_path / result.path)
+    ] == [(1, 50.0), (6, 70.0)]
+
+
+def test_shard_without_records_to_write_has_no_file(
+    tmp_path: pathlib.Path, mocker: MockerFixture
+):
+    wits_path = write_jsonl(tmp_path / 'wits.jsonl', [make_record(1, drillstring=None)])
+    use_wits(mocker, wits_path, output_dir=tmp_path)
+
+    result = run.process_shard(run.make_shards(wits_path, shard_bytes=1 << 20)[0])
+
+    assert (result.records_in, result.records_out, result.start_time) == (1, 0, None)
+    assert not (tmp_path / result.path).exists()
+
+
+def test_shard_of_more_than_one_asset_fails(
+    tmp_path: pathlib.Path, mocker: MockerFixture
+):
+    wits_path = write_jsonl(
+        tmp_path / 'wits.jsonl', [make_record(1), {**make_record(2), 'asset_id': 3}]
+    )
+    use_wits(mocker, wits_path, output_dir=tmp_path)
+
+    with pytest.raises(ValueError, match='more than one asset'):
+        run.process_shard(run.make_shards(wits_path, shard_bytes=1 << 20)[0])
+
+
+def test_backfill_writes_the_documents_the_apps_post(
+    tmp_path: pathlib.Path, mocker: MockerFixture
+):
+    wits, drillstrings = make_input()
+    output_dir = tmp_path / 'out'
+    mocker.patch.object(
+        sys,
+        'argv',
+        [
+            'backfill.run',
+            '--wits',
+            str(write_jsonl(tmp_path / 'wits.jsonl', wits)),
+            '--drillstrings',
+            str(write_jsonl(tmp_path / 'drillstrings.jsonl', drillstrings)),
+            '--output-dir',
+            str(output_dir),
+            '--provider',
+            TEST_ENV['PROVIDER'],
+            '--workers',
+            '2',
+            '--shard-bytes',
+            '20000',
+        ],
+    )
+
+    run.main()
+
+    manifest = json.loads((output_dir / 'manifest.json').read_text())
+    documents = [
+        document
+        for file in manifest['files']
+        for document in read_jsonl(output_dir / file['path'])
+    ]
+
+    assert documents == run_app('stream', wits=wits, drillstrings=drillstrings)
+
+    untagged = len(range(0, 500, 7))
+    assert {key: value for key, value in manifest.items() if key != 'files'} == {
+        'wits': str(tmp_path / 'wits.jsonl'),
+        'drillstrings': 4,
+        'records_in': 501,
+        'records_skipped': untagged,
+        'records_duplicate': 1,
+        'records_out': 500 - untagged,
+    }
+    # shards of the export sorted by timestamp are consecutive time ranges
+    assert len(manifest['files']) > 1
+    assert manifest['files'][0]['start_time'] == START_TIMESTAMP + 1
+    assert manifest['files'][-1]['end_time'] == START_TIMESTAMP + 499
+    assert all(
+        previous['end_time'] < file['start_time']
+        for previous, file in zip(manifest['files'], manifest['files'][1:])
+    )
+    assert sum(file['records_out'] for file in manifest['files']) == len(documents)
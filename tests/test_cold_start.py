@@ -0,0 +1,30 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks import ROOT, TEST_ENV
+
+# modules, that are imported only when an invocation needs them
+DEFERRED_MODULES = ('numpy', 'gamma_depth_engine.models', 'gamma_depth_io.profiling')
+
+
+@pytest.mark.parametrize('app', ('stream', 'scheduled'))
+def test_handler_import_defers_heavy_modules(app):
+    completed = subprocess.run(
+        [
+            sys.executable,
+            '-c',
+            'import json, sys, lambda_function; '
+            'print(json.dumps(sorted(sys.modules)))',
+        ],
+        capture_output=True,
+        text=True,
+        cwd=ROOT / app,
+        env={**os.environ, **TEST_ENV},
+        check=True,
+    )
+
+    assert set(DEFERRED_MODULES).isdisjoint(json.loads(completed.stdout))
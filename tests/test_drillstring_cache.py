@@ -0,0 +1,63 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from gamma_depth_io.drillstring_cache import (
+    DrillstringCache,
+    DrillstringEntry,
+    resolved_entries,
+)
+
+
+@pytest.fixture
+def drillstring_cache(cache) -> DrillstringCache:
+    return DrillstringCache(cache=cache, asset_id=0, ttl=60)
+
+
+def test_stores_gamma_sensor_to_bit_distances(drillstring_cache: DrillstringCache):
+    entries = resolved_entries({'1': 1.5, '2': None}, ttl=60)
+    drillstring_cache.set_many(entries)
+
+    assert drillstring_cache.get_many(['1', '2', '3']) == entries
+
+
+def test_expired_entries_are_missing(
+    drillstring_cache: DrillstringCache, mocker: MockerFixture
+):
+    drillstring_cache.set_many(resolved_entries({'1': 1.5}, ttl=60))
+
+    mocker.patch('time.time', return_value=float('inf'))
+
+    assert drillstring_cache.get_many(['1']) == {}
+
+
+def test_entries_resolved_before_invalidation_are_missing(cache):
+    DrillstringCache(cache=cache, asset_id=0, ttl=60).set_many(
+        {
+            '1': DrillstringEntry(offset=1.5, resolved_at=100.0, expires_at=1e12),
+            '2': DrillstringEntry(offset=None, resolved_at=200.0, expires_at=1e12),
+        }
+    )
+
+    drillstring_cache = DrillstringCache(
+        cache=cache, asset_id=0, ttl=60, invalidated_at=200.0
+    )
+
+    assert drillstring_cache.get_many(['1', '2']).keys() == {'2'}
+
+
+def test_requested_keys_are_loaded_in_one_request(
+    drillstring_cache: DrillstringCache, mocker: MockerFixture
+):
+    drillstring_cache.set_many(resolved_entries({'1': 1.5, '2': None}, ttl=60))
+    load_all_spy = mocker.spy(drillstring_cache.cache, 'load_all')
+    load_spy = mocker.spy(drillstring_cache.cache, 'load')
+    hmget_spy = mocker.spy(drillstring_cache.cache.redis, 'hmget')
+
+    assert drillstring_cache.get_many(['1', '3']).keys() == {'1'}
+
+    load_all_spy.assert_not_called()
+    load_spy.assert_not_called()
+    hmget_spy.assert_called_once_with(
+        drillstring_cache.cache.redis.default_name,
+        ['drillstring/0/1', 'drillstring/0/3'],
+    )
@@ -0,0 +1,132 @@
+import time
+from unittest import mock
+
+from pytest_mock import MockerFixture
+
+from gamma_depth_io import drillstring_index
+from gamma_depth_io.configuration import AppSettings
+
+SETTINGS = AppSettings(provider='provider', request_attempts=1)
+
+DRILLSTRINGS = [
+    {
+        '_id': '1',
+        'data': {
+            'components': [
+                {
+                    'family': 'mwd',
+                    'has_gamma_sensor': True,
+                    'gamma_sensor_to_bit_distance': 1.5,
+                }
+            ]
+        },
+    },
+    {'_id': '2', 'data': {'components': []}},
+]
+
+
+def resolve(api, cache, drillstring_ids=frozenset({'1', '2', '3'})):
+    return drillstring_index.resolve(
+        api=api,
+        cache=cache,
+        asset_id=0,
+        drillstring_ids=set(drillstring_ids),
+        fields='',
+        settings=SETTINGS,
+    )
+
+
+def test_warm_index_is_reused_between_invocations(cache):
+    api = mock.Mock(**{'get_dataset.return_value': DRILLSTRINGS})
+
+    expected = {'1': 1.5, '2': None, '3': None}
+    assert resolve(api, cache) == expected
+
+    cache.delete_all()  # served from process memory
+    assert resolve(api, cache) == expected
+
+    api.get_dataset.assert_called_once()
+
+
+def test_cold_container_reads_corva_cache(cache):
+    api = mock.Mock(**{'get_dataset.return_value': DRILLSTRINGS})
+
+    resolve(api, cache)
+    drillstring_index._INDEXES.clear()  # simulate a cold start
+    assert resolve(api, cache) == {'1': 1.5, '2': None, '3': None}
+
+    api.get_dataset.assert_called_once()
+
+
+def test_ids_are_fetched_in_chunks(cache, mocker: MockerFixture):
+    mocker.patch.object(drillstring_index, 'DRILLSTRINGS_LIMIT', 2)
+
+    def get_dataset(query, **kwargs):
+        return [
+            drillstring
+            for drillstring in DRILLSTRINGS
+            if drillstring['_id'] in query['_id']['$in']
+        ]
+
+    api = mock.Mock(**{'get_dataset.side_effect': get_dataset})
+
+    # no id is dropped, even though every response is limited to 2 drillstrings
+    assert resolve(api, cache) == {'1': 1.5, '2': None, '3': None}
+
+    assert sorted(
+        call.kwargs['query']['_id']['$in'] for call in api.get_dataset.call_args_list
+    ) == [['1', '2'], ['3']]
+
+
+def test_invalidation_drops_warm_and_cached_distances(cache, mocker: MockerFixture):
+    api = mock.Mock(**{'get_dataset.return_value': DRILLSTRINGS})
+    resolve(api, cache)
+
+    # the drillstring got corrected after it was resolved
+    corrected = [{**DRILLSTRINGS[0], '_id': '2'}]
+    api.get_dataset.return_value = corrected
+    mocker.patch.object(SETTINGS, 'drillstring_invalidated_at', {0: time.time() + 1})
+    mocker.patch('time.time', return_value=time.time() + 2)
+
+    assert resolve(api, cache) == {'1': None, '2': 1.5, '3': None}
+    assert api.get_dataset.call_count == 2
+
+    # later invocations keep the refetched distances
+    drillstring_index._INDEXES.clear()
+    assert resolve(api, cache) == {'1': None, '2': 1.5, '3': None}
+    assert api.get_dataset.call_count == 2
+
+
+def test_index_filled_from_cache_keeps_cached_expiry(cache, mocker: MockerFixture):
+    api = mock.Mock(**{'get_dataset.return_value': DRILLSTRINGS})
+    now = time.time()
+
+    mocker.patch('time.time', return_value=now)
+    resolve(api, cache, drillstring_ids={'1', '2'})
+
+    drillstring_index._INDEXES.clear()  # a cold start just before the expiry
+    mocker.patch('time.time', return_value=now + SETTINGS.drillstring_cache_ttl - 1)
+    resolve(api, cache, drillstring_ids={'1', '2'})
+    assert api.get_dataset.call_count == 1
+
+    # the cached entries expire, so the index ones do too
+    mocker.patch('time.time', return_value=now + SETTINGS.drillstring_cache_ttl)
+    resolve(api, cache, drillstring_ids={'1', '2'})
+    assert api.get_dataset.call_count == 2
+
+
+def test_not_found_drillstrings_are_fetched_again_soon(
+    cache, mocker: MockerFixture
+):
+    api = mock.Mock(**{'get_dataset.return_value': DRILLSTRINGS})
+    now = time.time()
+
+    mocker.patch('time.time', return_value=now)
+    assert resolve(api, cache)['3'] is None
+
+    # drillstring 3 got replicated, memory and cache forget it was not found
+    api.get_dataset.return_value = [{**DRILLSTRINGS[0], '_id': '3'}]
+    mocker.patch('time.time', return_value=now + SETTINGS.drillstring_not_found_ttl)
+
+    assert resolve(api, cache) == {'1': 1.5, '2': None, '3': 1.5}
+    assert api.get_dataset.call_args.kwargs['query']['_id']['$in'] == ['3']
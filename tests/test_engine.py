@@ -0,0 +1,171 @@
+import json
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import gamma_depth_engine
+from gamma_depth_engine.models import ActualGammaDepth, ActualGammaDepthData
+
+
+@pytest.mark.parametrize('prerendered_envelope', (True, False))
+def test_output_equals_model_path(prerendered_envelope):
+    rng = random.Random(0)
+    id_to_distance = {'1': 12.5, '2': None, '3': 0.1}  # '4' is missing
+    # anything with the attributes of parsed WITS records of either app
+    records = [
+        SimpleNamespace(
+            timestamp=timestamp,
+            data=SimpleNamespace(
+                bit_depth=rng.uniform(0, 30000), gamma_ray=rng.uniform(0, 200)
+            ),
+            metadata=SimpleNamespace(drillstring_id=rng.choice('1234')),
+        )
+        for timestamp in range(1000)
+    ]
+
+    result = gamma_depth_engine.run(
+        columns=gamma_depth_engine.to_columns(records),
+        id_to_distance=id_to_distance,
+        asset_id=0,
+        company_id=1,
+        provider='provider',
+        collection='collection',
+        version=2,
+        prerendered_envelope=prerendered_envelope,
+    )
+
+    expected = []
+    for record in records:
+        gamma_depth_val = record.data.bit_depth
+        if (distance := id_to_distance.get(record.metadata.drillstring_id)) is not None:
+            gamma_depth_val = record.data.bit_depth - distance
+
+        expected.append(
+            ActualGammaDepth(
+                asset_id=0,
+                collection='collection',
+                company_id=1,
+                data=ActualGammaDepthData(
+                    gamma_depth=gamma_depth_val,
+                    bit_depth=record.data.bit_depth,
+                    gamma_ray=record.data.gamma_ray,
+                ),
+                provider='provider',
+                timestamp=record.timestamp,
+                version=2,
+            ).dict()
+        )
+
+    assert [json.loads(row) for row in result.rows] == expected
+    assert result.records_without_offset == sum(
+        id_to_distance.get(record.metadata.drillstring_id) is None
+        for record in records
+    )
+
+
+@pytest.mark.parametrize('prerendered_envelope', (True, False))
+@pytest.mark.parametrize(
+    'grouping,expected_groups',
+    [
+        # gamma depth bins 10, 10, 10, 11, 11 and 10 again, after a pull up
+        ({'depth_bin_size': 1.0, 'decimation': 4}, [(1, 3), (4, 5), (6, 6)]),
+        ({'decimation': 4}, [(1, 4), (5, 6)]),
+    ],
+)
+def test_grouped_output(grouping, expected_groups, prerendered_envelope):
+    bit_depths = [10.5, 10.9, 11.4, 11.7, 12.1, 11.3]
+    gamma_rays = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+    result = gamma_depth_engine.run(
+        columns=gamma_depth_engine.build_columns(
+            count=6,
+            timestamps=range(1, 7),
+            bit_depths=bit_depths,
+            gamma_rays=gamma_rays,
+            drillstring_ids=['1'] * 6,
+        ),
+        id_to_distance={'1': 0.5},
+        asset_id=0,
+        company_id=1,
+        provider='provider',
+        collection='collection',
+        version=2,
+        prerendered_envelope=prerendered_envelope,
+        **grouping,
+    )
+
+    expected = []
+    for first, last in expected_groups:
+        group = slice(first - 1, last)
+        records = last - first + 1
+        bit_depth = sum(bit_depths[group]) / records
+        expected.append(
+            {
+                'asset_id': 0,
+                'collection': 'collection',
+                'company_id': 1,
+                'data': {
+                    'bit_depth': pytest.approx(bit_depth),
+                    'gamma_depth': pytest.approx(bit_depth - 0.5),
+                    'gamma_ray': pytest.approx(sum(gamma_rays[group]) / records),
+                    'gamma_ray_min': min(gamma_rays[group]),
+                    'gamma_ray_max': max(gamma_rays[group]),
+                    'records': records,
+                },
+                'provider': 'provider',
+                'timestamp': first,
+                'version': 2,
+            }
+        )
+
+    assert [json.loads(row) for row in result.rows] == expected
+    groups = zip(result.first_timestamp.tolist(), result.last_timestamp.tolist())
+    assert list(groups) == expected_groups
+
+
+def test_dedupe():
+    columns = gamma_depth_engine.build_columns(
+        count=6,
+        timestamps=[5, 1, 3, 3, 7, 5],
+        bit_depths=[0.0, 1.0, 2.0, 3.0, 4.0, 5.0],
+        gamma_rays=[0.0] * 6,
+        drillstring_ids='aaaaaa',
+    )
+
+    result = gamma_depth_engine.dedupe(columns=columns, written=[(0, 1), (6, 9)])
+
+    # sorted by timestamp, the last record of a timestamp wins
+    assert result.columns.timestamp.tolist() == [3, 5]
+    assert result.columns.bit_depth.tolist() == [3.0, 5.0]
+    assert result.duplicates == 2
+    assert result.already_written == 2
+
+
+def test_merge_ranges():
+    assert gamma_depth_engine.merge_ranges(
+        [(1, 5), (10, 12)], [(6, 8), (11, 20), (30, 31)], max_ranges=10
+    ) == [(1, 8), (10, 20), (30, 31)]
+
+    # the oldest ranges are forgotten first
+    assert gamma_depth_engine.merge_ranges(
+        [(1, 5)], [(10, 12), (30, 31)], max_ranges=2
+    ) == [(10, 12), (30, 31)]
+
+
+def test_envelope_is_escaped():
+    columns = gamma_depth_engine.build_columns(
+        count=1, timestamps=[1], bit_depths=[2.0], gamma_rays=[3.0], drillstring_ids='a'
+    )
+
+    result = gamma_depth_engine.run(
+        columns=columns,
+        id_to_distance={},
+        asset_id=0,
+        company_id=1,
+        provider='"%s"',
+        collection='collection',
+        version=2,
+    )
+
+    assert json.loads(result.rows[0])['provider'] == '"%s"'
@@ -0,0 +1,115 @@
+import numpy as np
+import pydantic
+import pytest
+from corva import Api
+from pytest_mock import MockerFixture
+from requests_mock import Mocker as RequestsMocker
+
+from gamma_depth_io import gamma_log as gamma_log_module
+from gamma_depth_io.configuration import AppSettings
+from gamma_depth_io.gamma_log import GammaLog, GammaLogBin, get_gamma_log
+
+SETTINGS = AppSettings(provider='provider', request_attempts=1, gamma_log_bin_size=10)
+
+API = Api(
+    api_url='https://api.localhost.ai',
+    data_api_url='https://data.localhost.ai',
+    api_key='',
+    app_key='',
+)
+
+
+@pytest.fixture
+def gamma_log(cache) -> GammaLog:
+    return GammaLog(cache=cache, asset_id=0, bin_size=10.0)
+
+
+def test_bins_are_merged_incrementally(gamma_log: GammaLog):
+    gamma_log.add(np.array([1.0, 15.0, 5.0]), np.array([10.0, 30.0, 20.0]))
+    gamma_log.add(np.array([9.0, 25.0]), np.array([60.0, 40.0]))
+
+    assert gamma_log.query(0.0, 30.0) == [
+        GammaLogBin(
+            top=0.0, records=3, gamma_ray=30.0, gamma_ray_min=10.0, gamma_ray_max=60.0
+        ),
+        GammaLogBin(
+            top=10.0, records=1, gamma_ray=30.0, gamma_ray_min=30.0, gamma_ray_max=30.0
+        ),
+        GammaLogBin(
+            top=20.0, records=1, gamma_ray=40.0, gamma_ray_min=40.0, gamma_ray_max=40.0
+        ),
+    ]
+    assert [entry.top for entry in gamma_log.query(12.0, 19.0)] == [10.0]
+
+
+def test_query_spans_blocks(gamma_log: GammaLog, mocker: MockerFixture):
+    mocker.patch('gamma_depth_io.gamma_log.BINS_PER_BLOCK', 2)
+
+    gamma_log.add(np.arange(5.0, 100.0, 10.0), np.arange(10.0))
+
+    assert [entry.top for entry in gamma_log.query(15.0, 55.0)] == [
+        10.0,
+        20.0,
+        30.0,
+        40.0,
+        50.0,
+    ]
+
+
+def test_concurrent_invocations_keep_each_others_records(
+    gamma_log: GammaLog, mocker: MockerFixture
+):
+    merge_bins = gamma_log_module.merge_bins
+    other_invocation_done = False
+
+    def merge_after_other_invocation(*args, **kwargs):
+        nonlocal other_invocation_done
+
+        if not other_invocation_done:
+            # another invocation adds its records between this one's load and store
+            other_invocation_done = True
+            gamma_log.add(np.array([2.0]), np.array([20.0]))
+
+        return merge_bins(*args, **kwargs)
+
+    mocker.patch.object(
+        gamma_log_module, 'merge_bins', side_effect=merge_after_other_invocation
+    )
+
+    gamma_log.add(np.array([1.0]), np.array([10.0]))
+
+    assert [entry.records for entry in gamma_log.query(0.0, 10.0)] == [2]
+
+
+def test_updated_blocks_are_posted(
+    cache, requests_mock: RequestsMocker, mocker: MockerFixture
+):
+    mocker.patch('gamma_depth_io.gamma_log.BINS_PER_BLOCK', 2)
+    post_mock = requests_mock.post(
+        'https://data.localhost.ai/api/v1/data/provider/actual-gamma-depth-log/'
+    )
+    gamma_log = get_gamma_log(
+        api=API, cache=cache, asset_id=0, company_id=1, settings=SETTINGS
+    )
+
+    gamma_log.add(np.array([5.0, 15.0]), np.array([10.0, 30.0]))
+    gamma_log.add(np.array([12.0, 25.0]), np.array([50.0, 40.0]))
+
+    documents = [
+        document for request in post_mock.request_history for document in request.json()
+    ]
+    assert [document['data']['block'] for document in documents] == [0, 0, 1]
+    # a document of a block has all of its bins, the latest one is current
+    assert documents[2]['data']['top'] == 20.0
+    assert [
+        (entry['top'], entry['records'], entry['gamma_ray'])
+        for entry in documents[1]['data']['bins']
+    ] == [(0.0, 1, 10.0), (10.0, 2, 40.0)]
+    assert documents[0]['asset_id'] == 0 and documents[0]['company_id'] == 1
+
+
+def test_gamma_log_needs_written_ranges():
+    with pytest.raises(pydantic.ValidationError, match='written_ranges_enabled'):
+        AppSettings(
+            provider='provider', gamma_log_bin_size=10, written_ranges_enabled=False
+        )
@@ -0,0 +1,39 @@
+import json
+
+from pytest_mock import MockerFixture
+
+from gamma_depth_io import metrics
+
+
+def test_phases_add_up_and_counters_sum(mocker: MockerFixture):
+    mocker.patch.object(metrics.time, 'perf_counter', side_effect=[0.0, 1.5, 2.0, 2.25])
+    info_mock = mocker.patch.object(metrics.Logger, 'info')
+    invocation_metrics = metrics.InvocationMetrics(enabled=True)
+
+    for _ in range(2):
+        with invocation_metrics.phase('post'):
+            invocation_metrics.count('chunks')
+    invocation_metrics.count('records_out', 3)
+    invocation_metrics.emit(asset_id=1)
+
+    assert json.loads(info_mock.call_args.args[0]) == {
+        'gamma_depth_metrics': {
+            'asset_id': 1,
+            'phases': {'post': 1.75},
+            'counters': {'chunks': 2, 'records_out': 3},
+        }
+    }
+
+
+def test_disabled_metrics_collect_nothing(mocker: MockerFixture):
+    perf_counter_mock = mocker.patch.object(metrics.time, 'perf_counter')
+    info_mock = mocker.patch.object(metrics.Logger, 'info')
+    invocation_metrics = metrics.InvocationMetrics(enabled=False)
+
+    with invocation_metrics.phase('post'):
+        invocation_metrics.count('chunks')
+    invocation_metrics.emit(asset_id=1)
+
+    assert invocation_metrics.phases == invocation_metrics.counters == {}
+    perf_counter_mock.assert_not_called()
+    info_mock.assert_not_called()
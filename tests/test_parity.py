@@ -0,0 +1,70 @@
+import json
+import pathlib
+import subprocess
+import sys
+from typing import List
+
+from benchmarks.generator import (
+    START_TIMESTAMP,
+    make_drillstrings,
+    make_wits_records,
+)
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def run_app(app: str, wits: List[dict], drillstrings: List[dict]) -> List[dict]:
+    completed = subprocess.run(
+        [sys.executable, '-m', 'tests.run_app', app],
+        input=json.dumps({'wits': wits, 'drillstrings': drillstrings}),
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        check=True,
+    )
+
+    return json.loads(completed.stdout)
+
+
+def make_input():
+    # every 4th drillstring has no gamma sensor and the last one is not found
+    drillstrings = make_drillstrings(5)
+    wits = make_wits_records(
+        500, [drillstring['_id'] for drillstring in drillstrings], untagged_every=7
+    )
+
+    # records switch drillstrings every 100 records
+    for index, record in enumerate(wits):
+        if record['metadata']:
+            record['metadata']['drillstring'] = drillstrings[index // 100]['_id']
+
+    # a resent record
+    wits.insert(11, {**wits[10], 'data': {**wits[10]['data'], 'gamma_ray': 1.0}})
+
+    return wits, drillstrings[:-1]
+
+
+def test_apps_post_the_same_documents():
+    wits, drillstrings = make_input()
+
+    stream_documents = run_app('stream', wits=wits, drillstrings=drillstrings)
+    scheduled_documents = run_app('scheduled', wits=wits, drillstrings=drillstrings)
+
+    assert stream_documents == scheduled_documents
+    # untagged and resent records are dropped, the last one of a timestamp wins
+    assert len(stream_documents) == 500 - len(range(0, 500, 7))
+    assert {
+        document['timestamp'] - START_TIMESTAMP: document['data']['gamma_ray']
+        for document in stream_documents
+    }[10] == 1.0
+    # drillstrings 1 to 3 have gamma sensors, their records get offsets
+    assert {
+        document['timestamp'] - START_TIMESTAMP: (
+            document['data']['gamma_depth'] < document['data']['bit_depth']
+        )
+        for document in stream_documents
+    } == {
+        index: 100 <= index < 400
+        for index in range(500)
+        if index % 7
+    }
@@ -0,0 +1,39 @@
+import concurrent.futures
+import json
+import sys
+import threading
+
+from gamma_depth_io import profiling
+
+
+def post_chunk(size: int) -> int:
+    return sum(range(size))
+
+
+def test_pool_threads_are_profiled(capsys):
+    with profiling.profiled(asset_id=1, top=100):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(post_chunk, [10 ** 5] * 4))
+
+    profile = json.loads(capsys.readouterr().out)['gamma_depth_profile']
+
+    assert profile['threads'] == 3
+    (calls,) = (
+        calls
+        for function, calls, *_ in profile['functions']
+        if function.endswith('(post_chunk)')
+    )
+    assert calls == 4
+
+
+def test_thread_profiling_stops_with_the_block(capsys):
+    with profiling.profiled(asset_id=1, top=1):
+        pass
+
+    hooks = []
+    thread = threading.Thread(target=lambda: hooks.append(sys.getprofile()))
+    thread.start()
+    thread.join()
+
+    assert json.loads(capsys.readouterr().out)['gamma_depth_profile']['threads'] == 1
+    assert hooks == [None]
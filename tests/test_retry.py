@@ -0,0 +1,84 @@
+import pytest
+import requests
+from corva import Api
+from pytest_mock import MockerFixture
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from gamma_depth_io import retry, writer
+
+API = Api(
+    api_url='https://api.localhost.ai',
+    data_api_url='https://data.localhost.ai',
+    api_key='',
+    app_key='',
+)
+
+
+def http_error(status_code: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+
+    return requests.HTTPError(response=response)
+
+
+def test_transient_errors_are_retried_with_backoff(mocker: MockerFixture):
+    sleep_mock = mocker.patch.object(retry.time, 'sleep')
+    func = mocker.Mock(
+        side_effect=[requests.ConnectionError(), http_error(503), 'result']
+    )
+
+    assert retry.call(func, attempts=3, backoff=1.0) == 'result'
+
+    assert func.call_count == 3
+    first, second = (call.args[0] for call in sleep_mock.call_args_list)
+    assert 0.5 <= first <= 1.0
+    assert 1.0 <= second <= 2.0
+
+
+def test_last_error_is_raised_once_attempts_run_out(mocker: MockerFixture):
+    mocker.patch.object(retry.time, 'sleep')
+    func = mocker.Mock(side_effect=[requests.Timeout(), requests.ConnectionError()])
+
+    with pytest.raises(requests.ConnectionError):
+        retry.call(func, attempts=2, backoff=1.0)
+
+    assert func.call_count == 2
+
+
+@pytest.mark.parametrize('error', (http_error(404), ValueError()))
+def test_other_errors_are_raised_at_once(error, mocker: MockerFixture):
+    sleep_mock = mocker.patch.object(retry.time, 'sleep')
+    func = mocker.Mock(side_effect=error)
+
+    with pytest.raises(type(error)):
+        retry.call(func, attempts=3, backoff=1.0)
+
+    assert func.call_count == 1
+    sleep_mock.assert_not_called()
+
+
+def test_only_the_failed_chunk_is_posted_again(
+    mocker: MockerFixture, requests_mock: RequestsMocker
+):
+    mocker.patch.object(retry.time, 'sleep')
+    post_mock = requests_mock.post(
+        ANY, [{'status_code': 200}, {'status_code': 502}, {'status_code': 200}]
+    )
+
+    statuses = writer.post_chunks(
+        api=API,
+        provider='provider',
+        collection='collection',
+        records=[b'{"timestamp": %d}' % timestamp for timestamp in range(2)],
+        max_records=1,
+        max_bytes=10 ** 6,
+        workers=1,
+        attempts=2,
+    )
+
+    assert [status.index for status in statuses] == [0, 1]
+    assert [request.json() for request in post_mock.request_history] == [
+        [{'timestamp': 0}],
+        [{'timestamp': 1}],
+        [{'timestamp': 1}],
+    ]
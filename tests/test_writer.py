@@ -0,0 +1,166 @@
+import concurrent.futures
+import json
+
+import pytest
+from corva import Api
+from pytest_mock import MockerFixture
+from requests import HTTPError
+from requests_mock import ANY, Mocker as RequestsMocker
+
+from gamma_depth_io import writer
+
+API = Api(
+    api_url='https://api.localhost.ai',
+    data_api_url='https://data.localhost.ai',
+    api_key='',
+    app_key='',
+)
+
+
+@pytest.mark.parametrize(
+    'max_records,max_bytes,expected_counts',
+    (
+        (2, 10 ** 6, [2, 2, 1]),
+        (10, 40, [2, 2, 1]),
+        (10, 1, [1, 1, 1, 1, 1]),  # records bigger than max_bytes
+    ),
+)
+def test_iter_chunks(max_records, max_bytes, expected_counts):
+    records = [{'timestamp': timestamp} for timestamp in range(5)]
+    encoded = [json.dumps(record).encode() for record in records]
+
+    chunks = list(writer.iter_chunks(encoded, max_records, max_bytes))
+
+    assert [count for _, count in chunks] == expected_counts
+    assert [record for body, _ in chunks for record in json.loads(body)] == records
+
+
+def test_post_chunks(requests_mock: RequestsMocker):
+    post_mock = requests_mock.post(
+        'https://data.localhost.ai/api/v1/data/provider/collection/'
+    )
+    records = [{'timestamp': timestamp} for timestamp in range(5)]
+    encoded = [json.dumps(record).encode() for record in records]
+
+    statuses = writer.post_chunks(
+        api=API,
+        provider='provider',
+        collection='collection',
+        records=encoded,
+        max_records=2,
+        max_bytes=10 ** 6,
+        workers=2,
+    )
+
+    assert [(status.index, status.records) for status in statuses] == [
+        (0, 2),
+        (1, 2),
+        (2, 1),
+    ]
+    assert sorted(
+        (
+            record
+            for request in post_mock.request_history
+            for record in request.json()
+        ),
+        key=lambda record: record['timestamp'],
+    ) == records
+
+
+def test_post_chunks_raises_after_all_chunks_are_attempted(
+    requests_mock: RequestsMocker,
+):
+    post_mock = requests_mock.post(
+        ANY,
+        [
+            {'status_code': 500},
+            {'status_code': 200},
+            {'status_code': 200},
+        ],
+    )
+
+    with pytest.raises(HTTPError):
+        writer.post_chunks(
+            api=API,
+            provider='provider',
+            collection='collection',
+            records=[b'{"timestamp": %d}' % timestamp for timestamp in range(3)],
+            max_records=1,
+            max_bytes=10 ** 6,
+            workers=1,
+        )
+
+    assert post_mock.call_count == 3
+
+
+def test_post_chunks_reports_posted_chunks_before_raising(
+    requests_mock: RequestsMocker,
+):
+    requests_mock.post(
+        ANY,
+        [
+            {'status_code': 200},
+            {'status_code': 500},
+            {'status_code': 200},
+        ],
+    )
+    posted = []
+
+    with pytest.raises(HTTPError):
+        writer.post_chunks(
+            api=API,
+            provider='provider',
+            collection='collection',
+            records=[b'{"timestamp": %d}' % timestamp for timestamp in range(5)],
+            max_records=2,
+            max_bytes=10 ** 6,
+            workers=1,
+            on_posted=posted.extend,
+        )
+
+    assert [(status.index, status.offset, status.records) for status in posted] == [
+        (0, 0, 2),
+        (2, 4, 1),
+    ]
+
+
+def test_session_pool_grows_to_the_concurrency(mocker: MockerFixture):
+    mocker.patch.object(writer, '_SESSION', None)
+    mocker.patch.object(writer, '_SESSION_POOL_SIZE', 0)
+
+    session = writer.get_session(pool_size=4)
+    adapter = session.get_adapter('https://data.localhost.ai')
+    assert adapter._pool_maxsize == 4
+
+    # a smaller caller keeps the pool and its connections
+    assert writer.get_session(pool_size=2) is session
+    assert session.get_adapter('https://data.localhost.ai') is adapter
+
+    assert writer.get_session(pool_size=16) is session
+    assert session.get_adapter('https://data.localhost.ai')._pool_maxsize == 16
+
+
+def test_post_chunks_uses_the_shared_executor(
+    requests_mock: RequestsMocker, mocker: MockerFixture
+):
+    requests_mock.post(ANY)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        submit_spy = mocker.spy(executor, 'submit')
+
+        for _ in range(2):
+            statuses = writer.post_chunks(
+                api=API,
+                provider='provider',
+                collection='collection',
+                records=[b'{"timestamp": %d}' % timestamp for timestamp in range(3)],
+                max_records=1,
+                max_bytes=10 ** 6,
+                workers=2,
+                executor=executor,
+            )
+
+            # all chunks are done, when the call returns
+            assert len(statuses) == 3
+
+    assert submit_spy.call_count == 6
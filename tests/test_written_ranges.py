@@ -0,0 +1,50 @@
+import numpy as np
+from pytest_mock import MockerFixture
+
+from gamma_depth_io import written_ranges
+from gamma_depth_io.writer import ChunkStatus
+from gamma_depth_io.written_ranges import WrittenRanges, posted_ranges
+
+
+def test_posted_ranges():
+    def status(index, offset, records):
+        return ChunkStatus(
+            index=index,
+            offset=offset,
+            records=records,
+            bytes=0,
+            status_code=200,
+            seconds=0.0,
+        )
+
+    timestamps = np.array([1, 2, 3, 5, 8, 9, 10])
+
+    # chunk 2 at offset 4 was not posted
+    assert posted_ranges(
+        timestamps, timestamps, [status(3, 6, 1), status(0, 0, 2), status(1, 2, 2)]
+    ) == [(1, 5), (10, 10)]
+
+
+def test_concurrent_invocations_keep_each_others_ranges(cache, mocker: MockerFixture):
+    merge_ranges = written_ranges.merge_ranges
+    other_invocation_done = False
+
+    def merge_after_other_invocation(*args, **kwargs):
+        nonlocal other_invocation_done
+
+        if not other_invocation_done:
+            # another invocation adds its range between this one's load and store
+            other_invocation_done = True
+            WrittenRanges(cache=cache, asset_id=0).add([(10, 20)])
+
+        return merge_ranges(*args, **kwargs)
+
+    merge_spy = mocker.patch.object(
+        written_ranges, 'merge_ranges', side_effect=merge_after_other_invocation
+    )
+
+    WrittenRanges(cache=cache, asset_id=0).add([(1, 5)])
+
+    assert WrittenRanges(cache=cache, asset_id=0).load() == [(1, 5), (10, 20)]
+    # the nested add, this add and its retry on the fresh value
+    assert merge_spy.call_count == 3